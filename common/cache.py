@@ -0,0 +1,183 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Caches of data derived from portfolio snapshots
+
+SnapshotCache entries are keyed on version counters instead of being deleted: every snapshot has its own version, the
+entries computed over all snapshots have the version ``all`` and every entry also carries a global version.
+Invalidating a snapshot bumps its version and the ``all`` version (which covers the data of every snapshot),
+invalidating without a snapshot (e.g. after bulk writes of unknown snapshots) bumps the global version. Superseded
+entries are no longer read and expire with the cache timeout.
+
+Data stored in tables per snapshot (summaries, loan coverage, recovery projections, pricing simulations) are kept in
+sync with the records they are derived from by a SnapshotDependency, which follows the foreign keys from a saved
+record to its snapshots and invalidates the data of those snapshots only.
+
+"""
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from common.ingestion import bulk_saved
+
+ALL_SNAPSHOTS = 'all'
+GLOBAL = 'global'
+
+
+class SnapshotCache:
+    """
+    A namespace of cached values computed per snapshot
+
+    :param prefix: Prefix of the cache keys
+    :param timeout: Cache timeout of the values in seconds
+    """
+
+    def __init__(self, prefix, timeout):
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def version_key(self, scope):
+        return '%s:version:%s' % (self.prefix, scope)
+
+    def bump(self, scope):
+        try:
+            cache.incr(self.version_key(scope))
+        except ValueError:
+            cache.set(self.version_key(scope), 1, None)
+
+    def key(self, snapshot_id, key):
+        """The cache key of a value of a snapshot (all snapshots if None) at the current versions"""
+        scope = snapshot_id or ALL_SNAPSHOTS
+        versions = cache.get_many([self.version_key(GLOBAL), self.version_key(scope)])
+        return '%s:%s:%s:%s:%s' % (self.prefix, versions.get(self.version_key(GLOBAL), 0), scope,
+                                   versions.get(self.version_key(scope), 0), key)
+
+    def get_or_set(self, snapshot_id, key, default):
+        """The cached value of a snapshot, computed with the callable default if missing"""
+        return cache.get_or_set(self.key(snapshot_id, key), default, self.timeout)
+
+    def invalidate(self, snapshot_id=None):
+        """Invalidate the values of a snapshot and of all snapshots, without a snapshot every value"""
+        if snapshot_id:
+            self.bump(snapshot_id)
+            self.bump(ALL_SNAPSHOTS)
+        else:
+            self.bump(GLOBAL)
+
+    def saved(self, sender, instance, **kwargs):
+        """post_save / post_delete receiver of models with a ``snapshot_id`` foreign key"""
+        if instance.snapshot_id_id:
+            self.invalidate(instance.snapshot_id_id)
+        else:
+            self.bump(ALL_SNAPSHOTS)
+
+    def bulk_saved(self, sender, snapshots=None, **kwargs):
+        """bulk_saved receiver (see common.ingestion), without snapshots of the written rows every value"""
+        if snapshots is None:
+            self.invalidate()
+            return
+        for snapshot_id in snapshots:
+            self.bump(snapshot_id)
+        self.bump(ALL_SNAPSHOTS)
+
+
+def instance_snapshots(instance, paths):
+    """
+    The snapshots a record belongs to, following the lookups of ``paths`` (model -> tuple of lookups from a record
+    to the primary key of its snapshot, e.g. ``('loan_identifier__snapshot_id',)``)
+    """
+    model = type(instance)
+    snapshots = set()
+    for path in paths[model]:
+        name, _, rest = path.partition('__')
+        field = model._meta.get_field(name)
+        value = getattr(instance, field.attname)
+        if rest and value is not None:
+            value = field.related_model.objects.filter(pk=value).values_list(rest, flat=True).first()
+        if value is not None:
+            snapshots.add(value)
+    return snapshots
+
+
+def snapshot_records(model, snapshot_id, paths):
+    """The records of a model belonging to a snapshot, following the lookups of ``paths``"""
+    condition = Q()
+    for path in paths[model]:
+        condition |= Q(**{path: snapshot_id})
+    return model.objects.filter(condition)
+
+
+class SnapshotDependency:
+    """
+    Data stored per snapshot that depend on the records of the models of ``paths``
+
+    :param name: Prefix of the dispatch uids of the receivers
+    :param paths: Model -> tuple of lookups from a record to the primary key of its snapshot
+    :param invalidate: Callable removing (or flagging) the data of a list of snapshots, of every snapshot if None
+    :param skip_raw: Ignore raw saves (fixture loads)
+    """
+
+    def __init__(self, name, paths, invalidate, skip_raw=False):
+        self.name = name
+        self.paths = paths
+        self.invalidate = invalidate
+        self.skip_raw = skip_raw
+
+    def saved(self, sender, instance, **kwargs):
+        """post_save / post_delete receiver, invalidates the data of the snapshots of the record"""
+        if self.skip_raw and kwargs.get('raw'):
+            return
+        snapshots = instance_snapshots(instance, self.paths)
+        if snapshots:
+            self.invalidate(list(snapshots))
+
+    def links_changed(self, sender, instance, action, reverse, **kwargs):
+        """
+        m2m_changed receiver, invalidates the data of the snapshots of the record holding the many-to-many field
+        (of every snapshot for changes from the other side)
+        """
+        if action.startswith('post_'):
+            self.invalidate(None if reverse else list(instance_snapshots(instance, self.paths)))
+
+    def bulk_saved(self, sender, snapshots=None, **kwargs):
+        """
+        bulk_saved receiver (see common.ingestion), invalidates the data of the snapshots of the written rows. These
+        are only known for models with a direct snapshot foreign key, otherwise the data of every snapshot is
+        invalidated.
+        """
+        paths = self.paths.get(sender, ())
+        if snapshots is None or len(paths) != 1 or '__' in paths[0]:
+            self.invalidate(None)
+        elif snapshots:
+            self.invalidate(list(snapshots))
+
+    def connect(self, links=()):
+        """Connect the receivers to the models of ``paths`` and to the through models of the many-to-many ``links``"""
+        for model in self.paths:
+            uid = '%s_%s' % (self.name, model._meta.model_name)
+            post_save.connect(self.saved, sender=model, dispatch_uid=uid + '_save')
+            post_delete.connect(self.saved, sender=model, dispatch_uid=uid + '_delete')
+            bulk_saved.connect(self.bulk_saved, sender=model, dispatch_uid=uid + '_bulk')
+        for link in links:
+            uid = '%s_%s' % (self.name, link.field.name)
+            m2m_changed.connect(self.links_changed, sender=link.through, dispatch_uid=uid)
+            bulk_saved.connect(self.bulk_saved, sender=link.through, dispatch_uid=uid + '_bulk')
@@ -0,0 +1,169 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Fast loading of Django JSON fixtures
+
+``loaddata`` parses a complete fixture file into memory and saves the deserialized objects one at a time (sending
+signals for each). The FixtureLoader instead reads the records incrementally (with the ijson streaming parser when it
+is installed), collects the rows of each model and bulk inserts them in foreign key order (see common.ingestion).
+Primary keys and many-to-many links are kept as in the fixture, records of stored primary keys update the stored rows
+(when they differ) as with loaddata. Rows are inserted in one transaction, in which foreign key checks are deferred,
+so that the rows of a model collected before the rows they reference can be flushed early to bound memory use.
+
+Only fixtures referencing related records by primary key are supported (no natural keys). Unlike loaddata the
+bookkeeping timestamps of the fixture are only kept by the PostgreSQL COPY path, bulk_create sets them anew.
+
+"""
+
+import json
+
+import pandas as pd
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.utils import timezone
+
+from common.ingestion import BATCH_SIZE, bulk_insert, bulk_update_changed, reset_sequences
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def fixture_records(path):
+    """Iterate over the records of a JSON fixture file, streaming when ijson is available"""
+    with open(path, 'rb') as stream:
+        if ijson is None:
+            yield from json.load(stream)
+        else:
+            yield from ijson.items(stream, 'item', use_float=True)
+
+
+def model_order(model_list):
+    """The models sorted so that every model follows the models its foreign keys refer to"""
+    pending = set(model_list)
+    dependencies = {model: {f.related_model for f in model._meta.concrete_fields
+                            if f.is_relation and f.related_model in pending and f.related_model is not model}
+                    for model in model_list}
+    ordered = []
+    while pending:
+        ready = sorted((m for m in pending if not dependencies[m] & pending), key=lambda m: m._meta.label)
+        if not ready:
+            # a cycle of foreign keys, the deferred constraints are checked at the end of the transaction
+            ready = sorted(pending, key=lambda m: m._meta.label)
+        ordered += ready
+        pending -= set(ready)
+    return ordered
+
+
+class FixtureLoader:
+    """
+    Bulk loads JSON fixture files.
+
+    :param chunk_size: Number of rows of a model collected before they are inserted
+    :param log: Callable receiving progress messages
+    """
+
+    def __init__(self, chunk_size=BATCH_SIZE, log=None, using=DEFAULT_DB_ALIAS):
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.using = using
+        self.rows = {}
+        self.counts = {}
+
+    def load(self, paths):
+        """Load the fixture files in one transaction, returns {model: rows inserted or updated}"""
+        with transaction.atomic(using=self.using):
+            for path in paths:
+                for record in fixture_records(path):
+                    self.add(record)
+            for model in model_order(list(self.rows)):
+                self.flush(model)
+            reset_sequences(list(self.counts), using=self.using)
+        for model, count in self.counts.items():
+            self.log('%s: %d rows' % (model._meta.label, count))
+        return self.counts
+
+    def add(self, record):
+        """Collect the row (and many-to-many links) of a fixture record"""
+        model = apps.get_model(record['model'])
+        pk = model._meta.pk
+        row = {pk.attname: pk.to_python(record['pk'])}
+        for name, value in record['fields'].items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                through = field.remote_field.through
+                for target in value:
+                    self.collect(through, {field.m2m_column_name(): row[pk.attname],
+                                           field.m2m_reverse_name(): target})
+            elif field.is_relation:
+                if isinstance(value, list):
+                    raise ValueError('Natural keys are not supported (%s.%s)' % (model._meta.label, name))
+                row[field.attname] = value
+            else:
+                row[field.attname] = value
+        self.collect(model, row)
+
+    def collect(self, model, row):
+        self.rows.setdefault(model, []).append(row)
+        if len(self.rows[model]) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model):
+        """Insert the collected rows of a model"""
+        rows = self.rows.get(model)
+        if not rows:
+            return
+        pk = model._meta.pk.attname
+        frame = pd.DataFrame.from_records(rows)
+        if pk not in frame.columns:
+            # many-to-many links, only the links not stored yet are inserted
+            frame = frame.drop_duplicates()
+            columns = list(frame.columns)
+            stored = pd.DataFrame.from_records(list(model._default_manager.using(self.using).values_list(*columns)),
+                                               columns=columns)
+            frame = frame.merge(stored, how='left', indicator=True)
+            frame = frame[frame.pop('_merge') == 'left_only']
+            self.counts[model] = self.counts.get(model, 0) + bulk_insert(model, frame, using=self.using)
+            self.rows[model] = []
+            return
+        frame = frame.drop_duplicates(pk, keep='last')
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.DateTimeField) and field.attname in frame.columns:
+                frame[field.attname] = self.aware(frame[field.attname])
+        stored = frame[pk].isin(list(model._default_manager.using(self.using)
+                                     .filter(pk__in=frame[pk].tolist()).values_list('pk', flat=True)))
+        count = bulk_insert(model, frame[~stored], using=self.using)
+        # stored rows are compared on their data, the bookkeeping timestamps are refreshed when they changed
+        auto_time = [f.attname for f in model._meta.concrete_fields
+                     if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+        count += bulk_update_changed(model, frame[stored].drop(columns=auto_time, errors='ignore'), using=self.using)
+        self.counts[model] = self.counts.get(model, 0) + count
+        self.rows[model] = []
+
+    @staticmethod
+    def aware(values):
+        """Parse timestamps, interpreting naive ones in the current time zone (as loaddata does)"""
+        values = pd.to_datetime(values, format='ISO8601')
+        if settings.USE_TZ and values.dt.tz is None:
+            values = values.dt.tz_localize(timezone.get_current_timezone(), ambiguous='NaT', nonexistent='NaT')
+        return values.astype(object).where(values.notna(), None)
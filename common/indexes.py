@@ -0,0 +1,64 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+PostgreSQL specific indexes of the large openNPL tables
+
+BRIN (block range) indexes summarise the value range of each block of table pages. They are tiny and cheap to
+maintain, and effective for columns that correlate with the physical row order. The time series tables grow period
+by period, hence their reporting period columns (the reference month of the NPL repayment history, the portfolio
+snapshot of the SFLP states, which stands for the monthly reporting period) are indexed, which serves the queries
+over ranges of periods. Django's BrinIndex is not portable to the sqlite setup, hence the indexes are created by a
+post_migrate receiver when the database is PostgreSQL.
+
+"""
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# (app label, model name, reporting period columns) of the BRIN indexes
+BRIN_INDEXES = [
+    ('npl_portfolio', 'HistoricalRepayment', ('reference_year', 'reference_month')),
+    ('sflp_portfolio', 'LoanState', ('portfolio_snapshot_id_id',)),
+    ('sflp_portfolio', 'CounterpartyState', ('portfolio_snapshot_id_id',)),
+    ('sflp_portfolio', 'PropertyCollateralState', ('portfolio_snapshot_id_id',)),
+]
+
+
+def brin_index_name(model):
+    return '%s_period_brin' % model._meta.db_table
+
+
+def brin_indexes(app_label=None):
+    """(model, columns, index name) of the BRIN indexes, optionally of one app"""
+    return [(apps.get_model(label, name), columns, brin_index_name(apps.get_model(label, name)))
+            for label, name, columns in BRIN_INDEXES if app_label in (None, label)]
+
+
+def create_brin_indexes(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver creating the BRIN indexes of an app (PostgreSQL only)"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model, columns, name in brin_indexes(sender.label):
+            cursor.execute('CREATE INDEX IF NOT EXISTS %s ON %s USING brin (%s)' % (
+                quote(name), quote(model._meta.db_table), ', '.join(quote(column) for column in columns)))
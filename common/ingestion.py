@@ -0,0 +1,232 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Bulk ingestion of tabular data into openNPL models
+
+Rows are passed as pandas DataFrames whose columns are model field attnames (e.g. ``loan_identifier_id`` for a
+foreign key). On PostgreSQL every frame is streamed into its table with ``COPY ... FROM STDIN``; on other databases
+(e.g. the sqlite docker setup) the rows are inserted with batched ``bulk_create``. Bookkeeping fields
+(``creation_date``, ``last_change_date``) and field defaults are filled in the same way the ORM would.
+
+Frames of existing rows (carrying the primary key) can be compared against the stored values so that only the rows
+that actually changed are written back (``bulk_update_changed``).
+
+Bulk writes bypass the ``post_save`` signal, receivers that maintain derived data (e.g. caches) listen to
+``bulk_saved`` instead, which is sent with the model as sender after every bulk write. Like ``post_save`` it carries
+``created`` (rows inserted rather than updated) and ``snapshots``, the primary keys of the portfolio snapshots of the
+written rows (None if unknown, e.g. for tables without a snapshot foreign key).
+
+"""
+
+import io
+import json
+
+import pandas as pd
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.dispatch import Signal
+from django.utils import timezone
+
+BATCH_SIZE = 5000
+
+INTEGER_FIELDS = (models.IntegerField, models.BigIntegerField, models.SmallIntegerField)
+
+bulk_saved = Signal()
+
+
+def frame_snapshots(model, frame):
+    """
+    The primary keys of the portfolio snapshots of the rows of a frame, None if the model has no portfolio snapshot
+    foreign key or the frame does not hold it
+    """
+    for field in model._meta.concrete_fields:
+        if field.is_relation and field.related_model._meta.model_name == 'portfoliosnapshot':
+            if field.attname not in frame.columns:
+                return None
+            return set(int(pk) for pk in frame[field.attname].dropna().unique())
+    return None
+
+
+def identifier_map(queryset, key):
+    """
+    Natural key -> primary key Series for the rows of a queryset, used to resolve foreign keys with
+    vectorized ``Series.map`` lookups. Keys are compared as text, the last row wins for duplicated keys.
+    """
+    pairs = list(queryset.filter(**{key + '__isnull': False}).values_list(key, 'pk'))
+    ids = pd.Series([pk for _, pk in pairs], index=pd.Index([str(k) for k, _ in pairs], dtype=object), dtype='Int64')
+    return ids[~ids.index.duplicated(keep='last')]
+
+
+def complete_frame(model, frame):
+    """
+    Add the values the ORM would supply on insert: auto_now / auto_now_add timestamps and field defaults for
+    fields missing from the frame. Integer columns are cast to the nullable Int64 type (missing values otherwise
+    turn them into floats, which COPY rejects). Returns a new frame restricted to concrete model fields.
+    """
+    frame = frame.copy()
+    now = timezone.now()
+    for field in model._meta.concrete_fields:
+        target = field.target_field if field.is_relation else field
+        if field.attname in frame.columns and isinstance(target, INTEGER_FIELDS) and frame[field.attname].dtype != 'Int64':
+            frame[field.attname] = pd.to_numeric(frame[field.attname], errors='coerce').round().astype('Int64')
+        if field.primary_key and field.attname not in frame.columns:
+            continue
+        auto_time = getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        if auto_time:
+            if field.attname in frame.columns:
+                frame[field.attname] = frame[field.attname].astype(object).where(frame[field.attname].notna(), now)
+            else:
+                frame[field.attname] = now
+        elif field.attname not in frame.columns and field.has_default():
+            # one default per row (callable defaults of JSON fields return a new list or dict each time)
+            frame[field.attname] = pd.Series([field.get_default() for _ in range(len(frame))], index=frame.index,
+                                             dtype=object)
+    columns = [f.attname for f in model._meta.concrete_fields if f.attname in frame.columns]
+    return frame[columns]
+
+
+def copy_frame(model, frame, connection):
+    """Stream a frame into the model table with COPY FROM STDIN (PostgreSQL only)"""
+    frame = frame.copy()
+    for field in model._meta.concrete_fields:
+        if isinstance(field, models.JSONField) and field.attname in frame.columns:
+            frame[field.attname] = frame[field.attname].map(lambda v: None if v is None else json.dumps(v))
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep='\\N')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '\\N')" % (
+        quote(model._meta.db_table), ', '.join(quote(c) for c in frame.columns))
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    return len(frame)
+
+
+def create_frame(model, frame, using, batch_size=BATCH_SIZE):
+    """Insert a frame with batched bulk_create (portable fallback)"""
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    model.objects.using(using).bulk_create([model(**r) for r in records], batch_size=batch_size)
+    return len(records)
+
+
+def bulk_insert(model, frame, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """
+    Insert the rows of a frame into the table of a model, returns the number of rows inserted.
+
+    :param model: The target model
+    :param frame: DataFrame with one column per model field attname (missing fields take their defaults)
+    :param using: The database alias
+    :param batch_size: Batch size of the bulk_create fallback
+    """
+    if frame.empty:
+        return 0
+    frame = complete_frame(model, frame)
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        rows = copy_frame(model, frame, connection)
+    else:
+        rows = create_frame(model, frame, using, batch_size)
+    bulk_saved.send(sender=model, using=using, created=True, snapshots=frame_snapshots(model, frame))
+    return rows
+
+
+def comparable_frame(model, frame):
+    """Cast the columns of a frame to nullable dtypes matching their model fields, so stored and new values compare"""
+    frame = frame.copy()
+    for field in model._meta.concrete_fields:
+        column = field.attname
+        if column not in frame.columns:
+            continue
+        target = field.target_field if field.is_relation else field
+        if isinstance(target, (models.AutoField, models.BigAutoField) + INTEGER_FIELDS):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('Float64').round().astype('Int64')
+        elif isinstance(target, (models.FloatField, models.DecimalField)):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('Float64')
+        elif isinstance(target, models.BooleanField):
+            frame[column] = frame[column].astype('boolean')
+        elif isinstance(target, (models.DateField, models.DateTimeField)):
+            frame[column] = pd.to_datetime(frame[column], errors='coerce')
+        else:
+            frame[column] = frame[column].astype('string')
+    return frame
+
+
+def changed_rows(model, frame, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """
+    The rows of a frame (holding the primary key and some model fields) whose values differ from the stored row.
+    Missing values compare equal to each other; rows whose primary key is not stored count as changed.
+    """
+    pk = model._meta.pk.attname
+    columns = [c for c in frame.columns if c != pk]
+    ids = frame[pk].tolist()
+    stored = []
+    for i in range(0, len(ids), batch_size):
+        stored += list(model.objects.using(using).filter(pk__in=ids[i:i + batch_size]).values(pk, *columns))
+    stored = pd.DataFrame.from_records(stored, columns=[pk] + columns)
+    new = comparable_frame(model, frame).set_index(pk)
+    old = comparable_frame(model, stored).set_index(pk).reindex(new.index)
+    # NaT compares unequal to itself, hence the values are only compared where both are present
+    differs = ((new != old) & new.notna() & old.notna()).fillna(False) | (new.isna() != old.isna())
+    return frame[differs.any(axis=1).to_numpy()]
+
+
+def bulk_update_changed(model, frame, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """
+    Update the stored rows of a frame holding the primary key and the fields to update, skipping the rows whose
+    values are unchanged. auto_now timestamps of the updated rows are refreshed. Returns the number of rows updated.
+    """
+    if frame.empty:
+        return 0
+    frame = changed_rows(model, frame, using, batch_size)
+    if frame.empty:
+        return 0
+    pk = model._meta.pk.attname
+    now = timezone.now()
+    auto_fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+    fields = [f for f in model._meta.concrete_fields
+              if (f.attname in frame.columns and not f.primary_key) or f in auto_fields]
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    objects = []
+    for record in records:
+        obj = model(**{pk: record.pop(pk)}, **record)
+        for field in auto_fields:
+            setattr(obj, field.attname, now)
+        objects.append(obj)
+    model.objects.using(using).bulk_update(objects, [f.name for f in fields], batch_size=batch_size)
+    bulk_saved.send(sender=model, using=using, created=False, snapshots=frame_snapshots(model, frame))
+    return len(objects)
+
+
+def reset_sequences(model_list, using=DEFAULT_DB_ALIAS):
+    """Reset primary key sequences after inserting rows with explicit primary keys"""
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), model_list)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -5,5 +5,5 @@ NAME[1]="synthetic_data_1"
 source venv/bin/activate
 for i in ${NAME[@]}
 do
-python3 manage.py loaddata --format=json ./npl_portfolio/fixtures/$i.json
+python3 manage.py load_npl_fixtures ./npl_portfolio/fixtures/$i.json
 done
@@ -38,6 +38,7 @@ from npl_portfolio.models import NonPropertyCollateral, PropertyCollateral
 from npl_portfolio.models import Forbearance
 from npl_portfolio.models import HistoricalRepayment
 from npl_portfolio.models import Mortgage
+from npl_portfolio.models import SnapshotSummary
 
 
 class PortfolioAdmin(admin.ModelAdmin):
@@ -51,7 +52,38 @@ class Portfolio_SnapshotAdmin(admin.ModelAdmin):
     save_as = True
     view_on_site = False
     search_fields = ['name']
-    list_display = ('name', 'creation_date', 'cutoff_date')
+    list_display = ('name', 'creation_date', 'cutoff_date', 'loans', 'principal_balance', 'collateral_coverage')
+    actions = ['refresh_summaries']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('summaries')
+
+    @staticmethod
+    def summary(obj, name):
+        """The data of a precomputed summary of the snapshot (see npl_portfolio.summaries)"""
+        for summary in obj.summaries.all():
+            if summary.name == name:
+                return summary.data
+        return {}
+
+    @admin.display(description='Loans')
+    def loans(self, obj):
+        return self.summary(obj, 'loan_balances').get('total', {}).get('count')
+
+    @admin.display(description='Principal Balance')
+    def principal_balance(self, obj):
+        return self.summary(obj, 'loan_balances').get('total', {}).get('sum_principal_balance')
+
+    @admin.display(description='Collateral Coverage')
+    def collateral_coverage(self, obj):
+        coverage = self.summary(obj, 'collateral_coverage').get('coverage')
+        return None if coverage is None else '%.1f%%' % (100 * coverage)
+
+    @admin.action(description='Refresh the summaries of the selected snapshots')
+    def refresh_summaries(self, request, queryset):
+        from npl_portfolio.summaries import refresh_summaries
+        count = refresh_summaries(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, 'Computed %d summaries' % count)
 
 
 class CounterpartyAdmin(admin.ModelAdmin):
@@ -553,166 +585,34 @@ class HistoricalRepaymentAdmin(admin.ModelAdmin):
         return custom + urls
 
     def matrix_view(self, request):
-        from django.http import HttpResponse
-        from django.urls import reverse
-        from npl_portfolio.models import HistoricalRepayment, PortfolioSnapshot
-
-        snapshots = PortfolioSnapshot.objects.all().order_by('-cutoff_date')
-        selected_snapshot_id = request.GET.get('snapshot_id')
-
-        qs = HistoricalRepayment.objects.select_related('loan_identifier', 'snapshot_id')
-        if selected_snapshot_id:
-            qs = qs.filter(snapshot_id=selected_snapshot_id)
-
-        records = list(qs)
-
-        col_set = sorted(
-            set(
-                (r.reference_year, r.reference_month)
-                for r in records
-                if r.reference_year is not None and r.reference_month is not None
-            ),
-            reverse=True,
+        from django.shortcuts import render
+        from npl_portfolio.repayment_matrix import cached_matrix_page
+
+        snapshot_id = request.GET.get('snapshot_id') or None
+        loan = request.GET.get('loan', '').strip()
+        matrix = cached_matrix_page(snapshot_id, loan, request.GET.get('page', 1))
+
+        query = request.GET.copy()
+        query.pop('page', None)
+        context = dict(
+            title='Historical Repayments — EBA Template 5 Matrix',
+            snapshots=PortfolioSnapshot.objects.all().order_by('-cutoff_date'),
+            selected_snapshot_id=snapshot_id,
+            loan=loan,
+            query=query.urlencode(),
+            **matrix,
         )
-        columns = [{'year': y, 'month': m, 'label': f'{y}-{m:02d}'} for y, m in col_set]
-
-        loan_data = {}
-        for r in records:
-            loan_key = r.loan_identifier_id
-            loan_label = str(r.loan_identifier) if r.loan_identifier else f'#{loan_key}'
-            if loan_key not in loan_data:
-                loan_data[loan_key] = {'label': loan_label, 'cells': {}}
-            if r.reference_year is not None and r.reference_month is not None:
-                loan_data[loan_key]['cells'][(r.reference_year, r.reference_month)] = {
-                    'total': r.history_of_total_repayments,
-                    'collateral': r.history_of_repayments_from_collateral_sales,
-                    'collection_type': r.type_of_collection,
-                    'agent_name': r.name_of_external_collection_agent,
-                }
-
-        rows = [
-            {
-                'loan': data['label'],
-                'cells': [
-                    data['cells'].get((col['year'], col['month']), {
-                        'total': None, 'collateral': None,
-                        'collection_type': None, 'agent_name': None,
-                    })
-                    for col in columns
-                ],
-            }
-            for data in loan_data.values()
-        ]
-
-        changelist_url = reverse('admin:npl_portfolio_historicalrepayment_changelist')
+        return render(request, 'admin/npl_portfolio/historicalrepayment/matrix.html', context)
 
-        # --- Snapshot filter options ---
-        snapshot_options = '<option value="">— All snapshots —</option>'
-        for s in snapshots:
-            label = s.name + (f' ({s.cutoff_date.date()})' if s.cutoff_date else '')
-            sel = 'selected' if selected_snapshot_id == str(s.pk) else ''
-            snapshot_options += f'<option value="{s.pk}" {sel}>{label}</option>'
 
-        clear_link = f'<a href="?" style="font-size:12px;color:#888;">Clear</a>' if selected_snapshot_id else ''
-
-        # --- Table header ---
-        month_headers = ''.join(
-            f'<th colspan="2" style="background:#1a3a4a;padding:6px 12px;border:1px solid #444;'
-            f'text-align:center;font-weight:600;color:#7ecfef;">{col["label"]}</th>'
-            for col in columns
-        )
-        sub_headers = ''.join(
-            '<th style="background:#1a2a3a;padding:4px 8px;border:1px solid #444;'
-            'text-align:right;color:#aaa;font-weight:400;min-width:90px;">Total</th>'
-            '<th style="background:#1a2a3a;padding:4px 8px;border:1px solid #444;'
-            'text-align:right;color:#aaa;font-weight:400;min-width:90px;">Collateral</th>'
-            for _ in columns
-        )
-
-        # --- Table rows ---
-        def fmt(val):
-            return f'{val:,}' if val is not None else '—'
-
-        def cell_html(cell, bg):
-            total = cell['total']
-            collateral = cell['collateral']
-            ctype = cell['collection_type']
-            agent = cell['agent_name'] or ''
-            total_color = '#eee' if total is not None else '#555'
-            col_color = '#7ecfef' if collateral else '#555'
-            ext_badge = ''
-            if ctype == 1:
-                tip = f'Agent: {agent}' if agent else 'External collection'
-                ext_txt = f'EXT · {agent}' if agent else 'EXT'
-                ext_badge = (f'<br><span style="font-size:10px;background:#a05000;color:#fff;'
-                             f'padding:1px 5px;border-radius:3px;font-weight:600;" title="{tip}">'
-                             f'{ext_txt}</span>')
-            td_total = (f'<td style="padding:6px 10px;border:1px solid #333;text-align:right;'
-                        f'color:{total_color};vertical-align:top;background:{bg};">'
-                        f'{fmt(total)}{ext_badge}</td>')
-            td_col = (f'<td style="padding:6px 10px;border:1px solid #333;text-align:right;'
-                      f'color:{col_color};background:{bg};">{fmt(collateral)}</td>')
-            return td_total + td_col
-
-        table_rows = ''
-        for i, row in enumerate(rows):
-            bg = '#1e1e1e' if i % 2 == 0 else '#242424'
-            sticky_td = (f'<td style="position:sticky;left:0;z-index:1;background:{bg};'
-                         f'padding:6px 16px;border:1px solid #333;font-weight:600;color:#ddd;">'
-                         f'{row["loan"]}</td>')
-            cells_html = ''.join(cell_html(c, bg) for c in row['cells'])
-            table_rows += f'<tr>{sticky_td}{cells_html}</tr>'
-
-        empty_msg = '' if columns else (
-            '<div style="padding:40px;text-align:center;color:#888;background:#2b2b2b;border-radius:6px;">'
-            'No repayment data found.</div>'
-        )
+class SnapshotSummaryAdmin(admin.ModelAdmin):
+    view_on_site = False
+    list_display = ('snapshot_id', 'name', 'stale', 'computed_date')
+    list_filter = ('name', 'stale', 'snapshot_id')
+    readonly_fields = ('snapshot_id', 'name', 'data', 'stale', 'computed_date')
 
-        stats = (f'<p style="font-size:12px;color:#888;margin-bottom:12px;">'
-                 f'{len(rows)} loan{"s" if len(rows) != 1 else ""} &nbsp;·&nbsp; '
-                 f'{len(columns)} month{"s" if len(columns) != 1 else ""} &nbsp;·&nbsp; '
-                 f'Columns sorted most-recent first &nbsp;·&nbsp; Amounts in loan currency</p>'
-                 ) if columns else ''
-
-        table_html = (
-            f'<div style="overflow-x:auto;max-width:100%;">'
-            f'<table style="border-collapse:collapse;font-size:12px;white-space:nowrap;min-width:100%;">'
-            f'<thead>'
-            f'<tr><th rowspan="2" style="position:sticky;left:0;z-index:2;background:#1a1a2e;'
-            f'padding:8px 16px;border:1px solid #444;text-align:left;min-width:180px;">Loan Identifier</th>'
-            f'{month_headers}</tr>'
-            f'<tr>{sub_headers}</tr>'
-            f'</thead>'
-            f'<tbody>{table_rows}</tbody>'
-            f'</table></div>'
-        ) if columns else ''
-
-        html = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8">
-<title>EBA Template 5 Matrix</title>
-<link rel="stylesheet" href="/static/admin/css/base.css">
-<style>body{{background:#121212;color:#eee;font-family:sans-serif;padding:20px;}}</style>
-</head><body>
-<div style="padding:8px 0 16px;">
-  <a href="{changelist_url}" style="color:#888;font-size:13px;">← Historical Repayments</a>
-</div>
-<h1 style="margin-bottom:20px;">Historical Repayments — EBA Template 5 Matrix</h1>
-<form method="get" style="margin-bottom:20px;display:flex;align-items:center;gap:12px;">
-  <label for="snapshot_id" style="font-weight:600;font-size:13px;">Snapshot:</label>
-  <select name="snapshot_id" id="snapshot_id"
-    style="padding:4px 10px;border-radius:4px;border:1px solid #444;background:#2b2b2b;color:#eee;font-size:13px;">
-    {snapshot_options}
-  </select>
-  <button type="submit"
-    style="padding:4px 14px;background:#1a7a4a;color:#fff;border:none;border-radius:4px;cursor:pointer;font-size:13px;">
-    Apply
-  </button>
-  {clear_link}
-</form>
-{stats}{empty_msg}{table_html}
-</body></html>"""
-
-        return HttpResponse(html)
+    def has_add_permission(self, request):
+        return False
 
 
 class MortgageAdmin(admin.ModelAdmin):
@@ -750,3 +650,4 @@ admin.site.register(PropertyCollateral, PropertyCollateralAdmin)
 admin.site.register(Forbearance, ForbearanceAdmin)
 admin.site.register(HistoricalRepayment, HistoricalRepaymentAdmin)
 admin.site.register(Mortgage, MortgageAdmin)
+admin.site.register(SnapshotSummary, SnapshotSummaryAdmin)
@@ -0,0 +1,120 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Portfolio level aggregates of the loans of NPL snapshots
+
+The loans of a snapshot are grouped by any of the ``DIMENSIONS`` and the ``MEASURES`` of every group are computed in
+the database with a single GROUP BY query. Results are cached per snapshot (see common.cache) and invalidated when
+loans or counterparties (the source of the country dimension) of the snapshot are saved.
+
+"""
+
+from django.conf import settings
+from django.db.models import Avg, Case, Count, F, IntegerField, Sum, Value, When
+
+from common.cache import SnapshotCache
+from npl_portfolio.loan import Loan
+
+CACHE_TIMEOUT = getattr(settings, 'PORTFOLIO_AGGREGATES_CACHE_TIMEOUT', 3600)
+
+aggregate_cache = SnapshotCache('portfolio_aggregates', CACHE_TIMEOUT)
+
+# upper bound (inclusive) and label of the days in past due buckets, loans past due longer fall in the last bucket
+PASTDUE_BUCKETS = [(0, '0'), (30, '1-30'), (90, '31-90'), (180, '91-180'), (365, '181-365'), (None, '>365')]
+
+
+def pastdue_bucket():
+    """The index of the past due bucket of a loan (grouped and ordered by index, labelled afterwards)"""
+    whens = [When(days_in_pastdue__lte=bound, then=Value(index))
+             for index, (bound, _) in enumerate(PASTDUE_BUCKETS) if bound is not None]
+    whens.append(When(days_in_pastdue__gt=PASTDUE_BUCKETS[-2][0], then=Value(len(PASTDUE_BUCKETS) - 1)))
+    return Case(*whens, default=None, output_field=IntegerField())
+
+
+# dimension -> loan field (or expression) the loans are grouped by
+DIMENSIONS = {
+    'snapshot': F('snapshot_id'),
+    'asset_class': 'asset_class',
+    'product_type': 'product_type',
+    'loan_legal_status': 'loan_legal_status',
+    'currency': F('loan_currency'),
+    'governing_law': F('governing_law_of_loan_agreement'),
+    'country': F('counterparty_identifier__country_of_registered_location'),
+    'pastdue_bucket': pastdue_bucket,
+}
+
+BALANCES = ['principal_balance', 'accrued_interest_balance_on_book', 'legal_balance', 'days_in_pastdue']
+
+# measure -> aggregate of the loans of a group
+MEASURES = {
+    'count': lambda: Count('pk'),
+    **{'sum_%s' % name: lambda name=name: Sum(name) for name in BALANCES},
+    **{'avg_%s' % name: lambda name=name: Avg(name) for name in BALANCES},
+    **{'count_%s' % name: lambda name=name: Count(name) for name in BALANCES},
+}
+
+DEFAULT_MEASURES = ['count', 'sum_principal_balance']
+
+
+def parse_names(value, choices):
+    """The comma separated names of a query parameter, raises ValueError for names that are not choices"""
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in choices]
+    if unknown:
+        raise ValueError('Unknown names %s, the choices are %s' % (', '.join(unknown), ', '.join(choices)))
+    return list(dict.fromkeys(names))
+
+
+def loans(snapshot_id=None):
+    """The loans of a snapshot (all snapshots if None)"""
+    queryset = Loan.objects.all()
+    if snapshot_id:
+        queryset = queryset.filter(snapshot_id=snapshot_id)
+    return queryset
+
+
+def aggregate(queryset, group_by, measures=DEFAULT_MEASURES):
+    """
+    A list with one dict per group of the loans: the values of the dimensions and the measures of the group,
+    ordered by the dimensions. Without dimensions the list holds the measures of all loans.
+    """
+    aggregates = {measure: MEASURES[measure]() for measure in measures}
+    if not group_by:
+        return [queryset.aggregate(**aggregates)]
+    fields, expressions = [], {}
+    for dimension in group_by:
+        source = DIMENSIONS[dimension]
+        if isinstance(source, str):
+            fields.append(source)
+        else:
+            expressions[dimension] = source() if callable(source) else source
+    rows = list(queryset.order_by().values(*fields, **expressions).annotate(**aggregates).order_by(*group_by))
+    if 'pastdue_bucket' in group_by:
+        for row in rows:
+            if row['pastdue_bucket'] is not None:
+                row['pastdue_bucket'] = PASTDUE_BUCKETS[row['pastdue_bucket']][1]
+    return rows
+
+
+def cached_aggregate(snapshot_id, group_by, measures=DEFAULT_MEASURES):
+    """The aggregates of the loans of a snapshot, served from the cache of the snapshot"""
+    key = '%s:%s' % (','.join(group_by), ','.join(measures))
+    return aggregate_cache.get_or_set(snapshot_id, key, lambda: aggregate(loans(snapshot_id), group_by, measures))
@@ -24,3 +24,32 @@ from django.apps import AppConfig
 class NPLPortfolioConfig(AppConfig):
     """Class configuring the NPL Portfolio App."""
     name = 'npl_portfolio'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_migrate, post_save
+
+        from common.indexes import create_brin_indexes
+        from common.ingestion import bulk_saved
+        from npl_portfolio import coverage, pricing, recoveries, summaries
+        from npl_portfolio.aggregation import aggregate_cache
+        from npl_portfolio.counterparty import Counterparty
+        from npl_portfolio.historical_repayment import HistoricalRepayment
+        from npl_portfolio.loan import Loan
+        from npl_portfolio.repayment_matrix import matrix_cache
+
+        # keep the cached repayment matrix pages and portfolio aggregates in sync with their records
+        for name, snapshot_cache, model in (('repayment_matrix', matrix_cache, HistoricalRepayment),
+                                            ('aggregates_loan', aggregate_cache, Loan),
+                                            ('aggregates_counterparty', aggregate_cache, Counterparty)):
+            post_save.connect(snapshot_cache.saved, sender=model, dispatch_uid=name + '_save')
+            post_delete.connect(snapshot_cache.saved, sender=model, dispatch_uid=name + '_delete')
+            bulk_saved.connect(snapshot_cache.bulk_saved, sender=model, dispatch_uid=name + '_bulk')
+        # invalidate the summaries, loan coverage, recovery projections and pricing simulations of snapshots whose
+        # records change
+        links = [getattr(Counterparty, field) for field in coverage.COUNTERPARTY_LINKS.values()]
+        for dependency in summaries.dependencies:
+            dependency.connect()
+        coverage.dependency.connect(links)
+        recoveries.dependency.connect()
+        pricing.dependency.connect(links)
+        post_migrate.connect(create_brin_indexes, sender=self)
@@ -0,0 +1,157 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Projection and pricing of monthly recovery cash flows of NPL loans
+
+The projection works on plain NumPy arrays (no database access), so that the loans of a snapshot can be split into
+chunks and projected in worker processes. The expected recoveries of a loan are described by:
+
+* lumps: single payments (``loan``, ``month``, ``amount``), e.g. the proceeds of a collateral sale. Payments from
+  other sources stop in the month of the first sale of a loan
+* schedules: periodic payments (``loan``, ``source``, ``first``, ``last``, ``period``, ``amount``) due every
+  ``period`` months from month ``first`` to month ``last``, e.g. forbearance instalments
+
+Months are counted from the first projected month (0). The cash flows of a loan are capped by its exposure. Prices
+and yields are computed from the portfolio cash flows with annual rates and monthly discounting at the end of each
+month.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SOURCES = ['sale', 'forbearance', 'collection', 'run_rate']
+
+# loans projected per task of a worker process
+CHUNK_SIZE = 20000
+
+HAIRCUTS = (0.0, 0.1, 0.2, 0.3)
+DELAYS = (0, 6, 12)
+
+
+def project(exposure, lumps, schedules, horizon):
+    """
+    The monthly cash flows (loans x horizon) of the loans and the portfolio cash flows by source (sources x horizon)
+
+    :param exposure: The exposure of every loan (NaN for an unknown exposure, which leaves the cash flows uncapped)
+    :param lumps: Dict of the ``loan`` (row position), ``month`` and ``amount`` arrays of single payments
+    :param schedules: Dict of the ``loan``, ``source`` (position in SOURCES), ``first``, ``last``, ``period`` and
+        ``amount`` arrays of periodic payments
+    :param horizon: The number of months projected
+    """
+    loans = len(exposure)
+    flows = np.zeros((len(SOURCES), loans, horizon))
+    months = np.arange(horizon)
+    sale_month = np.full(loans, horizon)
+    np.minimum.at(sale_month, lumps['loan'], np.clip(lumps['month'], 0, horizon))
+    inside = (lumps['month'] >= 0) & (lumps['month'] < horizon)
+    np.add.at(flows[SOURCES.index('sale')], (lumps['loan'][inside], lumps['month'][inside]), lumps['amount'][inside])
+    first, last, period = (schedules[name][:, None] for name in ('first', 'last', 'period'))
+    due = (months >= first) & (months <= last) & ((months - first) % period == 0)
+    due &= months < sale_month[schedules['loan']][:, None]
+    np.add.at(flows, (schedules['source'], schedules['loan']), due * schedules['amount'][:, None])
+    # the recoveries of a loan do not exceed its exposure
+    total = flows.sum(axis=0)
+    claim = np.where(np.isnan(exposure), np.inf, np.clip(exposure, 0, None))
+    capped = np.diff(np.minimum(np.cumsum(total, axis=1), claim[:, None]), axis=1, prepend=0)
+    scale = np.divide(capped, total, out=np.zeros_like(total), where=total > 0)
+    flows *= scale
+    return (total * scale).astype(np.float32), flows.sum(axis=1)
+
+
+def select(table, start, stop):
+    """The rows of a lumps or schedules table of the loans start to stop, with loan positions relative to start"""
+    rows = (table['loan'] >= start) & (table['loan'] < stop)
+    table = {name: values[rows] for name, values in table.items()}
+    table['loan'] = table['loan'] - start
+    return table
+
+
+def project_task(task):
+    return project(*task)
+
+
+def project_chunks(exposure, lumps, schedules, horizon, workers=1, chunk_size=CHUNK_SIZE):
+    """
+    Project the loans in chunks of chunk_size loans, in a pool of worker processes if workers > 1 and there is more
+    than one chunk. Returns the same arrays as ``project``.
+    """
+    tasks = [(exposure[start:start + chunk_size], select(lumps, start, start + chunk_size),
+              select(schedules, start, start + chunk_size), horizon)
+             for start in range(0, max(len(exposure), 1), chunk_size)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(project_task, tasks))
+    else:
+        results = [project_task(task) for task in tasks]
+    return np.concatenate([flows for flows, _ in results]), sum(sources for _, sources in results)
+
+
+def discount_factors(rates, months):
+    """The discount factors (rates x months) of annual rates at the end of every month"""
+    return (1 + np.asarray(rates, dtype=float)[:, None]) ** (-np.arange(1, months + 1) / 12)
+
+
+def present_value(cash_flows, rates):
+    """The present values of monthly cash flows at annual discount rates"""
+    return discount_factors(np.atleast_1d(rates), len(cash_flows)) @ cash_flows
+
+
+def irr(cash_flows, prices, low=-0.99, high=100.0, iterations=60):
+    """
+    The annual internal rates of return of buying monthly cash flows at prices (NaN if the price is not positive or
+    the yield is outside [low, high]). Cash flows of several scenarios (scenarios x months) are priced at one price or
+    at one price per scenario.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    prices = np.broadcast_to(prices, np.broadcast_shapes(prices.shape or (1,), cash_flows.shape[:-1]))
+
+    def value(rates):
+        factors = discount_factors(rates.reshape(-1), cash_flows.shape[-1]).reshape(rates.shape + (-1,))
+        return (cash_flows * factors).sum(axis=-1)
+
+    lower, upper = np.full(prices.shape, low), np.full(prices.shape, high)
+    for _ in range(iterations):
+        middle = (lower + upper) / 2
+        # the present value decreases with the rate
+        above = value(middle) > prices
+        lower, upper = np.where(above, middle, lower), np.where(above, upper, middle)
+    rates = (lower + upper) / 2
+    bracketed = (value(np.full(prices.shape, low)) >= prices) & (value(np.full(prices.shape, high)) <= prices)
+    return np.where(bracketed & (prices > 0), rates, np.nan)
+
+
+def sensitivities(source_flows, rates, haircuts=HAIRCUTS, delays=DELAYS):
+    """
+    Prices (delays x haircuts x rates) of the portfolio cash flows by source (sources x months) with the sale
+    proceeds reduced by the haircuts and all cash flows delayed by the numbers of months
+    """
+    sale = np.asarray(source_flows[SOURCES.index('sale')])
+    other = np.asarray(source_flows).sum(axis=0) - sale
+    prices = np.empty((len(delays), len(haircuts), len(rates)))
+    for i, delay in enumerate(delays):
+        shift = np.zeros(delay)
+        sale_value = present_value(np.concatenate([shift, sale]), rates)
+        other_value = present_value(np.concatenate([shift, other]), rates)
+        for j, haircut in enumerate(haircuts):
+            prices[i, j] = (1 - haircut) * sale_value + other_value
+    return prices
@@ -363,3 +363,9 @@ class Counterparty(models.Model):
         verbose_name = "Counterparty"
         verbose_name_plural = "Counterparties"
         unique_together = [['portfolio_id', 'counterparty_identifier']]
+        indexes = [
+            models.Index(fields=['counterparty_identifier'], name='npl_cp_identifier_idx'),
+            models.Index(fields=['snapshot_id', 'counterparty_identifier'], name='npl_cp_snapshot_idx'),
+            models.Index(fields=['legal_type_of_counterparty'], name='npl_cp_legal_type_idx'),
+            models.Index(fields=['counterparty_role'], name='npl_cp_role_idx'),
+        ]
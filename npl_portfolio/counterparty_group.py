@@ -92,3 +92,6 @@ class CounterpartyGroup(models.Model):
     class Meta:
         verbose_name = "Counterparty Group"
         verbose_name_plural = "Counterparty Groups"
+        indexes = [
+            models.Index(fields=['counterparty_group_identifier'], name='npl_cpg_identifier_idx'),
+        ]
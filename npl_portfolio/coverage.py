@@ -0,0 +1,205 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Collateral coverage and loan to value ratios of the loans of an NPL portfolio snapshot
+
+A collateral secures a loan when it references the loan (``loan_identifier``), when a mortgage of the loan registers
+a lien on it (Template 4.2) or when it is a protection of the counterparty of the loan (``Counterparty``
+many-to-many links). The links of a whole snapshot are read with a few queries and allocated with vectorized
+group operations, without visiting the loans one by one:
+
+* the value of a collateral is its latest valuation (the latest external valuation, or the guarantee amount of a
+  guarantee, if missing), less the higher ranking loans of third parties
+* the claim of a loan on a collateral is its exposure (legal balance, else principal balance), capped by the
+  mortgage amount registered for it
+* the value is allocated to the claims in the order of their lien position, claims of the same position share pro
+  rata
+
+The coverage ratio of a loan is the collateral allocated to it relative to its exposure, its loan to value the
+exposure and the claims ranking ahead of it relative to the value of its property collateral. The ratios of all
+loans of a snapshot are stored as LoanCoverage rows and removed when the data of the snapshot change.
+
+"""
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from common.cache import SnapshotDependency
+from common.ingestion import bulk_insert
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.loan import Loan
+from npl_portfolio.loan_coverage import LoanCoverage
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.mortgage import Mortgage
+from npl_portfolio.non_property_collateral import NonPropertyCollateral
+from npl_portfolio.property_collateral import PropertyCollateral
+
+# model -> lookup of the snapshot of its records
+SNAPSHOT_PATHS = {
+    Loan: ('snapshot_id',),
+    Mortgage: ('loan_identifier__snapshot_id',),
+    PropertyCollateral: ('loan_identifier__snapshot_id',),
+    NonPropertyCollateral: ('loan_identifier__snapshot_id',),
+    Counterparty: ('snapshot_id',),
+}
+
+LINK_COLUMNS = ['loan', 'collateral', 'lien_position', 'higher_ranking_loan', 'cap']
+
+# collateral model -> the many-to-many field linking counterparties to it
+COUNTERPARTY_LINKS = {PropertyCollateral: 'property_collaterals', NonPropertyCollateral: 'non_property_collaterals'}
+
+
+def snapshot_loans(snapshot_id):
+    """The exposure and counterparty of the loans of a snapshot, indexed by loan"""
+    loans = Loan.objects.filter(snapshot_id=snapshot_id).order_by('pk').values_list(
+        'pk', 'counterparty_identifier_id', Coalesce('legal_balance', 'principal_balance'))
+    frame = pd.DataFrame.from_records(list(loans), columns=['loan', 'counterparty', 'exposure']).set_index('loan')
+    frame['exposure'] = pd.to_numeric(frame['exposure']).astype(float)
+    return frame
+
+
+def collateral_links(model, snapshot_id, loans):
+    """
+    The (loan, collateral) links of a collateral model within a snapshot with the lien position, the higher ranking
+    loans and the claim cap (the mortgage amount) of every link
+    """
+    through = getattr(Counterparty, COUNTERPARTY_LINKS[model]).through
+    column = model._meta.model_name + '_id'
+    direct = pd.DataFrame.from_records(
+        list(model.objects.filter(loan_identifier__snapshot_id=snapshot_id)
+             .values_list('loan_identifier_id', 'pk', 'lien_position', 'higher_ranking_loan')),
+        columns=LINK_COLUMNS[:-1])
+    shared = pd.DataFrame.from_records(
+        list(through.objects.filter(counterparty__snapshot_id=snapshot_id).values_list('counterparty_id', column)),
+        columns=['counterparty', 'collateral'])
+    shared = loans.reset_index()[['loan', 'counterparty']].merge(shared, on='counterparty')[['loan', 'collateral']]
+    links = pd.concat([direct, shared], ignore_index=True)
+    if model is PropertyCollateral:
+        mortgages = pd.DataFrame.from_records(
+            list(Mortgage.objects.filter(loan_identifier__snapshot_id=snapshot_id, protection_identifier__isnull=False)
+                 .values_list('loan_identifier_id', 'protection_identifier_id', 'lien_position',
+                              'higher_ranking_loan', 'mortgage_amount')),
+            columns=LINK_COLUMNS)
+        # the mortgage registered for a link takes precedence over the collateral data
+        links = pd.concat([mortgages, links], ignore_index=True)
+    else:
+        links['cap'] = np.nan
+    links = links.dropna(subset=['loan', 'collateral'])
+    for name in ('lien_position', 'higher_ranking_loan', 'cap'):
+        links[name] = pd.to_numeric(links[name]).astype(float)
+    links = links.groupby(['loan', 'collateral'], as_index=False, sort=False).first()
+    return links.astype({'loan': np.int64, 'collateral': np.int64})
+
+
+def collateral_values(model, collaterals):
+    """The latest valuation of collaterals by primary key (guarantee amount of guarantees without a valuation)"""
+    value = Coalesce('latest_valuation_amount', 'latest_external_valuation_amount')
+    if model is NonPropertyCollateral:
+        value = Coalesce('latest_valuation_amount', 'latest_external_valuation_amount', 'guarantee_amount')
+    ids = np.unique(collaterals).tolist()
+    values = []
+    for i in range(0, len(ids), 5000):
+        values += list(model.objects.filter(pk__in=ids[i:i + 5000]).values_list('pk', value))
+    values = pd.DataFrame.from_records(values, columns=['collateral', 'value']).set_index('collateral')['value']
+    return pd.to_numeric(values).astype(float)
+
+
+def allocate(links, values, exposure):
+    """
+    Allocate the values of the collaterals of links (LINK_COLUMNS) to the claims of their loans by lien position.
+    Returns the links with the ``claim``, the ``allocated`` value and the ``senior`` claims ranking ahead of each link.
+    """
+    links = links.copy()
+    links['lien_position'] = links['lien_position'].fillna(1)
+    links['claim'] = np.fmin(exposure.reindex(links['loan']).fillna(0).to_numpy(), links['cap'].fillna(np.inf))
+    links['claim'] = links['claim'].clip(lower=0)
+    # third party claims ahead of the institution are a property of the collateral
+    higher = links.groupby('collateral')['higher_ranking_loan'].transform('max').fillna(0)
+    available = (values.reindex(links['collateral']).fillna(0).to_numpy() - higher).clip(lower=0)
+    links = links.sort_values(['collateral', 'lien_position'])
+    group = links.groupby(['collateral', 'lien_position'])['claim'].transform('sum')
+    position_claims = links.groupby(['collateral', 'lien_position'])['claim'].sum()
+    prior = (position_claims.groupby(level='collateral').cumsum() - position_claims).rename('prior')
+    links = links.join(prior, on=['collateral', 'lien_position'])
+    available = available.reindex(links.index)
+    allocated = np.clip(available - links['prior'], 0, group)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        links['allocated'] = np.where(group > 0, allocated * links['claim'] / group, 0)
+    links['senior'] = higher.reindex(links.index) + links['prior']
+    links['value'] = values.reindex(links['collateral']).fillna(0).to_numpy()
+    return links.sort_index()
+
+
+def loan_coverage(snapshot_id):
+    """The coverage of the loans of a snapshot as a frame of LoanCoverage field values"""
+    loans = snapshot_loans(snapshot_id)
+    frame = pd.DataFrame({'exposure': loans['exposure']}, index=loans.index)
+    for model, prefix in ((PropertyCollateral, 'property'), (NonPropertyCollateral, 'non_property')):
+        links = collateral_links(model, snapshot_id, loans)
+        links = allocate(links, collateral_values(model, links['collateral']), loans['exposure'])
+        sums = links.groupby('loan')[['allocated', 'senior', 'value']].sum()
+        frame['allocated_%s_value' % prefix] = sums['allocated'].reindex(frame.index).fillna(0)
+        if model is PropertyCollateral:
+            frame['property_value'] = sums['value'].reindex(frame.index)
+            frame['senior_claims'] = sums['senior'].reindex(frame.index)
+    exposure = frame['exposure'].where(frame['exposure'] > 0)
+    frame['coverage_ratio'] = (frame['allocated_property_value'] + frame['allocated_non_property_value']) / exposure
+    frame['property_coverage_ratio'] = frame['allocated_property_value'] / exposure
+    frame['loan_to_value'] = (frame['exposure'] + frame['senior_claims']) / \
+        frame['property_value'].where(frame['property_value'] > 0)
+    frame = frame.replace([np.inf, -np.inf], np.nan)
+    frame['snapshot_id_id'] = snapshot_id
+    return frame.rename_axis('loan_identifier_id').reset_index()
+
+
+def refresh_coverage(snapshot_ids=None):
+    """Compute and store the coverage of the loans of the snapshots (all if None), returns the number of loans"""
+    if snapshot_ids is None:
+        snapshot_ids = PortfolioSnapshot.objects.order_by('pk').values_list('pk', flat=True)
+    count = 0
+    for snapshot_id in snapshot_ids:
+        frame = loan_coverage(snapshot_id)
+        with transaction.atomic():
+            LoanCoverage.objects.filter(snapshot_id=snapshot_id).delete()
+            count += bulk_insert(LoanCoverage, frame)
+    return count
+
+
+def snapshot_coverage(snapshot_id):
+    """The coverage rows of a snapshot, computed first if the snapshot has none"""
+    coverage = LoanCoverage.objects.filter(snapshot_id=snapshot_id)
+    if not coverage.exists() and Loan.objects.filter(snapshot_id=snapshot_id).exists():
+        refresh_coverage([snapshot_id])
+    return coverage
+
+
+def invalidate(snapshot_ids=None):
+    """Remove the coverage of the snapshots, without snapshots the coverage of all snapshots"""
+    coverage = LoanCoverage.objects.all()
+    if snapshot_ids is not None:
+        coverage = coverage.filter(snapshot_id__in=snapshot_ids)
+    coverage.delete()
+
+
+# remove the coverage of snapshots whose loans, mortgages, collateral or counterparty links change
+dependency = SnapshotDependency('coverage', SNAPSHOT_PATHS, invalidate)
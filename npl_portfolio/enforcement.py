@@ -216,3 +216,6 @@ class Enforcement(models.Model):
     class Meta:
         verbose_name = "Enforcement"
         verbose_name_plural = "Enforcements"
+        indexes = [
+            models.Index(fields=['protection_identifier'], name='npl_enf_identifier_idx'),
+        ]
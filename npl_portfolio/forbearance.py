@@ -160,3 +160,6 @@ class Forbearance(models.Model):
     class Meta:
         verbose_name = "Forbearance"
         verbose_name_plural = "Forbearances"
+        indexes = [
+            models.Index(fields=['type_of_forbearance'], name='npl_forb_type_idx'),
+        ]
@@ -139,3 +139,6 @@ class HistoricalRepayment(models.Model):
         verbose_name = "Historical Repayment"
         verbose_name_plural = "Historical Repayments"
         unique_together = [['snapshot_id', 'loan_identifier', 'reference_year', 'reference_month']]
+        indexes = [
+            models.Index(fields=['type_of_collection'], name='npl_hr_collection_type_idx'),
+        ]
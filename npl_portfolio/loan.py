@@ -520,3 +520,13 @@ class Loan(models.Model):
     class Meta:
         verbose_name = "Loan"
         verbose_name_plural = "Loans"
+        unique_together = [['snapshot_id', 'loan_identifier']]
+        indexes = [
+            models.Index(fields=['loan_identifier'], name='npl_loan_identifier_idx'),
+            models.Index(fields=['days_in_pastdue'], name='npl_loan_pastdue_idx'),
+            models.Index(fields=['date_of_default'], name='npl_loan_default_date_idx'),
+            models.Index(fields=['asset_class'], name='npl_loan_asset_class_idx'),
+            models.Index(fields=['product_type'], name='npl_loan_product_type_idx'),
+            models.Index(fields=['loan_legal_status'], name='npl_loan_legal_status_idx'),
+            models.Index(fields=['forbearance_measure'], name='npl_loan_forbearance_idx'),
+        ]
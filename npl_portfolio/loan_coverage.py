@@ -0,0 +1,79 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from django.db import models
+
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+
+
+class LoanCoverage(models.Model):
+    """
+    The LoanCoverage model holds the collateral allocated to a loan of a portfolio snapshot and the resulting coverage
+    and loan to value ratios. The rows of a snapshot are computed at once by npl_portfolio.coverage and removed when
+    the loans, mortgages or collateral of the snapshot change.
+
+    """
+
+    snapshot_id = models.ForeignKey(PortfolioSnapshot, on_delete=models.CASCADE, related_name='loan_coverage',
+                                    help_text="The snapshot of the loan")
+
+    loan_identifier = models.OneToOneField(Loan, on_delete=models.CASCADE, related_name='coverage',
+                                           help_text="The loan covered")
+
+    exposure = models.FloatField(blank=True, null=True,
+                                 help_text="The legal balance of the loan (the principal balance if missing)")
+
+    property_value = models.FloatField(blank=True, null=True,
+                                       help_text="The latest valuation of the property collateral securing the loan")
+
+    senior_claims = models.FloatField(blank=True, null=True,
+                                      help_text="Claims ranking ahead of the loan on its property collateral "
+                                                "(higher ranking loans of third parties and loans of the "
+                                                "institution in better lien positions)")
+
+    allocated_property_value = models.FloatField(blank=True, null=True,
+                                                 help_text="The property collateral value allocated to the loan")
+
+    allocated_non_property_value = models.FloatField(blank=True, null=True,
+                                                     help_text="The non-property collateral and guarantee value "
+                                                               "allocated to the loan")
+
+    coverage_ratio = models.FloatField(blank=True, null=True,
+                                       help_text="All collateral allocated to the loan relative to its exposure")
+
+    property_coverage_ratio = models.FloatField(blank=True, null=True,
+                                                help_text="The property collateral allocated to the loan relative to "
+                                                          "its exposure")
+
+    loan_to_value = models.FloatField(blank=True, null=True,
+                                      help_text="The exposure and senior claims relative to the property value")
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return 'Coverage of loan %s' % self.loan_identifier_id
+
+    class Meta:
+        verbose_name = "Loan Coverage"
+        verbose_name_plural = "Loan Coverage"
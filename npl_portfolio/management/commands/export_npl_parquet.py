@@ -0,0 +1,47 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.parquet import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Exports the EBA NPL tables of a portfolio snapshot to Parquet (requires pyarrow)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', type=int, required=True, help='ID of the portfolio snapshot')
+        parser.add_argument('--directory', required=True, help='Directory of the Parquet datasets')
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise CommandError('The Parquet export requires the pyarrow package')
+        if not PortfolioSnapshot.objects.filter(pk=options['snapshot']).exists():
+            raise CommandError('Unknown portfolio snapshot: %s' % options['snapshot'])
+
+        start = time.perf_counter()
+        counts = export_snapshot(options['snapshot'], options['directory'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Exported %d rows in %.1fs' % (sum(counts.values()),
+                                                                           time.perf_counter() - start)))
@@ -0,0 +1,64 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.parquet import import_snapshot, snapshot_ids
+from npl_portfolio.summaries import refresh_summaries
+
+
+class Command(BaseCommand):
+    help = 'Imports portfolio snapshots exported with export_npl_parquet (requires pyarrow)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', required=True, help='Directory of the Parquet datasets')
+        parser.add_argument('--snapshot', type=int, action='append',
+                            help='ID of a portfolio snapshot to import (default: all snapshots of the directory)')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete snapshots with the same ID from the database before importing them')
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise CommandError('The Parquet import requires the pyarrow package')
+        stored = snapshot_ids(options['directory'])
+        selected = options['snapshot'] or stored
+        missing = set(selected) - set(stored)
+        if missing:
+            raise CommandError('Snapshots not found in %s: %s' % (options['directory'], sorted(missing)))
+
+        existing = PortfolioSnapshot.objects.filter(pk__in=selected)
+        if existing and not options['replace']:
+            raise CommandError('Snapshots already exist: %s (use --replace)' % sorted(s.pk for s in existing))
+
+        start = time.perf_counter()
+        rows = 0
+        with transaction.atomic():
+            existing.delete()
+            for snapshot_id in selected:
+                self.stdout.write('Snapshot %d' % snapshot_id)
+                rows += sum(import_snapshot(snapshot_id, options['directory'], log=self.stdout.write).values())
+        refresh_summaries(selected)
+        self.stdout.write(self.style.SUCCESS('Imported %d rows in %.1fs' % (rows, time.perf_counter() - start)))
@@ -0,0 +1,112 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+import pandas as pd
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+
+from common.ingestion import bulk_insert, identifier_map
+from npl_portfolio.models import CounterpartyGroup, Counterparty, Loan, NonPropertyCollateral, PropertyCollateral
+from npl_portfolio.models import PortfolioSnapshot
+
+"""
+Bulk load of an EBA NPL template table from a CSV file whose header holds model field names.
+
+Foreign key columns hold the natural identifiers of the referenced records (e.g. the loan_identifier column of the
+HistoricalRepayment file holds loan identifiers), which are resolved within the selected snapshot.
+
+"""
+
+# Natural keys used to resolve foreign key columns
+NATURAL_KEYS = {
+    CounterpartyGroup: 'counterparty_group_identifier',
+    Counterparty: 'counterparty_identifier',
+    Loan: 'loan_identifier',
+    PropertyCollateral: 'protection_identifier',
+    NonPropertyCollateral: 'protection_identifier',
+}
+
+
+class Command(BaseCommand):
+    help = 'Bulk loads an EBA NPL table (e.g. historicalrepayment) from CSV into a portfolio snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', help='Model name of the table, e.g. loan, counterparty, historicalrepayment')
+        parser.add_argument('path', help='CSV file with a header of model field names')
+        parser.add_argument('--snapshot', type=int, required=True, help='ID of the portfolio snapshot')
+        parser.add_argument('--portfolio', type=int, help='ID of the portfolio (for tables with a portfolio_id)')
+        parser.add_argument('--sep', default=',', help='Field separator')
+        parser.add_argument('--chunk-size', type=int, default=100000, help='Number of rows read at a time')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model('npl_portfolio', options['table'])
+        except LookupError:
+            raise CommandError('Unknown NPL table: %s' % options['table'])
+        snapshot = PortfolioSnapshot.objects.filter(pk=options['snapshot']).first()
+        if snapshot is None:
+            raise CommandError('Unknown portfolio snapshot: %s' % options['snapshot'])
+
+        fields = {f.name: f for f in model._meta.concrete_fields}
+        header = list(pd.read_csv(options['path'], sep=options['sep'], nrows=0).columns)
+        unknown = [c for c in header if c not in fields]
+        if unknown:
+            self.stdout.write(self.style.WARNING('Ignoring columns: %s' % ', '.join(unknown)))
+        usecols = [c for c in header if c in fields]
+        text = (models.TextField, models.CharField, models.ForeignKey)
+        dtype = {c: str for c in usecols if isinstance(fields[c], text)}
+
+        id_maps = {}
+        for name in usecols:
+            field = fields[name]
+            if field.is_relation and field.related_model in NATURAL_KEYS:
+                queryset = field.related_model.objects.all()
+                if 'snapshot_id' in {f.name for f in field.related_model._meta.fields}:
+                    queryset = queryset.filter(snapshot_id=snapshot)
+                id_maps[name] = identifier_map(queryset, NATURAL_KEYS[field.related_model])
+            elif field.is_relation:
+                raise CommandError('Cannot resolve foreign key column %s' % name)
+
+        start = time.perf_counter()
+        rows = 0
+        for chunk in pd.read_csv(options['path'], sep=options['sep'], usecols=usecols, dtype=dtype,
+                                 chunksize=options['chunk_size'], true_values=['Y'], false_values=['N']):
+            frame = pd.DataFrame(index=chunk.index)
+            for name in usecols:
+                if name in id_maps:
+                    frame[fields[name].attname] = chunk[name].map(id_maps[name]).astype('Int64')
+                    missing = int((frame[fields[name].attname].isna() & chunk[name].notna()).sum())
+                    if missing:
+                        self.stdout.write(self.style.WARNING('%d rows with unresolved %s' % (missing, name)))
+                else:
+                    frame[name] = chunk[name]
+            if 'snapshot_id' in fields:
+                frame['snapshot_id_id'] = snapshot.pk
+            if 'portfolio_id' in fields and options['portfolio']:
+                frame['portfolio_id_id'] = options['portfolio']
+            with transaction.atomic():
+                rows += bulk_insert(model, frame)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS('%s: %d rows in %.1fs (%s rows/sec)' % (
+            model.__name__, rows, elapsed, format(int(rows / elapsed) if elapsed else rows, ','))))
@@ -0,0 +1,45 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from npl_portfolio.coverage import refresh_coverage
+from npl_portfolio.models import PortfolioSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Computes the collateral coverage and loan to value ratios of the loans of NPL portfolio snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', type=int, action='append',
+                            help='ID of a portfolio snapshot (default: all snapshots)')
+
+    def handle(self, *args, **options):
+        snapshots = options['snapshot']
+        if snapshots:
+            missing = set(snapshots) - set(PortfolioSnapshot.objects.filter(pk__in=snapshots)
+                                           .values_list('pk', flat=True))
+            if missing:
+                raise CommandError('Snapshots not found: %s' % sorted(missing))
+        start = time.perf_counter()
+        count = refresh_coverage(snapshots)
+        self.stdout.write(self.style.SUCCESS('Computed the coverage of %d loans in %.1fs'
+                                             % (count, time.perf_counter() - start)))
@@ -0,0 +1,54 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.summaries import SUMMARIES, refresh_stale, refresh_summaries
+
+
+class Command(BaseCommand):
+    help = 'Computes the precomputed summaries of NPL portfolio snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', type=int, action='append',
+                            help='ID of a portfolio snapshot to summarise (default: all snapshots)')
+        parser.add_argument('--summary', action='append', choices=list(SUMMARIES),
+                            help='Name of a summary to compute (default: all summaries)')
+        parser.add_argument('--stale', action='store_true',
+                            help='Only compute the summaries that are stale or missing')
+
+    def handle(self, *args, **options):
+        snapshots = options['snapshot']
+        if snapshots:
+            missing = set(snapshots) - set(PortfolioSnapshot.objects.filter(pk__in=snapshots)
+                                           .values_list('pk', flat=True))
+            if missing:
+                raise CommandError('Snapshots not found: %s' % sorted(missing))
+        start = time.perf_counter()
+        if options['stale']:
+            if options['summary']:
+                raise CommandError('--stale computes every stale summary, it cannot be combined with --summary')
+            count = refresh_stale(snapshots or list(PortfolioSnapshot.objects.values_list('pk', flat=True)))
+        else:
+            count = refresh_summaries(snapshots, options['summary'])
+        self.stdout.write(self.style.SUCCESS('Computed %d summaries in %.1fs' % (count, time.perf_counter() - start)))
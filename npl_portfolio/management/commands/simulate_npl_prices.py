@@ -0,0 +1,59 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.pricing import run_simulation
+from npl_portfolio.recoveries import HORIZON, WORKERS
+from npl_portfolio.simulation import PARAMETERS, parameter_values
+
+
+class Command(BaseCommand):
+    help = 'Simulates the recovery cash flows of the loans of an NPL portfolio snapshot for Monte Carlo pricing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', type=int, required=True, help='ID of the portfolio snapshot')
+        parser.add_argument('--scenarios', type=int, default=1000, help='Number of scenarios')
+        parser.add_argument('--seed', type=int, help='Seed of the random generators (default: a random seed)')
+        parser.add_argument('--horizon', type=int, default=HORIZON, help='Number of months simulated')
+        parser.add_argument('--workers', type=int, default=WORKERS, help='Number of worker processes')
+        for name, (default, lower, upper) in PARAMETERS.items():
+            parser.add_argument('--' + name.replace('_', '-'), type=type(default),
+                                help='Simulation parameter, between %s and %s (default %s)' % (lower, upper, default))
+
+    def handle(self, *args, **options):
+        if not PortfolioSnapshot.objects.filter(pk=options['snapshot']).exists():
+            raise CommandError('Snapshot not found: %s' % options['snapshot'])
+        if options['scenarios'] < 1 or options['horizon'] < 1 or options['workers'] < 1:
+            raise CommandError('The scenarios, horizon and number of workers must be positive')
+        if options['seed'] is not None and not 0 <= options['seed'] < 2 ** 63:
+            raise CommandError('The seed must be a non-negative 63 bit integer')
+        try:
+            parameters = parameter_values({name: options[name] for name in PARAMETERS})
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        start = time.perf_counter()
+        simulation = run_simulation(options['snapshot'], options['scenarios'], options['seed'], parameters,
+                                    options['horizon'], options['workers'])
+        self.stdout.write(self.style.SUCCESS('Simulated %d scenarios of %d loans in %.1fs (simulation %d, seed %d)'
+                                             % (simulation.scenarios, simulation.loans,
+                                                time.perf_counter() - start, simulation.pk, simulation.seed)))
@@ -104,3 +104,7 @@ from npl_portfolio.forbearance import Forbearance
 from npl_portfolio.enforcement import Enforcement
 from npl_portfolio.historical_repayment import HistoricalRepayment
 from npl_portfolio.mortgage import Mortgage
+from npl_portfolio.snapshot_summary import SnapshotSummary
+from npl_portfolio.loan_coverage import LoanCoverage
+from npl_portfolio.recovery_projection import RecoveryProjection
+from npl_portfolio.pricing_simulation import PricingSimulation
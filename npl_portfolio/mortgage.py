@@ -94,3 +94,7 @@ class Mortgage(models.Model):
     class Meta:
         verbose_name = "Mortgage"
         verbose_name_plural = "Mortgages"
+        indexes = [
+            models.Index(fields=['mortgage_identifier'], name='npl_mortgage_identifier_idx'),
+            models.Index(fields=['lien_position'], name='npl_mortgage_lien_idx'),
+        ]
@@ -258,3 +258,8 @@ class NonPropertyCollateral(models.Model):
     class Meta:
         verbose_name = "Non-Property Collateral"
         verbose_name_plural = "Non-Property Collateral"
+        indexes = [
+            models.Index(fields=['protection_identifier'], name='npl_npc_identifier_idx'),
+            models.Index(fields=['collateral_type'], name='npl_npc_collateral_type_idx'),
+            models.Index(fields=['enforcement_status'], name='npl_npc_enforcement_idx'),
+        ]
@@ -0,0 +1,195 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Columnar (Parquet) snapshots of EBA NPL portfolios
+
+A portfolio snapshot is written as one Parquet dataset per table, partitioned by snapshot
+(``<directory>/<table>/snapshot_id=<pk>/part-0.parquet``), holding every table of the EBA templates, the mortgages
+and the many-to-many links between counterparties and collateral. Columns are typed after the model fields: nullable
+integers, floats, booleans, dates and timestamps. The integer ``*_choices`` fields are stored as dictionary encoded
+small integers, with the choice labels in the field metadata (e.g. for building categoricals). The import inserts
+each table with the bulk ingestion of ``common.ingestion``, in foreign key order, keeping the primary keys so that the
+relations between the tables are preserved (as ``loaddata`` would).
+
+Requires the optional pyarrow package.
+
+"""
+
+import json
+import os
+from itertools import islice
+
+from django.db import models
+from django.db.models import Q
+
+from common.ingestion import bulk_insert, reset_sequences
+from npl_portfolio.models import Portfolio, PortfolioSnapshot, CounterpartyGroup, Counterparty, Loan, \
+    PropertyCollateral, NonPropertyCollateral, Mortgage, Enforcement, Forbearance, ExternalCollection, \
+    HistoricalRepayment
+
+EXPORT_CHUNK_SIZE = 50000
+COMPRESSION = 'zstd'
+
+# Tables in foreign key order with the filter selecting the rows of a snapshot. Portfolios and counterparty groups
+# are shared between snapshots, the rows referenced by the snapshot are written and inserted when missing.
+SHARED_TABLES = {
+    Portfolio: lambda pk: Q(counterparty__snapshot_id=pk) | Q(historicalrepayment__snapshot_id=pk),
+    CounterpartyGroup: lambda pk: Q(counterparty__snapshot_id=pk),
+}
+SNAPSHOT_TABLES = {
+    PortfolioSnapshot: lambda pk: Q(pk=pk),
+    Counterparty: lambda pk: Q(snapshot_id=pk),
+    Loan: lambda pk: Q(snapshot_id=pk),
+    PropertyCollateral: lambda pk: Q(loan_identifier__snapshot_id=pk),
+    NonPropertyCollateral: lambda pk: Q(loan_identifier__snapshot_id=pk),
+    Mortgage: lambda pk: Q(loan_identifier__snapshot_id=pk),
+    Enforcement: lambda pk: Q(counterparty_identifier__snapshot_id=pk),
+    Forbearance: lambda pk: Q(loan_identifier__snapshot_id=pk) | Q(counterparty_identifier__snapshot_id=pk),
+    ExternalCollection: lambda pk: Q(loan_identifier__snapshot_id=pk) | Q(counterparty_identifier__snapshot_id=pk),
+    HistoricalRepayment: lambda pk: Q(snapshot_id=pk),
+    Counterparty.property_collaterals.through: lambda pk: Q(counterparty__snapshot_id=pk),
+    Counterparty.non_property_collaterals.through: lambda pk: Q(counterparty__snapshot_id=pk),
+}
+TABLES = {**SHARED_TABLES, **SNAPSHOT_TABLES}
+
+
+def table_name(model):
+    return model._meta.model_name
+
+
+def partition_path(directory, model, snapshot_id):
+    return os.path.join(directory, table_name(model), 'snapshot_id=%d' % snapshot_id, 'part-0.parquet')
+
+
+def snapshot_ids(directory):
+    """The snapshots stored in a directory"""
+    path = os.path.join(directory, table_name(PortfolioSnapshot))
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(name.split('=')[1]) for name in os.listdir(path) if name.startswith('snapshot_id='))
+
+
+def arrow_type(field):
+    """The Arrow type of the column of a model field"""
+    import pyarrow as pa
+
+    target = field.target_field if field.is_relation else field
+    if field.choices and isinstance(target, models.IntegerField):
+        return pa.int16()
+    if isinstance(target, (models.AutoField, models.BigAutoField, models.IntegerField, models.BigIntegerField,
+                           models.SmallIntegerField)):
+        return pa.int64()
+    if isinstance(target, models.FloatField):
+        return pa.float64()
+    if isinstance(target, models.BooleanField):
+        return pa.bool_()
+    if isinstance(target, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(target, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(model):
+    import pyarrow as pa
+
+    fields = []
+    for field in model._meta.concrete_fields:
+        metadata = None
+        if field.choices:
+            metadata = {'choices': json.dumps({str(value): str(label) for value, label in field.flatchoices})}
+        fields.append(pa.field(field.attname, arrow_type(field), metadata=metadata))
+    return pa.schema(fields)
+
+
+def write_table(model, queryset, path, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write the rows of a queryset to a Parquet file in chunks, returns the number of rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(model)
+    fields = model._meta.concrete_fields
+    rows = queryset.order_by('pk').values_list(*[f.attname for f in fields]).iterator(chunk_size=chunk_size)
+    count = 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pq.ParquetWriter(path, schema, compression=COMPRESSION) as writer:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            columns = list(zip(*chunk)) if chunk else [()] * len(fields)
+            arrays = []
+            for field, column, values in zip(fields, schema, columns):
+                if isinstance(field, models.JSONField):
+                    values = [None if v is None else json.dumps(v) for v in values]
+                arrays.append(pa.array(values, type=column.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+            if len(chunk) < chunk_size:
+                return count
+
+
+def export_snapshot(snapshot_id, directory, log=None):
+    """Write the tables of a snapshot, returns {table: rows}"""
+    counts = {}
+    for model, scope in TABLES.items():
+        queryset = model._default_manager.filter(scope(snapshot_id)).distinct()
+        counts[table_name(model)] = write_table(model, queryset, partition_path(directory, model, snapshot_id))
+        if log:
+            log('%s: %d rows' % (table_name(model), counts[table_name(model)]))
+    return counts
+
+
+def read_table(model, path):
+    """The rows of a Parquet file as a DataFrame of model attnames with nullable dtypes"""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    nullable = {pa.int64(): pd.Int64Dtype(), pa.int16(): pd.Int64Dtype(), pa.float64(): pd.Float64Dtype(),
+                pa.bool_(): pd.BooleanDtype()}
+    frame = pq.read_table(path).to_pandas(types_mapper=nullable.get)
+    for field in model._meta.concrete_fields:
+        if field.attname not in frame.columns:
+            continue
+        if isinstance(field, models.JSONField):
+            frame[field.attname] = frame[field.attname].map(lambda v: None if v is None else json.loads(v))
+    return frame
+
+
+def import_snapshot(snapshot_id, directory, log=None):
+    """
+    Insert the tables of a stored snapshot (which must not exist in the database), returns {table: rows}. Shared
+    rows (portfolios, counterparty groups) are inserted when missing.
+    """
+    counts = {}
+    for model in TABLES:
+        path = partition_path(directory, model, snapshot_id)
+        if not os.path.exists(path):
+            continue
+        frame = read_table(model, path)
+        if model in SHARED_TABLES:
+            pk = model._meta.pk.attname
+            existing = set(model._default_manager.filter(pk__in=frame[pk].tolist()).values_list('pk', flat=True))
+            frame = frame[~frame[pk].isin(existing)]
+        counts[table_name(model)] = bulk_insert(model, frame)
+        if log:
+            log('%s: %d rows' % (table_name(model), counts[table_name(model)]))
+    reset_sequences(list(TABLES))
+    return counts
@@ -0,0 +1,156 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Monte Carlo pricing of NPL portfolio snapshots
+
+The loans of a snapshot are described by the inputs of the recovery projection (npl_portfolio.recoveries) and their
+collateral coverage (npl_portfolio.coverage), and simulated by npl_portfolio.simulation:
+
+* the payments of a loan (forbearance, collection and run rate) are projected without collateral sales and averaged
+  into a monthly payment until the last projected payment
+* a loan with a pending sale of enforced collateral realises the expected sale proceeds in the expected sale month,
+  other secured loans realise the property collateral value allocated to them (latest valuations, by lien position)
+  after ENFORCEMENT_MONTHS, together with the non-property collateral allocated to them
+
+The portfolio cash flows of every scenario are stored as a PricingSimulation, from which the distribution of prices
+at discount rates and of yields at bid prices are computed on request. Simulations are flagged as stale when the data
+of their snapshot change.
+
+"""
+
+import io
+import secrets
+
+import numpy as np
+import pandas as pd
+
+from common.cache import SnapshotDependency
+from npl_portfolio import coverage, recoveries
+from npl_portfolio.cashflows import discount_factors, irr, project_chunks
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.pricing_simulation import PricingSimulation
+from npl_portfolio.simulation import parameter_values, simulate
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# model -> lookups of the snapshot of its records
+SNAPSHOT_PATHS = {**coverage.SNAPSHOT_PATHS, **recoveries.SNAPSHOT_PATHS}
+
+
+def simulation_loans(snapshot_id, start, horizon, workers=1):
+    """The loan arrays of the simulation of a snapshot (see npl_portfolio.simulation)"""
+    loans, lumps, schedules = recoveries.snapshot_inputs(snapshot_id, start)
+    exposure = loans['exposure'].to_numpy(dtype=float)
+    no_sales = {name: values[:0] for name, values in lumps.items()}
+    payments, _ = project_chunks(exposure, no_sales, schedules, horizon, workers)
+    paying = payments > 0
+    end = np.where(paying.any(axis=1), horizon - np.argmax(paying[:, ::-1], axis=1), 0)
+    rate = np.divide(payments.sum(axis=1, dtype=float), end, out=np.zeros(len(loans)), where=end > 0)
+    sale = np.bincount(lumps['loan'], lumps['amount'], len(loans))
+    sale_month = np.full(len(loans), recoveries.ENFORCEMENT_MONTHS - 1)
+    np.minimum.at(sale_month, lumps['loan'], lumps['month'])
+    allocated = pd.DataFrame.from_records(
+        list(coverage.snapshot_coverage(snapshot_id).values_list(
+            'loan_identifier_id', 'allocated_property_value', 'allocated_non_property_value')),
+        columns=['loan', 'property', 'non_property']).set_index('loan').reindex(loans.index).fillna(0)
+    pending = sale > 0
+    return {
+        'exposure': np.where(np.isnan(exposure), np.inf, np.clip(exposure, 0, None)),
+        'rate': rate,
+        'end': end,
+        'value': np.where(pending, sale, allocated['property'].to_numpy(dtype=float)),
+        'other': np.where(pending, 0, allocated['non_property'].to_numpy(dtype=float)),
+        'month': sale_month,
+    }
+
+
+def run_simulation(snapshot_id, scenarios, seed=None, parameters=None, horizon=recoveries.HORIZON,
+                   workers=1):
+    """
+    Simulate the recovery cash flows of the loans of a snapshot and store them, returns the PricingSimulation
+
+    :param snapshot_id: The portfolio snapshot
+    :param scenarios: The number of scenarios
+    :param seed: The seed of the random generators (a random seed is drawn and stored if None)
+    :param parameters: The simulation parameters (see npl_portfolio.simulation.PARAMETERS), missing ones take their
+        defaults
+    :param horizon: The number of months simulated
+    :param workers: The number of worker processes
+    """
+    parameters = parameter_values(parameters)
+    seed = secrets.randbits(63) if seed is None else seed
+    start = recoveries.start_month(PortfolioSnapshot.objects.get(pk=snapshot_id))
+    loans = simulation_loans(snapshot_id, start, horizon, workers)
+    flows = simulate(loans, parameters, scenarios, seed, horizon, workers)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, cash_flows=flows.astype(np.float32))
+    return PricingSimulation.objects.create(snapshot_id_id=snapshot_id, scenarios=scenarios, seed=seed,
+                                            parameters=parameters, start_date=start.start_time.date(),
+                                            horizon=horizon, loans=len(loans['exposure']),
+                                            arrays=buffer.getvalue())
+
+
+def scenario_flows(simulation):
+    """The monthly portfolio cash flows of the scenarios of a simulation (scenarios x months)"""
+    with np.load(io.BytesIO(bytes(simulation.arrays))) as stored:
+        return stored['cash_flows'].astype(float)
+
+
+def statistics(values):
+    """The mean, standard deviation and QUANTILES of values, ignoring NaN (None if all are NaN)"""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'mean': None, 'std': None, 'quantiles': {str(q): None for q in QUANTILES}}
+    return {'mean': float(values.mean()), 'std': float(values.std()),
+            'quantiles': {str(q): float(v) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))}}
+
+
+def price_distribution(simulation, rates=recoveries.DEFAULT_RATES, prices=()):
+    """
+    The expected monthly cash flows of a simulation, the distribution of the present values of the scenarios at the
+    annual discount rates and the distribution of their yields at the prices, with the probability that the
+    undiscounted cash flows fall short of a price
+    """
+    flows = scenario_flows(simulation)
+    values = flows @ discount_factors(list(rates), simulation.horizon).T
+    totals = flows.sum(axis=1)
+    return {
+        'simulation': simulation.pk,
+        'snapshot': simulation.snapshot_id_id,
+        'scenarios': simulation.scenarios,
+        'stale': simulation.stale,
+        'months': recoveries.months(simulation),
+        'expected_cash_flows': flows.mean(axis=0).tolist(),
+        'prices': [dict(rate=rate, **statistics(values[:, i])) for i, rate in enumerate(rates)],
+        'yields': [dict(price=price, probability_of_loss=float((totals < price).mean()),
+                        **statistics(irr(flows, price))) for price in prices],
+    }
+
+
+def mark_stale(snapshot_ids=None):
+    """Flag the simulations of the snapshots as stale, without snapshots the simulations of all snapshots"""
+    simulations = PricingSimulation.objects.filter(stale=False)
+    if snapshot_ids is not None:
+        simulations = simulations.filter(snapshot_id__in=snapshot_ids)
+    simulations.update(stale=True)
+
+
+# flag the simulations of snapshots whose data change as stale
+dependency = SnapshotDependency('pricing', SNAPSHOT_PATHS, mark_stale)
@@ -0,0 +1,66 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from django.db import models
+
+from npl_portfolio.models import PortfolioSnapshot
+
+
+class PricingSimulation(models.Model):
+    """
+    The PricingSimulation model holds a Monte Carlo simulation of the recovery cash flows of the loans of a portfolio
+    snapshot: its parameters and the monthly portfolio cash flows of every scenario as compressed NumPy arrays.
+    Simulations are run by npl_portfolio.pricing and flagged as stale when the data of their snapshot change.
+
+    """
+
+    snapshot_id = models.ForeignKey(PortfolioSnapshot, on_delete=models.CASCADE, related_name='pricing_simulations',
+                                    help_text="The snapshot of the simulated loans")
+
+    scenarios = models.IntegerField(help_text="The number of scenarios simulated")
+
+    seed = models.BigIntegerField(help_text="The seed of the random generators of the scenarios")
+
+    parameters = models.JSONField(default=dict,
+                                  help_text="The collateral value haircut, volatility and correlation, the cure "
+                                            "probability and months, and the mean enforcement delay")
+
+    start_date = models.DateField(help_text="The first month simulated (the month after the cutoff date)")
+
+    horizon = models.IntegerField(help_text="The number of months simulated")
+
+    loans = models.IntegerField(default=0, help_text="The number of loans simulated")
+
+    arrays = models.BinaryField(help_text="The monthly portfolio cash flows of the scenarios in the NumPy npz format")
+
+    stale = models.BooleanField(default=False,
+                                help_text="The data of the snapshot changed after the simulation")
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return 'Pricing simulation %s of snapshot %s' % (self.pk, self.snapshot_id_id)
+
+    class Meta:
+        verbose_name = "Pricing Simulation"
+        verbose_name_plural = "Pricing Simulations"
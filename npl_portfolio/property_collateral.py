@@ -283,3 +283,8 @@ class PropertyCollateral(models.Model):
     class Meta:
         verbose_name = "Property Collateral"
         verbose_name_plural = "Property Collateral"
+        indexes = [
+            models.Index(fields=['protection_identifier'], name='npl_pc_identifier_idx'),
+            models.Index(fields=['type_of_property'], name='npl_pc_property_type_idx'),
+            models.Index(fields=['enforcement_status'], name='npl_pc_enforcement_idx'),
+        ]
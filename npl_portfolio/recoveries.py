@@ -0,0 +1,316 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Expected recovery cash flows of the loans of an NPL portfolio snapshot
+
+The recovery data of a whole snapshot are read with a few queries and turned into the payments of every loan
+(see npl_portfolio.cashflows), which are projected month by month (in worker processes with the
+refresh_npl_recoveries command):
+
+* sale: the pending sale of an enforced collateral, at the agreed sale price some months after the sale agreed date,
+  else at the reserve price of the next court auction some months after the auction, else at the court appraisal
+  after an average enforcement duration, less the costs at the end of the sale
+* forbearance: the repayments under the forbearance terms at their frequency until the end of the forbearance,
+  increased by the repayment step up from its date
+* collection: the average monthly cash recoveries of an external collection agent with a repayment plan, until the
+  balance sent to the agent is recovered
+* run_rate: the average monthly repayments (other than collateral sales) of the historical repayments of the last
+  months before the cutoff date, for loans without forbearance or collection payments
+
+Records of a counterparty, rather than of a loan, are shared by the loans of the counterparty pro rata to their
+exposure. The projection of a snapshot is stored as a RecoveryProjection and removed when its data change; prices
+and yields are computed from the stored portfolio cash flows.
+
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models.functions import Coalesce
+
+from common.cache import SnapshotDependency, snapshot_records
+from npl_portfolio.cashflows import DELAYS, HAIRCUTS, SOURCES, irr, present_value, project_chunks, sensitivities
+from npl_portfolio.coverage import snapshot_loans
+from npl_portfolio.enforcement import Enforcement
+from npl_portfolio.external_collection import ExternalCollection
+from npl_portfolio.forbearance import Forbearance
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.recovery_projection import RecoveryProjection
+
+HORIZON = getattr(settings, 'NPL_RECOVERY_HORIZON', 120)
+WORKERS = getattr(settings, 'NPL_RECOVERY_WORKERS', None) or os.cpu_count() or 1
+
+# months from a sale agreement or a court auction to the receipt of the proceeds
+SALE_COMPLETION_MONTHS = 3
+AUCTION_SETTLEMENT_MONTHS = 3
+# months to the sale of an enforced collateral without a sale agreement or auction date
+ENFORCEMENT_MONTHS = 24
+# months of historical repayments averaged into a run rate
+RUN_RATE_MONTHS = 12
+
+DEFAULT_RATES = (0.05, 0.1, 0.15, 0.2)
+
+# months between repayments by forbearance repayment frequency (monthly, quarterly, semi-annually, annually, daily)
+FREQUENCY_MONTHS = {0: 1, 1: 3, 2: 6, 3: 12, 4: 1}
+DAILY = 4
+
+# model -> lookups of the snapshot of its records
+SNAPSHOT_PATHS = {
+    Loan: ('snapshot_id',),
+    HistoricalRepayment: ('snapshot_id',),
+    Enforcement: ('counterparty_identifier__snapshot_id',
+                  'property_collateral_identifier__loan_identifier__snapshot_id',
+                  'non_property_collateral_identifier__loan_identifier__snapshot_id'),
+    Forbearance: ('loan_identifier__snapshot_id', 'counterparty_identifier__snapshot_id'),
+    ExternalCollection: ('loan_identifier__snapshot_id', 'counterparty_identifier__snapshot_id'),
+}
+
+
+def start_month(snapshot):
+    """The first projected month (the month after the cutoff date, else after the creation of the snapshot)"""
+    return pd.Period(snapshot.cutoff_date or snapshot.creation_date, freq='M') + 1
+
+
+def month_index(dates, start):
+    """The months from the start month to dates (NaN for missing dates)"""
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce')
+    return (dates.dt.year * 12 + dates.dt.month - (start.year * 12 + start.month)).to_numpy(dtype=float)
+
+
+def assign(frame, loans):
+    """
+    The rows of a frame of records with a ``loan`` or ``counterparty`` column, with the position of their loan in
+    loans and the ``weight`` of the loan (the share of the counterparty exposure for records of a counterparty)
+    """
+    if frame.empty or loans.empty:
+        return frame.iloc[:0].assign(weight=np.empty(0)).astype({'loan': np.int64})
+    positions = pd.Series(np.arange(len(loans)), index=loans.index)
+    direct = frame[frame['loan'].notna()].assign(weight=1.0)
+    shared = frame[frame['loan'].isna() & frame['counterparty'].notna()].drop(columns='loan')
+    borrowers = loans.reset_index()[['loan', 'counterparty', 'exposure']]
+    borrowers['exposure'] = borrowers['exposure'].fillna(0).clip(lower=0)
+    counterparty = borrowers.groupby('counterparty')['exposure']
+    borrowers['weight'] = np.where(counterparty.transform('sum') > 0,
+                                   borrowers['exposure'] / counterparty.transform('sum'),
+                                   1 / counterparty.transform('count'))
+    shared = shared.merge(borrowers[['loan', 'counterparty', 'weight']], on='counterparty')
+    rows = pd.concat([direct, shared], ignore_index=True)
+    rows['loan'] = positions.reindex(rows['loan'].astype(float)).to_numpy()
+    return rows[rows['loan'].notna()].astype({'loan': np.int64})
+
+
+def records(queryset, columns):
+    return pd.DataFrame.from_records(list(queryset.values_list(*columns.values())), columns=list(columns))
+
+
+def sale_lumps(snapshot_id, loans, start):
+    """The expected proceeds of the pending collateral sales of the loans"""
+    frame = records(snapshot_records(Enforcement, snapshot_id, SNAPSHOT_PATHS).filter(sold_date__isnull=True,
+                                                                      funds_remitted_full_date__isnull=True), {
+        'loan': Coalesce('property_collateral_identifier__loan_identifier_id',
+                         'non_property_collateral_identifier__loan_identifier_id'),
+        'counterparty': 'counterparty_identifier_id',
+        'agreed_price': 'sale_agreed_price', 'agreed_date': 'sale_agreed_date',
+        'reserve_price': 'court_auction_reserve_price_for_next_auction', 'auction_date': 'next_auction_date',
+        'appraisal': 'court_appraisal_amount', 'costs': 'costs_at_end_of_sale'})
+    for name in ('agreed_price', 'reserve_price', 'appraisal', 'costs'):
+        frame[name] = pd.to_numeric(frame[name]).astype(float)
+    agreed, auction = frame['agreed_price'].notna(), frame['auction_date'].notna() & frame['reserve_price'].notna()
+    amount = np.select([agreed, auction], [frame['agreed_price'], frame['reserve_price']], frame['appraisal'])
+    agreed_month = np.nan_to_num(month_index(frame['agreed_date'], start), nan=-1) + SALE_COMPLETION_MONTHS
+    auction_month = month_index(frame['auction_date'], start) + AUCTION_SETTLEMENT_MONTHS
+    frame['month'] = np.select([agreed, auction], [agreed_month, auction_month], ENFORCEMENT_MONTHS - 1)
+    frame['amount'] = np.clip(amount - frame['costs'].fillna(0).to_numpy(), 0, None)
+    frame = assign(frame[frame['amount'] > 0], loans)
+    # proceeds expected in the past are expected in the first month
+    return {'loan': frame['loan'].to_numpy(), 'month': frame['month'].clip(lower=0).to_numpy(dtype=np.int64),
+            'amount': (frame['amount'] * frame['weight']).to_numpy(dtype=float)}
+
+
+def forbearance_schedules(snapshot_id, loans, start):
+    """The repayments of the loans under their forbearance terms"""
+    frame = records(snapshot_records(Forbearance, snapshot_id, SNAPSHOT_PATHS).filter(
+        repayment_amount_under_forbearance__isnull=False), {
+        'loan': 'loan_identifier_id', 'counterparty': 'counterparty_identifier_id',
+        'amount': 'repayment_amount_under_forbearance', 'frequency': 'repayment_frequency_under_forbearance',
+        'start': 'start_date_of_forbearance', 'end': 'end_date_of_forbearance',
+        'step_up': 'amount_of_repayment_step_up', 'step_up_date': 'date_of_repayment_step_up'})
+    frame['period'] = frame['frequency'].map(FREQUENCY_MONTHS).fillna(1).astype(np.int64)
+    frame['amount'] = pd.to_numeric(frame['amount']).astype(float)
+    frame['amount'] = frame['amount'].where(frame['frequency'] != DAILY, frame['amount'] * 365 / 12)
+    frame['first'] = np.nan_to_num(month_index(frame['start'], start), nan=0)
+    frame['last'] = np.nan_to_num(month_index(frame['end'], start), nan=np.iinfo(np.int32).max)
+    step_up = frame[frame['step_up'].notna() & frame['step_up_date'].notna()].copy()
+    step_up['amount'] = pd.to_numeric(step_up['step_up']).astype(float)
+    # the step up is due with the repayments from its date
+    step_up_month = month_index(step_up['step_up_date'], start)
+    step_up['first'] = step_up['first'] + np.ceil((step_up_month - step_up['first']).clip(lower=0)
+                                                  / step_up['period']) * step_up['period']
+    frame = pd.concat([frame, step_up], ignore_index=True)
+    return frame[(frame['last'] >= 0) & (frame['amount'] > 0)]
+
+
+def collection_schedules(snapshot_id, loans, start):
+    """The recoveries of external collection agents with a repayment plan"""
+    frame = records(snapshot_records(ExternalCollection, snapshot_id, SNAPSHOT_PATHS).filter(
+        repayment_plan=True, cash_recoveries__gt=0, date_returned_from_agent__isnull=True), {
+        'loan': 'loan_identifier_id', 'counterparty': 'counterparty_identifier_id',
+        'recoveries': 'cash_recoveries', 'balance': 'balance_amount_sent_to_agent', 'sent': 'date_sent_to_agent'})
+    months = np.nan_to_num(-month_index(frame['sent'], start), nan=RUN_RATE_MONTHS).clip(min=1)
+    recoveries = pd.to_numeric(frame['recoveries']).astype(float)
+    frame['amount'] = recoveries / months
+    outstanding = (pd.to_numeric(frame['balance']).astype(float) - recoveries).fillna(np.inf)
+    frame['first'], frame['period'] = 0, 1
+    frame['last'] = np.ceil(outstanding / frame['amount']).clip(upper=np.iinfo(np.int32).max) - 1
+    return frame[frame['last'] >= 0]
+
+
+def run_rates(snapshot_id, loans, start):
+    """The average monthly repayments of the loans in the RUN_RATE_MONTHS months before the start month"""
+    first = start - RUN_RATE_MONTHS
+    frame = records(HistoricalRepayment.objects.filter(snapshot_id=snapshot_id, loan_identifier__isnull=False), {
+        'loan': 'loan_identifier_id', 'year': 'reference_year', 'month': 'reference_month',
+        'total': 'history_of_total_repayments', 'sales': 'history_of_repayments_from_collateral_sales'})
+    reference = frame['year'] * 12 + frame['month']
+    frame = frame[(reference >= first.year * 12 + first.month) & (reference < start.year * 12 + start.month)]
+    repaid = pd.to_numeric(frame['total']).astype(float).fillna(0) - \
+        pd.to_numeric(frame['sales']).astype(float).fillna(0)
+    frame = repaid.groupby(frame['loan']).sum().div(RUN_RATE_MONTHS).rename('amount').reset_index()
+    frame['counterparty'], frame['first'], frame['period'] = np.nan, 0, 1
+    frame['last'] = np.iinfo(np.int32).max
+    return frame[frame['amount'] > 0]
+
+
+def snapshot_inputs(snapshot_id, start):
+    """The exposure, payments (lumps) and periodic payments (schedules) of the loans of a snapshot"""
+    loans = snapshot_loans(snapshot_id)
+    tables = []
+    for source, schedules in (('forbearance', forbearance_schedules), ('collection', collection_schedules)):
+        table = assign(schedules(snapshot_id, loans, start), loans)
+        tables.append(table.assign(source=SOURCES.index(source), amount=table['amount'] * table['weight']))
+    paying = np.unique(np.concatenate([table['loan'].to_numpy() for table in tables]))
+    table = assign(run_rates(snapshot_id, loans, start), loans)
+    tables.append(table[~table['loan'].isin(paying)].assign(source=SOURCES.index('run_rate')))
+    table = pd.concat(tables, ignore_index=True)
+    schedules = {name: table[name].to_numpy(dtype=np.int64) for name in ('loan', 'source', 'first', 'last', 'period')}
+    schedules['amount'] = table['amount'].to_numpy(dtype=float)
+    return loans, sale_lumps(snapshot_id, loans, start), schedules
+
+
+def project_snapshot(snapshot_id, horizon=HORIZON, workers=1):
+    """Project and store the recovery cash flows of the loans of a snapshot, returns the RecoveryProjection"""
+    snapshot = PortfolioSnapshot.objects.get(pk=snapshot_id)
+    start = start_month(snapshot)
+    loans, lumps, schedules = snapshot_inputs(snapshot_id, start)
+    flows, source_flows = project_chunks(loans['exposure'].to_numpy(dtype=float), lumps, schedules, horizon, workers)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, loan=loans.index.to_numpy(dtype=np.int64), cash_flows=flows)
+    projection, _ = RecoveryProjection.objects.update_or_create(snapshot_id_id=snapshot_id, defaults={
+        'start_date': start.start_time.date(), 'horizon': horizon, 'loans': len(loans),
+        'cash_flows': {source: source_flows[i].tolist() for i, source in enumerate(SOURCES)},
+        'arrays': buffer.getvalue()})
+    return projection
+
+
+def refresh_projections(snapshot_ids=None, horizon=HORIZON, workers=1):
+    """Project the snapshots (all if None), returns the number of loans projected"""
+    if snapshot_ids is None:
+        snapshot_ids = PortfolioSnapshot.objects.order_by('pk').values_list('pk', flat=True)
+    return sum(project_snapshot(snapshot_id, horizon, workers).loans for snapshot_id in snapshot_ids)
+
+
+def snapshot_projection(snapshot_id):
+    """
+    The stored projection of a snapshot, projected first if missing. Called on the request path, the projection runs
+    in the current process (worker processes are left to the refresh_npl_recoveries command).
+    """
+    projection = RecoveryProjection.objects.filter(snapshot_id=snapshot_id).first()
+    return projection if projection is not None else project_snapshot(snapshot_id, workers=1)
+
+
+def parse_numbers(value, default=()):
+    """Parse a comma separated list of numbers (the default if empty), raises ValueError for invalid numbers"""
+    if not value:
+        return list(default)
+    try:
+        numbers = [float(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValueError('A comma separated list of numbers is required')
+    if not all(np.isfinite(numbers)):
+        raise ValueError('A comma separated list of numbers is required')
+    return numbers
+
+
+def months(projection):
+    """The labels of the projected months"""
+    start = pd.Period(projection.start_date, freq='M')
+    return [str(start + i) for i in range(projection.horizon)]
+
+
+def source_flows(projection):
+    """The portfolio cash flows of a projection (sources x months)"""
+    return np.array([projection.cash_flows[source] for source in SOURCES], dtype=float).reshape(len(SOURCES), -1)
+
+
+def loan_flows(projection):
+    """The loans and their cash flows (loans x months) of a projection"""
+    with np.load(io.BytesIO(bytes(projection.arrays))) as stored:
+        return {'loan': stored['loan'], 'cash_flows': stored['cash_flows']}
+
+
+def pricing(projection, rates=DEFAULT_RATES, prices=()):
+    """
+    The portfolio cash flows of a projection, their present values at the annual discount rates, the yields at the
+    prices and the present values with haircuts of the sale proceeds and delays of all cash flows
+    """
+    flows = source_flows(projection)
+    total = flows.sum(axis=0)
+    rates = list(rates)
+    grid = sensitivities(flows, rates)
+    return {
+        'snapshot': projection.snapshot_id_id,
+        'loans': projection.loans,
+        'months': months(projection),
+        'cash_flows': dict(zip(SOURCES + ['total'], np.vstack([flows, total]).tolist())),
+        'total': float(total.sum()),
+        'prices': [{'rate': rate, 'price': float(price)} for rate, price in zip(rates, present_value(total, rates))],
+        'yields': [{'price': price, 'irr': None if np.isnan(rate) else float(rate)}
+                   for price, rate in zip(prices, irr(total, prices) if len(prices) else [])],
+        'sensitivities': [{'delay': int(delay), 'haircut': haircut, 'rate': rate, 'price': float(grid[i, j, k])}
+                          for i, delay in enumerate(DELAYS) for j, haircut in enumerate(HAIRCUTS)
+                          for k, rate in enumerate(rates)],
+    }
+
+
+def invalidate(snapshot_ids=None):
+    """Remove the projections of the snapshots, without snapshots the projections of all snapshots"""
+    projections = RecoveryProjection.objects.all()
+    if snapshot_ids is not None:
+        projections = projections.filter(snapshot_id__in=snapshot_ids)
+    projections.delete()
+
+
+# remove the projections of snapshots whose loans or recovery data change
+dependency = SnapshotDependency('recoveries', SNAPSHOT_PATHS, invalidate)
@@ -0,0 +1,60 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from django.db import models
+
+from npl_portfolio.models import PortfolioSnapshot
+
+
+class RecoveryProjection(models.Model):
+    """
+    The RecoveryProjection model holds the projected monthly recovery cash flows of the loans of a portfolio snapshot:
+    the portfolio cash flows by source and the cash flows of every loan as compressed NumPy arrays. Projections are
+    computed by npl_portfolio.recoveries and removed when the loans or recovery data of the snapshot change.
+
+    """
+
+    snapshot_id = models.OneToOneField(PortfolioSnapshot, on_delete=models.CASCADE,
+                                       related_name='recovery_projection',
+                                       help_text="The snapshot of the projected loans")
+
+    start_date = models.DateField(help_text="The first month of the projection (the month after the cutoff date)")
+
+    horizon = models.IntegerField(help_text="The number of months projected")
+
+    loans = models.IntegerField(default=0, help_text="The number of loans projected")
+
+    cash_flows = models.JSONField(default=dict,
+                                  help_text="The monthly portfolio cash flows by source (sale, forbearance, "
+                                            "collection, run_rate)")
+
+    arrays = models.BinaryField(help_text="The loans and their monthly cash flows in the NumPy npz format")
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return 'Recovery projection of snapshot %s' % self.snapshot_id_id
+
+    class Meta:
+        verbose_name = "Recovery Projection"
+        verbose_name_plural = "Recovery Projections"
@@ -0,0 +1,158 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+The EBA Template 5 repayment matrix (loans x reference months) of the normalised HistoricalRepayment records
+
+The matrix is pivoted in the database: one aggregate per reference month and measure (conditional aggregation),
+grouped by loan, for one page of loans at a time. Rendered pages are cached per snapshot (see common.cache). Saving
+or deleting repayment records invalidates the pages of their snapshot (and of the all-snapshots matrix), bulk writes
+invalidate all pages.
+
+``dense_matrix`` returns the whole matrix of a selection of records as NumPy arrays for analytical use (the API
+``matrix`` action of historical repayments).
+
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import F, Max, Q, Sum
+
+from common.cache import SnapshotCache
+from npl_portfolio.historical_repayment import HistoricalRepayment
+
+PAGE_SIZE = 100
+CACHE_TIMEOUT = getattr(settings, 'REPAYMENT_MATRIX_CACHE_TIMEOUT', 3600)
+CACHE_PREFIX = 'repayment_matrix'
+
+matrix_cache = SnapshotCache(CACHE_PREFIX, CACHE_TIMEOUT)
+
+# measure -> aggregate over the records of a loan in a reference month (records are unique per snapshot)
+MEASURES = {
+    'total': lambda condition: Sum('history_of_total_repayments', filter=condition),
+    'collateral': lambda condition: Sum('history_of_repayments_from_collateral_sales', filter=condition),
+    'collection_type': lambda condition: Max('type_of_collection', filter=condition),
+    'agent_name': lambda condition: Max('name_of_external_collection_agent', filter=condition),
+}
+
+
+def repayment_records(snapshot_id=None, loan=None):
+    """The repayment records of a snapshot (all snapshots if None), optionally of loans matching an identifier"""
+    queryset = HistoricalRepayment.objects.filter(loan_identifier__isnull=False, reference_year__isnull=False,
+                                                  reference_month__isnull=False)
+    if snapshot_id:
+        queryset = queryset.filter(snapshot_id=snapshot_id)
+    if loan:
+        queryset = queryset.filter(loan_identifier__loan_identifier__icontains=loan)
+    return queryset
+
+
+def matrix_columns(records):
+    """The reference months present in the records as (year, month) pairs, most recent first"""
+    return list(records.order_by('-reference_year', '-reference_month')
+                .values_list('reference_year', 'reference_month').distinct())
+
+
+def pivot(records, columns, measures=MEASURES):
+    """
+    Values queryset with one row per loan: ``loan`` (primary key), ``label`` (loan identifier) and one aggregate
+    ``<measure>_<year>_<month>`` per measure and reference month
+    """
+    aggregates = {}
+    for year, month in columns:
+        condition = Q(reference_year=year, reference_month=month)
+        for measure, aggregate in measures.items():
+            aggregates['%s_%d_%02d' % (measure, year, month)] = aggregate(condition)
+    return (records.values(loan=F('loan_identifier_id')).annotate(label=Max('loan_identifier__loan_identifier'), **aggregates)
+            .order_by('label', 'loan'))
+
+
+def matrix_page(snapshot_id=None, loan=None, page=1, page_size=PAGE_SIZE):
+    """
+    One page of the matrix as a dict with the ``columns`` (year, month, label), the ``rows`` (loan label and one
+    cell per column) and the pagination ``count``, ``number`` and ``num_pages``
+    """
+    records = repayment_records(snapshot_id, loan)
+    columns = matrix_columns(records)
+    loans = records.order_by('loan_identifier__loan_identifier', 'loan_identifier_id').values_list(
+        'loan_identifier__loan_identifier', 'loan_identifier_id').distinct()
+    paginator = Paginator(loans, page_size)
+    current = paginator.get_page(page)
+    ids = [pk for _, pk in current.object_list]
+
+    rows = []
+    for values in pivot(records.filter(loan_identifier_id__in=ids), columns):
+        cells = [{measure: values['%s_%d_%02d' % (measure, year, month)] for measure in MEASURES}
+                 for year, month in columns]
+        rows.append({'loan': values['label'] or '#%s' % values['loan'], 'cells': cells})
+    return {
+        'columns': [{'year': y, 'month': m, 'label': '%d-%02d' % (y, m)} for y, m in columns],
+        'rows': rows,
+        'count': paginator.count,
+        'number': current.number,
+        'num_pages': paginator.num_pages,
+    }
+
+
+def dense_matrix(records):
+    """
+    The loan x month matrices of the total and collateral sale repayments of the records, computed with one grouped
+    query. Returns a dict of ``months`` (labels in chronological order), ``loan`` (primary keys) and
+    ``loan_identifier`` (one per matrix row), ``total`` and ``collateral`` (float arrays of shape loans x months,
+    NaN where a loan has no record for the month).
+    """
+    grouped = list(records.values_list('loan_identifier_id', 'loan_identifier__loan_identifier',
+                                       'reference_year', 'reference_month')
+                   .annotate(total=Sum('history_of_total_repayments'),
+                             collateral=Sum('history_of_repayments_from_collateral_sales'))
+                   .order_by('loan_identifier_id'))
+    loan_ids = np.array([g[0] for g in grouped], dtype=np.int64)
+    periods = np.array([g[2] * 12 + g[3] - 1 for g in grouped], dtype=np.int64)
+    loans, rows = np.unique(loan_ids, return_inverse=True)
+    months, cols = np.unique(periods, return_inverse=True)
+    labels = dict((g[0], g[1]) for g in grouped)
+
+    matrices = {}
+    for position, name in ((4, 'total'), (5, 'collateral')):
+        matrix = np.full((len(loans), len(months)), np.nan)
+        matrix[rows, cols] = np.array([np.nan if g[position] is None else g[position] for g in grouped],
+                                      dtype=np.float64)
+        matrices[name] = matrix
+    return {
+        'months': ['%d-%02d' % (m // 12, m % 12 + 1) for m in months],
+        'loan': loans,
+        'loan_identifier': np.array([labels[pk] for pk in loans], dtype=object),
+        **matrices,
+    }
+
+
+def cached_matrix_page(snapshot_id=None, loan=None, page=1, page_size=PAGE_SIZE):
+    """matrix_page served from the cache of the snapshot"""
+    return matrix_cache.get_or_set(snapshot_id, '%s:%s:%s' % (loan or '', page, page_size),
+                                   lambda: matrix_page(snapshot_id, loan, page, page_size))
+
+
+def invalidate(snapshot_id=None):
+    """
+    Invalidate the cached pages of a snapshot and of the all-snapshots matrix, which holds the records of every
+    snapshot. Without a snapshot all pages are invalidated.
+    """
+    matrix_cache.invalidate(snapshot_id)
@@ -0,0 +1,129 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Monte Carlo simulation of the recovery cash flows of NPL portfolios
+
+The simulation works on plain NumPy arrays of the loans of a portfolio (no database access), so that blocks of
+scenarios can be simulated in worker processes. Every loan is described by:
+
+* ``exposure``: the claim of the loan (infinite if unknown)
+* ``rate`` and ``end``: the average monthly payment of the loan until the month its payments end
+* ``value`` and ``month``: the collateral value realised by the sale of its collateral and the expected sale month
+* ``other``: further proceeds of the sale that are not subject to the collateral value haircuts (e.g. guarantees)
+
+In every scenario a loan either cures, with the cure probability, and repays its exposure in equal instalments over
+``cure_months`` months, or it keeps paying until its collateral is sold. Sales are delayed by an exponentially
+distributed number of months (mean ``delay_mean``). The collateral value is reduced by the mean ``haircut`` and a
+lognormal shock of volatility ``volatility``, driven by a systematic factor common to all loans of a scenario
+(weight ``correlation``) and a factor of the loan. Sale proceeds do not exceed the exposure left after the payments.
+
+Scenarios are simulated in blocks of BLOCK_SIZE, every block with its own random generator spawned from the seed, so
+that the scenarios of a seed are the same irrespective of the number of worker processes.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# parameter -> (default, lower bound, upper bound)
+PARAMETERS = {
+    'haircut': (0.1, 0.0, 1.0),
+    'volatility': (0.2, 0.0, 5.0),
+    'correlation': (0.3, 0.0, 1.0),
+    'cure_probability': (0.1, 0.0, 1.0),
+    'delay_mean': (6.0, 0.0, 120.0),
+    'cure_months': (60, 1, 1200),
+}
+
+# scenarios simulated with one random generator
+BLOCK_SIZE = 100
+
+# the loan arrays of a worker process
+worker_loans = None
+
+
+def parameter_values(parameters=None):
+    """The simulation parameters completed with the defaults, raises ValueError for values out of their bounds"""
+    parameters = dict(parameters or {})
+    unknown = set(parameters) - set(PARAMETERS)
+    if unknown:
+        raise ValueError('Unknown parameters: %s' % ', '.join(sorted(unknown)))
+    values = {}
+    for name, (default, lower, upper) in PARAMETERS.items():
+        value = parameters.get(name)
+        value = default if value is None else float(value)
+        if not lower <= value <= upper:
+            raise ValueError('The %s must be between %s and %s' % (name, lower, upper))
+        values[name] = int(value) if isinstance(default, int) else value
+    return values
+
+
+def simulate_block(loans, parameters, seed, scenarios, horizon):
+    """The portfolio cash flows (scenarios x horizon) of a block of scenarios"""
+    rng = np.random.default_rng(seed)
+    exposure, rate, end = loans['exposure'], loans['rate'], loans['end']
+    secured = (loans['value'] > 0) | (loans['other'] > 0)
+    sigma, rho = parameters['volatility'], parameters['correlation']
+    cure_months = min(parameters['cure_months'], horizon)
+    instalment = np.where(np.isfinite(exposure), exposure, 0) / parameters['cure_months']
+    flows = np.empty((scenarios, horizon))
+    for scenario in range(scenarios):
+        factor = np.sqrt(rho) * rng.standard_normal() + np.sqrt(1 - rho) * rng.standard_normal(len(exposure))
+        cured = rng.random(len(exposure)) < parameters['cure_probability']
+        delay = np.rint(rng.exponential(parameters['delay_mean'], len(exposure))).astype(np.int64) \
+            if parameters['delay_mean'] > 0 else 0
+        sold = secured & ~cured
+        sale_month = np.where(sold, loans['month'] + delay, horizon)
+        paying = np.where(cured, 0, np.minimum(end, sale_month))
+        value = (1 - parameters['haircut']) * loans['value'] * np.exp(sigma * factor - sigma ** 2 / 2)
+        proceeds = np.clip(np.minimum(value + loans['other'], exposure - rate * paying), 0, None)
+        # the loans paying in a month are the loans whose payments end later
+        flows[scenario] = rate.sum() - np.cumsum(np.bincount(np.minimum(paying, horizon), rate, horizon + 1))[:horizon]
+        inside = sold & (sale_month < horizon)
+        flows[scenario] += np.bincount(sale_month[inside], proceeds[inside], horizon)
+        flows[scenario, :cure_months] += instalment[cured].sum()
+    return flows
+
+
+def set_worker_loans(loans):
+    global worker_loans
+    worker_loans = loans
+
+
+def simulate_task(task):
+    return simulate_block(worker_loans, *task)
+
+
+def simulate(loans, parameters, scenarios, seed, horizon, workers=1, block_size=BLOCK_SIZE):
+    """
+    The portfolio cash flows (scenarios x horizon) of the loans, simulated in blocks of block_size scenarios by a pool
+    of worker processes if workers > 1 and there is more than one block
+    """
+    blocks = np.random.SeedSequence(seed).spawn(-(-scenarios // block_size))
+    tasks = [(parameters, block, min(block_size, scenarios - i * block_size), horizon)
+             for i, block in enumerate(blocks)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=set_worker_loans,
+                                 initargs=(loans,)) as pool:
+            results = list(pool.map(simulate_task, tasks))
+    else:
+        results = [simulate_block(loans, *task) for task in tasks]
+    return np.vstack(results) if results else np.zeros((0, horizon))
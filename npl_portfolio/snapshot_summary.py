@@ -0,0 +1,59 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from npl_portfolio.models import PortfolioSnapshot
+
+
+class SnapshotSummary(models.Model):
+    """
+    The SnapshotSummary model holds a precomputed summary (aggregates) of the data of a portfolio snapshot, e.g. the
+    loan balances by past due bucket. Summaries are computed by npl_portfolio.summaries and flagged as stale when the
+    underlying data change.
+
+    """
+
+    snapshot_id = models.ForeignKey(PortfolioSnapshot, on_delete=models.CASCADE, related_name='summaries',
+                                    help_text="The snapshot summarised")
+
+    name = models.CharField(max_length=50, help_text="The name of the summary (e.g. loan_balances)")
+
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder, help_text="The aggregates of the summary")
+
+    stale = models.BooleanField(default=False, help_text="Whether the data of the snapshot changed since computed")
+
+    computed_date = models.DateTimeField(blank=True, null=True, help_text="Date at which the summary was computed")
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+
+    creation_date = models.DateTimeField(auto_now_add=True)
+    last_change_date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s (%s)' % (self.name, self.snapshot_id_id)
+
+    class Meta:
+        verbose_name = "Snapshot Summary"
+        verbose_name_plural = "Snapshot Summaries"
+        unique_together = [['snapshot_id', 'name']]
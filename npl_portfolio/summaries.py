@@ -0,0 +1,183 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Precomputed summaries of NPL portfolio snapshots
+
+Every summary in ``SUMMARIES`` aggregates the records of one snapshot (loan balances, collateral coverage,
+enforcements, repayments) and is stored as a SnapshotSummary row, so that reports read it with a single lookup
+instead of scanning the tables.
+
+Saving or deleting a record only flags the summaries of its snapshot that depend on the record's model as stale, so
+that a batch of saves does not recompute them once per record (raw saves of fixture loads are skipped). Bulk writes
+(loaders, the bulk API) flag the dependent summaries of all snapshots as stale. Stale or missing summaries are
+recomputed when they are read (``snapshot_summaries``) or with the ``refresh_npl_summaries`` command.
+
+"""
+
+from functools import partial
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from common.cache import SnapshotDependency, snapshot_records
+from npl_portfolio.aggregation import aggregate, loans
+from npl_portfolio.enforcement import Enforcement
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.property_collateral import PropertyCollateral
+from npl_portfolio.snapshot_summary import SnapshotSummary
+
+# model -> lookups of the snapshot of its records
+SNAPSHOT_PATHS = {
+    Loan: ('snapshot_id',),
+    HistoricalRepayment: ('snapshot_id',),
+    PropertyCollateral: ('loan_identifier__snapshot_id',),
+    Enforcement: ('counterparty_identifier__snapshot_id', 'property_collateral_identifier__loan_identifier__snapshot_id'),
+}
+
+BALANCE_MEASURES = ['count', 'sum_principal_balance', 'sum_accrued_interest_balance_on_book', 'sum_legal_balance']
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if numerator is not None and denominator else None
+
+
+def loan_balances(snapshot_id):
+    """The loan balances of the snapshot, in total and by asset class and past due bucket"""
+    queryset = loans(snapshot_id)
+    return {
+        'total': aggregate(queryset, [], BALANCE_MEASURES)[0],
+        'by_asset_class': aggregate(queryset, ['asset_class'], BALANCE_MEASURES),
+        'by_pastdue_bucket': aggregate(queryset, ['pastdue_bucket'], BALANCE_MEASURES),
+    }
+
+
+def collateral_coverage(snapshot_id):
+    """The valuation of the property collateral of the snapshot relative to the legal balance of the secured loans"""
+    collaterals = snapshot_records(PropertyCollateral, snapshot_id, SNAPSHOT_PATHS)
+    valuation = collaterals.aggregate(count=Count('pk'), latest_valuation=Sum('latest_valuation_amount'),
+                                      latest_external_valuation=Sum('latest_external_valuation_amount'))
+    secured = loans(snapshot_id).filter(pk__in=collaterals.values('loan_identifier_id')).aggregate(
+        secured_loans=Count('pk'), secured_legal_balance=Sum('legal_balance'))
+    return {
+        **valuation,
+        **secured,
+        'coverage': ratio(valuation['latest_valuation'], secured['secured_legal_balance']),
+        'by_type_of_property': list(collaterals.order_by().values('type_of_property').annotate(
+            count=Count('pk'), latest_valuation=Sum('latest_valuation_amount')).order_by('type_of_property')),
+    }
+
+
+def enforcement_counts(snapshot_id):
+    """The number of enforcements of the snapshot (in progress, sold) and the sale proceeds"""
+    enforcements = snapshot_records(Enforcement, snapshot_id, SNAPSHOT_PATHS)
+    return {
+        **enforcements.aggregate(count=Count('pk'),
+                                 in_progress=Count('pk', filter=Q(indicator_of_enforcement=True)),
+                                 sold=Count('pk', filter=Q(sold_date__isnull=False)),
+                                 gross_sale_proceeds=Sum('gross_sale_proceeds'),
+                                 net_sale_proceeds=Sum('net_sale_proceeds')),
+        'by_market_status': list(enforcements.order_by().values('current_market_status').annotate(
+            count=Count('pk')).order_by('current_market_status')),
+    }
+
+
+def repayment_totals(snapshot_id):
+    """The historical repayments of the snapshot by reference year"""
+    repayments = snapshot_records(HistoricalRepayment, snapshot_id, SNAPSHOT_PATHS)
+    return {
+        'by_year': list(repayments.order_by().values('reference_year').annotate(
+            loans=Count('loan_identifier', distinct=True), total=Sum('history_of_total_repayments'),
+            collateral=Sum('history_of_repayments_from_collateral_sales')).order_by('reference_year')),
+    }
+
+
+# name -> (function computing the summary of a snapshot, models whose records it aggregates)
+SUMMARIES = {
+    'loan_balances': (loan_balances, (Loan,)),
+    'collateral_coverage': (collateral_coverage, (Loan, PropertyCollateral)),
+    'enforcements': (enforcement_counts, (Enforcement,)),
+    'repayments': (repayment_totals, (HistoricalRepayment,)),
+}
+
+
+def dependent_summaries(model):
+    return [name for name, (_, models) in SUMMARIES.items() if model in models]
+
+
+def refresh_summaries(snapshot_ids=None, names=None):
+    """Compute and store the summaries (all if None) of the snapshots (all if None), returns the number stored"""
+    if snapshot_ids is None:
+        snapshot_ids = PortfolioSnapshot.objects.order_by('pk').values_list('pk', flat=True)
+    count = 0
+    for snapshot_id in snapshot_ids:
+        for name in names or SUMMARIES:
+            function, _ = SUMMARIES[name]
+            SnapshotSummary.objects.update_or_create(
+                snapshot_id_id=snapshot_id, name=name,
+                defaults={'data': function(snapshot_id), 'stale': False, 'computed_date': timezone.now()})
+            count += 1
+    return count
+
+
+def refresh_stale(snapshot_ids=None):
+    """
+    Compute the stale summaries of the snapshots (all if None) and the summaries the given snapshots do not have yet,
+    returns the number stored
+    """
+    stale = SnapshotSummary.objects.filter(stale=True)
+    if snapshot_ids is not None:
+        stale = stale.filter(snapshot_id__in=snapshot_ids)
+    pending = {}
+    for snapshot_id, name in stale.values_list('snapshot_id', 'name'):
+        pending.setdefault(snapshot_id, set()).add(name)
+    if snapshot_ids is not None:
+        stored = set(SnapshotSummary.objects.filter(snapshot_id__in=snapshot_ids).values_list('snapshot_id', 'name'))
+        for snapshot_id in PortfolioSnapshot.objects.filter(pk__in=snapshot_ids).values_list('pk', flat=True):
+            pending.setdefault(snapshot_id, set()).update(
+                name for name in SUMMARIES if (snapshot_id, name) not in stored)
+    return sum(refresh_summaries([snapshot_id], [n for n in SUMMARIES if n in names])
+               for snapshot_id, names in pending.items() if names)
+
+
+def snapshot_summaries(snapshot_id):
+    """The summaries of a snapshot as a dict {name: data}, computing those that are stale or missing"""
+    stored = {name: (data, stale) for name, data, stale in
+              SnapshotSummary.objects.filter(snapshot_id=snapshot_id).values_list('name', 'data', 'stale')}
+    pending = [name for name in SUMMARIES if name not in stored or stored[name][1]]
+    if pending and PortfolioSnapshot.objects.filter(pk=snapshot_id).exists():
+        refresh_summaries([snapshot_id], pending)
+        return dict(SnapshotSummary.objects.filter(snapshot_id=snapshot_id).values_list('name', 'data'))
+    return {name: data for name, (data, _) in stored.items()}
+
+
+def mark_stale(names, snapshot_ids=None):
+    """Flag the named summaries of the snapshots as stale, without snapshots the summaries of all snapshots"""
+    summaries = SnapshotSummary.objects.filter(name__in=names)
+    if snapshot_ids is not None:
+        summaries = summaries.filter(snapshot_id__in=snapshot_ids)
+    summaries.update(stale=True)
+
+
+# flag the summaries aggregating the records of a model as stale when the records change (fixture loads are skipped)
+dependencies = [SnapshotDependency('summaries', {model: paths}, partial(mark_stale, dependent_summaries(model)),
+                                   skip_raw=True) for model, paths in SNAPSHOT_PATHS.items()]
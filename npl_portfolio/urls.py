@@ -26,7 +26,8 @@ app_name = 'npl_portfolio'
 
 from .views import npl_counterparty_api, npl_counterpartygroup_api, npl_property_collateral_api, npl_loan_api, \
     npl_enforcement_api, npl_forbearance_api, npl_nonproperty_collateral_api, npl_external_collection_api, \
-    npl_historical_repayment_api, npl_mortgage_api
+    npl_historical_repayment_api, npl_mortgage_api, npl_snapshot_summary_api, npl_loan_coverage_api, \
+    npl_pricing_simulation_api
 
 router = DefaultRouter()
 router.register(r'counterparties', npl_counterparty_api, basename='counterparty')
@@ -39,6 +40,9 @@ router.register(r'nonpropertycollateral', npl_nonproperty_collateral_api, basena
 router.register(r'externalcollection', npl_external_collection_api, basename='externalcollection')
 router.register(r'historicalrepayment', npl_historical_repayment_api, basename='historicalrepayment')
 router.register(r'mortgages', npl_mortgage_api, basename='mortgage')
+router.register(r'summaries', npl_snapshot_summary_api, basename='snapshotsummary')
+router.register(r'coverage', npl_loan_coverage_api, basename='loancoverage')
+router.register(r'simulations', npl_pricing_simulation_api, basename='pricingsimulation')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -19,11 +19,17 @@
 # SOFTWARE.
 
 
+import numpy as np
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
 
 from npl_portfolio.models import CounterpartyGroup, Counterparty, Loan, \
     Enforcement, Forbearance, NonPropertyCollateral, PropertyCollateral, \
-    ExternalCollection, HistoricalRepayment, Mortgage
+    ExternalCollection, HistoricalRepayment, Mortgage, SnapshotSummary, LoanCoverage, PortfolioSnapshot, \
+    PricingSimulation
 from openNPL.npl_serializers import NPL_CounterpartyGroupSerializer, NPL_CounterpartyGroupDetailSerializer
 from openNPL.npl_serializers import NPL_CounterpartySerializer, NPL_CounterpartyDetailSerializer
 from openNPL.npl_serializers import NPL_EnforcementSerializer, NPL_EnforcementDetailSerializer
@@ -34,114 +40,219 @@ from openNPL.npl_serializers import NPL_NonPropertyCollateralSerializer, NPL_Non
 from openNPL.npl_serializers import NPL_PropertyCollateralSerializer, NPL_PropertyCollateralDetailSerializer
 from openNPL.npl_serializers import NPL_HistoricalRepaymentSerializer, NPL_HistoricalRepaymentDetailSerializer
 from openNPL.npl_serializers import NPL_MortgageSerializer, NPL_MortgageDetailSerializer
-
-
-class npl_counterparty_api(viewsets.ModelViewSet):
+from openNPL.npl_serializers import NPL_SnapshotSummarySerializer, NPL_LoanCoverageSerializer
+from openNPL.npl_serializers import NPL_PricingSimulationSerializer
+from npl_portfolio.coverage import snapshot_coverage
+from npl_portfolio.pricing import price_distribution
+from npl_portfolio.recoveries import DEFAULT_RATES, loan_flows, months, parse_numbers, pricing, snapshot_projection
+from npl_portfolio.aggregation import DEFAULT_MEASURES, DIMENSIONS, MEASURES, cached_aggregate, parse_names
+from npl_portfolio.repayment_matrix import dense_matrix, repayment_records
+from npl_portfolio.summaries import refresh_stale
+from openNPL.export import ArrowRenderer, arrow_requested
+from openNPL.viewsets import OpenNPLViewSet, snapshot_param
+
+
+def pricing_numbers(query_params):
+    """The annual discount ``rates`` (DEFAULT_RATES if omitted) and the ``prices`` of the pricing endpoints"""
+    numbers = {}
+    for param, default in (('rates', DEFAULT_RATES), ('prices', ())):
+        try:
+            numbers[param] = parse_numbers(query_params.get(param), default)
+        except ValueError as exc:
+            raise ValidationError({param: str(exc)})
+    if any(rate <= -1 for rate in numbers['rates']):
+        raise ValidationError({'rates': 'Discount rates must be greater than -1'})
+    return numbers
+
+
+class npl_counterparty_api(OpenNPLViewSet):
     queryset = Counterparty.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_CounterpartyDetailSerializer
-        elif self.action == 'list':
-            return NPL_CounterpartySerializer
-        return NPL_CounterpartyDetailSerializer
+    serializer_class = NPL_CounterpartyDetailSerializer
+    list_serializer_class = NPL_CounterpartySerializer
+    snapshot_field = 'snapshot_id'
+    natural_key = ('portfolio_id', 'counterparty_identifier')
 
 
-class npl_counterpartygroup_api(viewsets.ModelViewSet):
+class npl_counterpartygroup_api(OpenNPLViewSet):
     queryset = CounterpartyGroup.objects.all().order_by('pk')
+    serializer_class = NPL_CounterpartyGroupDetailSerializer
+    list_serializer_class = NPL_CounterpartyGroupSerializer
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_CounterpartyGroupDetailSerializer
-        elif self.action == 'list':
-            return NPL_CounterpartyGroupSerializer
-        return NPL_CounterpartyGroupDetailSerializer
 
-
-class npl_loan_api(viewsets.ModelViewSet):
+class npl_loan_api(OpenNPLViewSet):
     queryset = Loan.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_LoanDetailSerializer
-        elif self.action == 'list':
-            return NPL_LoanSerializer
-        return NPL_LoanDetailSerializer
-
-
-class npl_property_collateral_api(viewsets.ModelViewSet):
+    serializer_class = NPL_LoanDetailSerializer
+    list_serializer_class = NPL_LoanSerializer
+    snapshot_field = 'snapshot_id'
+    natural_key = ('snapshot_id', 'loan_identifier')
+
+    @action(detail=False, methods=['get'], url_path='aggregate')
+    def aggregate(self, request, *args, **kwargs):
+        """
+        Portfolio totals of the loans of a snapshot (``?snapshot=``, all snapshots if omitted), grouped by the
+        comma separated ``?group_by=`` dimensions, with the comma separated ``?measures=``
+        """
+        names = {}
+        for param, choices in (('group_by', DIMENSIONS), ('measures', MEASURES)):
+            try:
+                names[param] = parse_names(request.query_params.get(param), choices)
+            except ValueError as exc:
+                raise ValidationError({param: str(exc)})
+        group_by, measures = names['group_by'], names['measures'] or DEFAULT_MEASURES
+        snapshot = self.get_snapshot()
+        return Response({
+            'snapshot': snapshot,
+            'group_by': group_by,
+            'measures': measures,
+            'results': cached_aggregate(snapshot, group_by, measures),
+        })
+
+    @action(detail=False, methods=['get'], url_path='recoveries',
+            renderer_classes=[JSONRenderer, BrowsableAPIRenderer, ArrowRenderer])
+    def recoveries(self, request, *args, **kwargs):
+        """
+        The projected monthly recovery cash flows of the loans of a snapshot (``?snapshot=``) by source, their present
+        values at the comma separated annual ``?rates=``, their yields at the ``?prices=`` and the price sensitivities
+        to sale proceeds haircuts and delays, or with ``?detail=loans`` the cash flows of every loan (also as an Arrow
+        stream, ``?format=arrow``)
+        """
+        snapshot = self.get_snapshot(PortfolioSnapshot, required=True)
+        numbers = pricing_numbers(request.query_params)
+        arrow = arrow_requested(request)
+        projection = snapshot_projection(snapshot)
+        if request.query_params.get('detail') != 'loans':
+            return Response(pricing(projection, numbers['rates'], numbers['prices']))
+        result = dict(snapshot=snapshot, months=months(projection), **loan_flows(projection))
+        if not arrow:
+            result = {name: value.tolist() if isinstance(value, np.ndarray) else value
+                      for name, value in result.items()}
+        return Response(result)
+
+
+class npl_property_collateral_api(OpenNPLViewSet):
     queryset = PropertyCollateral.objects.all().order_by('pk')
+    serializer_class = NPL_PropertyCollateralDetailSerializer
+    list_serializer_class = NPL_PropertyCollateralSerializer
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_PropertyCollateralDetailSerializer
-        elif self.action == 'list':
-            return NPL_PropertyCollateralSerializer
-        return NPL_PropertyCollateralDetailSerializer
 
-
-class npl_enforcement_api(viewsets.ModelViewSet):
+class npl_enforcement_api(OpenNPLViewSet):
     queryset = Enforcement.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_EnforcementDetailSerializer
-        elif self.action == 'list':
-            return NPL_EnforcementSerializer
-        return NPL_EnforcementDetailSerializer
+    serializer_class = NPL_EnforcementDetailSerializer
+    list_serializer_class = NPL_EnforcementSerializer
 
 
-class npl_forbearance_api(viewsets.ModelViewSet):
+class npl_forbearance_api(OpenNPLViewSet):
     queryset = Forbearance.objects.all().order_by('pk')
+    serializer_class = NPL_ForbearanceDetailSerializer
+    list_serializer_class = NPL_ForbearanceSerializer
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_ForbearanceDetailSerializer
-        elif self.action == 'list':
-            return NPL_ForbearanceSerializer
-        return NPL_ForbearanceDetailSerializer
 
-
-class npl_nonproperty_collateral_api(viewsets.ModelViewSet):
+class npl_nonproperty_collateral_api(OpenNPLViewSet):
     queryset = NonPropertyCollateral.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_NonPropertyCollateralDetailSerializer
-        elif self.action == 'list':
-            return NPL_NonPropertyCollateralSerializer
-        return NPL_NonPropertyCollateralDetailSerializer
+    serializer_class = NPL_NonPropertyCollateralDetailSerializer
+    list_serializer_class = NPL_NonPropertyCollateralSerializer
 
 
-class npl_external_collection_api(viewsets.ModelViewSet):
+class npl_external_collection_api(OpenNPLViewSet):
     queryset = ExternalCollection.objects.all().order_by('pk')
+    serializer_class = NPL_ExternalCollectionDetailSerializer
+    list_serializer_class = NPL_ExternalCollectionSerializer
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_ExternalCollectionDetailSerializer
-        elif self.action == 'list':
-            return NPL_ExternalCollectionSerializer
-        return NPL_ExternalCollectionDetailSerializer
 
-
-class npl_historical_repayment_api(viewsets.ModelViewSet):
+class npl_historical_repayment_api(OpenNPLViewSet):
     queryset = HistoricalRepayment.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_HistoricalRepaymentDetailSerializer
-        elif self.action == 'list':
-            return NPL_HistoricalRepaymentSerializer
-        return NPL_HistoricalRepaymentDetailSerializer
-
-
-class npl_mortgage_api(viewsets.ModelViewSet):
+    serializer_class = NPL_HistoricalRepaymentDetailSerializer
+    list_serializer_class = NPL_HistoricalRepaymentSerializer
+    snapshot_field = 'snapshot_id'
+    natural_key = ('snapshot_id', 'loan_identifier', 'reference_year', 'reference_month')
+
+    @action(detail=False, methods=['get'], url_path='matrix',
+            renderer_classes=[JSONRenderer, BrowsableAPIRenderer, ArrowRenderer])
+    def matrix(self, request, *args, **kwargs):
+        """
+        The EBA Template 5 repayment matrix (loans x months) as dense arrays, in JSON or as an Arrow IPC stream
+        (``?format=arrow``). Select a snapshot with ``?snapshot=`` and loans with ``?loan=``.
+        """
+        arrow = arrow_requested(request)
+        matrix = dense_matrix(repayment_records(self.get_snapshot(), request.query_params.get('loan')))
+        if not arrow:
+            for name in ('total', 'collateral'):
+                matrix[name] = np.where(np.isnan(matrix[name]), None, matrix[name])
+            matrix = {name: value.tolist() if isinstance(value, np.ndarray) else value
+                      for name, value in matrix.items()}
+        return Response(matrix)
+
+
+class npl_mortgage_api(OpenNPLViewSet):
     queryset = Mortgage.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return NPL_MortgageDetailSerializer
-        elif self.action == 'list':
-            return NPL_MortgageSerializer
-        return NPL_MortgageDetailSerializer
-
+    serializer_class = NPL_MortgageDetailSerializer
+    list_serializer_class = NPL_MortgageSerializer
+
+
+class npl_snapshot_summary_api(viewsets.ReadOnlyModelViewSet):
+    """
+    The precomputed summaries of the portfolio snapshots. Summaries of a snapshot selected with ``?snapshot=`` are
+    computed first if they are stale or missing, select one summary with ``?name=``.
+    """
+    queryset = SnapshotSummary.objects.all().order_by('snapshot_id', 'name')
+    serializer_class = NPL_SnapshotSummarySerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        snapshot = snapshot_param(self.request, PortfolioSnapshot)
+        if snapshot:
+            refresh_stale([snapshot])
+            queryset = queryset.filter(snapshot_id=snapshot)
+        name = self.request.query_params.get('name')
+        if name:
+            queryset = queryset.filter(name=name)
+        return queryset
+
+
+class npl_loan_coverage_api(viewsets.ReadOnlyModelViewSet):
+    """
+    The collateral allocated to the loans of the portfolio snapshots and their coverage and loan to value ratios. The
+    coverage of a snapshot selected with ``?snapshot=`` is computed first if it is missing, select a loan with
+    ``?loan=``.
+    """
+    queryset = LoanCoverage.objects.all().order_by('loan_identifier_id')
+    serializer_class = NPL_LoanCoverageSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        snapshot = snapshot_param(self.request, PortfolioSnapshot)
+        if snapshot:
+            snapshot_coverage(snapshot)
+            queryset = queryset.filter(snapshot_id=snapshot)
+        loan = self.request.query_params.get('loan')
+        if loan:
+            if not loan.isdigit():
+                raise ValidationError({'loan': 'A loan id is required'})
+            queryset = queryset.filter(loan_identifier_id=loan)
+        return queryset
+
+
+class npl_pricing_simulation_api(viewsets.ReadOnlyModelViewSet):
+    """
+    The Monte Carlo pricing simulations of the portfolio snapshots (run with the ``simulate_npl_prices`` command),
+    select the simulations of a snapshot with ``?snapshot=``. The ``prices`` of a simulation are the distributions of
+    its present values at the comma separated annual ``?rates=`` and of its yields at the ``?prices=``.
+    """
+    queryset = PricingSimulation.objects.all().order_by('-pk')
+    serializer_class = NPL_PricingSimulationSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset().defer('arrays')
+        snapshot = snapshot_param(self.request, PortfolioSnapshot)
+        if snapshot:
+            queryset = queryset.filter(snapshot_id=snapshot)
+        return queryset
+
+    @action(detail=True, methods=['get'], url_path='prices')
+    def prices(self, request, *args, **kwargs):
+        """
+        The expected monthly cash flows of a simulation and the distributions of its present values at the ``?rates=``
+        and of its yields at the ``?prices=``
+        """
+        numbers = pricing_numbers(request.query_params)
+        return Response(price_distribution(self.get_object(), numbers['rates'], numbers['prices']))
@@ -0,0 +1,279 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Bulk create / update / upsert endpoints for the openNPL API
+
+``POST <collection>/bulk/?mode=upsert`` accepts a JSON array of entries, or newline delimited JSON (content type
+``application/x-ndjson``) with one entry per line. Entries are validated in batch: field values per entry, foreign
+keys with one query per relation for the whole batch. Valid entries are written with batched ``bulk_create`` /
+``bulk_update`` calls, each batch in its own savepoint: when the database rejects a batch (e.g. a duplicate key in
+mode=create) its entries are written one by one, so that only the offending entries are rejected. Invalid and
+rejected entries are reported by position without aborting the batch, next to the positions of the saved entries.
+
+Updates and upserts match entries on the natural key of the collection (e.g. ``snapshot_id`` and
+``loan_identifier`` for loans), which must be backed by a unique constraint of the model. Upserts are executed with
+``INSERT ... ON CONFLICT DO UPDATE`` (``bulk_create(update_conflicts=True)``). The ``bulk_saved`` signal is sent
+once for the created and once for the updated entries, with the portfolio snapshots they belong to.
+
+"""
+
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+from common.ingestion import BATCH_SIZE, bulk_saved
+
+BULK_MODES = ('create', 'update', 'upsert')
+
+
+class NDJSONParser(BaseParser):
+    """Parses newline delimited JSON into a list of entries"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        entries = []
+        for number, line in enumerate(stream, start=1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError('NDJSON parse error on line %d - %s' % (number, exc))
+        return entries
+
+
+def bulk_serializer(serializer_class, context=None):
+    """
+    A serializer validating entries of the detail serializer without per entry queries: related fields take the
+    primary key as a plain integer (checked in batch by the caller), many-to-many fields and uniqueness validators
+    are left out (uniqueness of the natural key is enforced by the database)
+    """
+    model = serializer_class.Meta.model
+
+    class BulkSerializer(serializer_class):
+        class Meta(serializer_class.Meta):
+            validators = []
+
+        def get_fields(self):
+            fields = {}
+            for name, field in super().get_fields().items():
+                if field.read_only or isinstance(field, serializers.ManyRelatedField):
+                    continue
+                if isinstance(field, serializers.RelatedField):
+                    model_field = model._meta.get_field(field.source or name)
+                    field = serializers.IntegerField(source=model_field.attname, required=False,
+                                                     allow_null=model_field.null)
+                field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+                fields[name] = field
+            return fields
+
+    return BulkSerializer(context=context)
+
+
+class BulkMixin:
+    """
+    Viewset mixin adding the ``bulk`` action. ``natural_key`` lists the model fields identifying an entry for
+    updates and upserts.
+    """
+    natural_key = None
+    bulk_batch_size = BATCH_SIZE
+
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request, *args, **kwargs):
+        mode = request.query_params.get('mode', 'upsert')
+        if mode not in BULK_MODES:
+            return Response({'detail': 'mode must be one of %s' % ', '.join(BULK_MODES)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if mode != 'create' and not self.natural_key:
+            return Response({'detail': 'This collection has no natural key, only mode=create is supported'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        self.check_bulk_permissions(request, mode)
+        entries = request.data
+        if not isinstance(entries, list):
+            return Response({'detail': 'Expected a list of entries'}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        errors = {}
+        rows = self.validate_entries(model, entries, errors)
+        with transaction.atomic():
+            if mode == 'create':
+                created, updated = self.bulk_create_rows(model, rows, errors), []
+            else:
+                created, updated = self.bulk_write_rows(model, rows, mode, errors)
+        for indices, is_created in ((created, True), (updated, False)):
+            if indices:
+                bulk_saved.send(sender=model, using=model._default_manager.db, created=is_created,
+                                snapshots=self.row_snapshots(model, [rows[i] for i in indices], is_created))
+
+        content = {'created': len(created), 'updated': len(updated), 'saved': sorted(created + updated),
+                   'errors': [{'index': i, 'errors': errors[i]} for i in sorted(errors)]}
+        code = status.HTTP_400_BAD_REQUEST if entries and len(errors) == len(entries) else status.HTTP_200_OK
+        return Response(content, status=code)
+
+    def check_bulk_permissions(self, request, mode):
+        """Upserts and updates require the change permission next to the add permission checked for POST"""
+        if mode == 'create' or not request.user.is_authenticated:
+            return
+        opts = self.get_queryset().model._meta
+        if not request.user.has_perm('%s.change_%s' % (opts.app_label, opts.model_name)):
+            self.permission_denied(request)
+
+    def validate_entries(self, model, entries, errors):
+        """Validate the entries, returns {index: validated data} of the valid ones and records the errors"""
+        serializer = bulk_serializer(self.serializer_class, context=self.get_serializer_context())
+        rows = {}
+        for index, entry in enumerate(entries):
+            try:
+                rows[index] = serializer.run_validation(entry)
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+        for field in model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            ids = {row[field.attname] for row in rows.values() if row.get(field.attname) is not None}
+            if not ids:
+                continue
+            existing = set(field.related_model._default_manager.filter(pk__in=ids).values_list('pk', flat=True))
+            for index, row in list(rows.items()):
+                if row.get(field.attname) is not None and row[field.attname] not in existing:
+                    errors[index] = {field.name: ['Invalid pk "%s" - object does not exist.' % row[field.attname]]}
+                    del rows[index]
+        return rows
+
+    def natural_key_of(self, model, row):
+        return tuple(row.get(model._meta.get_field(name).attname) for name in self.natural_key)
+
+    def write_batches(self, items, write, errors):
+        """
+        Write the (index, object) items with ``write(objects)`` in batches, each in a savepoint. The entries of a
+        batch rejected by the database are written one by one and the rejected ones recorded in ``errors``, returns
+        the indices of the entries written.
+        """
+        saved = []
+        for start in range(0, len(items), self.bulk_batch_size):
+            batch = items[start:start + self.bulk_batch_size]
+            try:
+                with transaction.atomic():
+                    write([obj for _, obj in batch])
+                saved.extend(index for index, _ in batch)
+                continue
+            except IntegrityError:
+                pass
+            for index, obj in batch:
+                try:
+                    with transaction.atomic():
+                        write([obj])
+                    saved.append(index)
+                except IntegrityError as exc:
+                    errors[index] = {'non_field_errors': [str(exc)]}
+        return saved
+
+    def bulk_create_rows(self, model, rows, errors):
+        """Create the rows, returns the indices of the entries created"""
+        items = [(index, model(**row)) for index, row in rows.items()]
+        return self.write_batches(items, model._default_manager.bulk_create, errors)
+
+    def bulk_write_rows(self, model, rows, mode, errors):
+        """
+        Update (or upsert) the rows matched on the natural key, returns the indices of the entries created and of
+        the entries updated
+        """
+        keyed = {}
+        for index, row in rows.items():
+            key = self.natural_key_of(model, row)
+            if None in key:
+                errors[index] = {'non_field_errors': ['The natural key (%s) is required' % ', '.join(self.natural_key)]}
+            elif key in keyed:
+                errors[keyed[key]] = {'non_field_errors': ['Superseded by entry %d with the same natural key' % index]}
+                keyed[key] = index
+            else:
+                keyed[key] = index
+        existing = self.existing_keys(model, list(keyed))
+        if mode == 'update':
+            for key, index in list(keyed.items()):
+                if key not in existing:
+                    errors[index] = {'non_field_errors': ['No entry with this natural key exists']}
+                    del keyed[key]
+
+        # entries providing the same fields are written together, so that omitted fields keep their values
+        groups = {}
+        for key, index in keyed.items():
+            groups.setdefault(tuple(sorted(rows[index])), []).append(index)
+        key_fields = {model._meta.get_field(name).attname for name in self.natural_key}
+        auto_fields = [f.name for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        now = timezone.now()
+        manager = model._default_manager
+        saved = []
+        for columns, indices in groups.items():
+            update_fields = [model._meta.get_field(c).name for c in columns if c not in key_fields] + auto_fields
+            if mode == 'update':
+                items = [(index, model(pk=existing[self.natural_key_of(model, rows[index])], **rows[index]))
+                         for index in indices]
+                for _, obj in items:
+                    for name in auto_fields:
+                        setattr(obj, name, now)
+                saved += self.write_batches(items, lambda objects: manager.bulk_update(objects, update_fields),
+                                            errors)
+            else:
+                items = [(index, model(**rows[index])) for index in indices]
+                saved += self.write_batches(items, lambda objects: manager.bulk_create(
+                    objects, update_conflicts=True, unique_fields=list(self.natural_key),
+                    update_fields=update_fields), errors)
+        updated = [index for index in saved if self.natural_key_of(model, rows[index]) in existing]
+        return [index for index in saved if self.natural_key_of(model, rows[index]) not in existing], updated
+
+    def row_snapshots(self, model, rows, created):
+        """
+        The primary keys of the portfolio snapshots of the rows written, None if they are not known: the model has no
+        portfolio snapshot foreign key, a row omits it or, for updates, it is not part of the natural key (an update
+        may move a row away from a snapshot)
+        """
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model._meta.model_name == 'portfoliosnapshot':
+                if not created and field.name not in self.natural_key:
+                    return None
+                if any(field.attname not in row for row in rows):
+                    return None
+                return {row[field.attname] for row in rows if row[field.attname] is not None}
+        return None
+
+    def existing_keys(self, model, keys):
+        """Map of the natural keys already stored to their primary keys"""
+        attnames = [model._meta.get_field(name).attname for name in self.natural_key]
+        existing = {}
+        first = attnames[0]
+        values = list({key[0] for key in keys})
+        wanted = set(keys)
+        for i in range(0, len(values), self.bulk_batch_size):
+            queryset = model._default_manager.filter(**{first + '__in': values[i:i + self.bulk_batch_size]})
+            for row in queryset.values_list('pk', *attnames):
+                if row[1:] in wanted:
+                    existing[row[1:]] = row[0]
+        return existing
@@ -0,0 +1,83 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Nested expansion of related entries in the openNPL API
+
+Serializers declare the relations that may be embedded in their representation in ``expandable_fields``. Clients
+request them with ``?expand=`` as a comma separated list, using dots for relations of related entries, e.g.
+``/api/npl_data/loans/7/?expand=counterparty.counterparty_group,property_collateral,historical_repayment``.
+The embedded serializers are regular (nested) serializer fields, so the viewset query planning (openNPL.prefetch)
+loads all requested relations with joins and prefetches.
+
+"""
+
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from openNPL.sparse_fields import split_param
+
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def expansion_tree(paths):
+    """Nested dictionary of the dotted expansion paths, e.g. ['a.b', 'c'] -> {'a': {'b': {}}, 'c': {}}"""
+    tree = {}
+    for path in paths:
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def is_expanded(request):
+    return bool(split_param(request, EXPAND_QUERY_PARAM))
+
+
+class ExpandableFieldsMixin:
+    """
+    ModelSerializer mixin embedding the related entries requested with ?expand=.
+
+    ``expandable_fields`` maps each expansion name to the dotted path of the serializer class rendering it and the
+    keyword arguments of the nested serializer (its ``source`` relation and ``many`` for to-many relations).
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        self.expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+    def get_expansions(self):
+        """The expansion tree of this serializer: passed by the parent serializer, or read from the request"""
+        if self.expand is not None:
+            return self.expand
+        root = self.root
+        if root is not self and not (isinstance(root, serializers.ListSerializer) and root.child is self):
+            return {}
+        return expansion_tree(split_param(self.context.get('request'), EXPAND_QUERY_PARAM))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, children in self.get_expansions().items():
+            if name not in self.expandable_fields:
+                continue
+            serializer_class, options = self.expandable_fields[name]
+            fields[name] = import_string(serializer_class)(read_only=True, expand=children, **options)
+        return fields
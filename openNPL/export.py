@@ -0,0 +1,158 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Streaming export of API collections
+
+The ExportMixin adds an ``export`` action to a viewset (e.g. ``/api/npl_data/loans/export/?format=csv``) that writes
+the complete filtered queryset as CSV or newline delimited JSON. Rows are fetched with a server-side cursor in chunks
+and encoded while the response is sent, so memory use does not depend on the size of the collection.
+
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.renderers import BaseRenderer
+
+from openNPL.sparse_fields import select_fields
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class CSVStreamRenderer(BaseRenderer):
+    """Selects the CSV export format (the content is encoded by the export action itself)"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class NDJSONStreamRenderer(BaseRenderer):
+    """Selects the newline delimited JSON export format (the content is encoded by the export action itself)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class ArrowRenderer(BaseRenderer):
+    """
+    Renders a dict of NumPy arrays of equal length as an Apache Arrow IPC stream, 2-D arrays become fixed size list
+    columns. Other entries (e.g. labels of the list elements, error details) are stored as JSON in the schema
+    metadata. Requires the optional pyarrow package.
+    """
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import numpy as np
+        import pyarrow as pa
+
+        columns, metadata = {}, {}
+        for name, value in data.items():
+            if isinstance(value, np.ndarray) and value.ndim == 2:
+                values = pa.array(value.reshape(-1), from_pandas=True)
+                columns[name] = pa.FixedSizeListArray.from_arrays(values, value.shape[1])
+            elif isinstance(value, np.ndarray):
+                columns[name] = pa.array(value, from_pandas=True)
+            else:
+                metadata[name] = json.dumps(value, cls=DjangoJSONEncoder)
+        table = pa.table(columns, metadata=metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def arrow_requested(request):
+    """
+    Whether the ArrowRenderer was selected for the response (``?format=arrow``), raises NotAcceptable up front when
+    the optional pyarrow package is missing
+    """
+    if request.accepted_renderer.format != ArrowRenderer.format:
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise NotAcceptable('The Arrow format requires the pyarrow package')
+    return True
+
+
+class Echo:
+    """File-like object returning what is written to it, used to stream the output of csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_rows(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_rows(header, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+class ExportMixin:
+    """
+    Viewset mixin adding a streaming ``export`` action over the filtered queryset. All concrete model fields (or
+    those selected with ?fields= / ?exclude=) are exported, foreign keys as the primary key of the referenced record.
+    """
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def get_export_fields(self):
+        """The exported (field name, column) pairs, narrowed by the ?fields= / ?exclude= parameters"""
+        fields = self.get_queryset().model._meta.concrete_fields
+        names = select_fields([f.name for f in fields], self.request)
+        return [(f.name, f.attname) for f in fields if f.name in names]
+
+    @action(detail=False, methods=['get'], url_path='export',
+            renderer_classes=[CSVStreamRenderer, NDJSONStreamRenderer])
+    def export(self, request, *args, **kwargs):
+        fields = self.get_export_fields()
+        header = [name for name, _ in fields]
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*[column for _, column in fields]).iterator(chunk_size=self.export_chunk_size)
+        renderer = request.accepted_renderer
+        if renderer.format == 'ndjson':
+            content = ndjson_rows(header, rows)
+        else:
+            content = csv_rows(header, rows)
+        response = StreamingHttpResponse(content, content_type='%s; charset=%s' % (renderer.media_type,
+                                                                                     renderer.charset))
+        filename = '%s.%s' % (queryset.model._meta.model_name, renderer.format)
+        response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+        return response
@@ -23,8 +23,10 @@ from rest_framework import serializers
 # TODO Lease (non-SME)
 from npl_portfolio.models import CounterpartyGroup, Counterparty, Loan, \
     Enforcement, Forbearance, NonPropertyCollateral, PropertyCollateral, \
-    ExternalCollection, HistoricalRepayment, Mortgage
+    ExternalCollection, HistoricalRepayment, Mortgage, SnapshotSummary, LoanCoverage, PricingSimulation
+from openNPL.expand import ExpandableFieldsMixin
 from openNPL.settings import ROOT_VIEW
+from openNPL.sparse_fields import SparseFieldsMixin
 
 
 #
@@ -46,7 +48,7 @@ class NPL_HistoricalRepaymentSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_HistoricalRepaymentDetailSerializer(serializers.ModelSerializer):
+class NPL_HistoricalRepaymentDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL HistoricalRepayment Data (Detail)
     """
@@ -70,7 +72,7 @@ class NPL_ExternalCollectionSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_ExternalCollectionDetailSerializer(serializers.ModelSerializer):
+class NPL_ExternalCollectionDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL ExternalCollection Data (Detail)
     """
@@ -95,7 +97,7 @@ class NPL_NonPropertyCollateralSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_NonPropertyCollateralDetailSerializer(serializers.ModelSerializer):
+class NPL_NonPropertyCollateralDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL NonPropertyCollateral Data (Detail)
     """
@@ -120,7 +122,7 @@ class NPL_ForbearanceSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_ForbearanceDetailSerializer(serializers.ModelSerializer):
+class NPL_ForbearanceDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL Forbearance Data (Detail)
     """
@@ -145,7 +147,7 @@ class NPL_EnforcementSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_EnforcementDetailSerializer(serializers.ModelSerializer):
+class NPL_EnforcementDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL Enforcement Data (Detail)
     """
@@ -155,7 +157,7 @@ class NPL_EnforcementDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class NPL_CounterpartyGroupDetailSerializer(serializers.ModelSerializer):
+class NPL_CounterpartyGroupDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL CounterpartyGroups Data (Detail)
     """
@@ -195,10 +197,25 @@ class NPL_CounterpartySerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_CounterpartyDetailSerializer(serializers.ModelSerializer):
+class NPL_CounterpartyDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL Counterparty Data (Detail)
     """
+    expandable_fields = {
+        'counterparty_group': ('openNPL.npl_serializers.NPL_CounterpartyGroupDetailSerializer',
+                               {'source': 'counterparty_group_identifier'}),
+        'loan': ('openNPL.npl_serializers.NPL_LoanDetailSerializer', {'source': 'loan_set', 'many': True}),
+        'property_collateral': ('openNPL.npl_serializers.NPL_PropertyCollateralDetailSerializer',
+                                {'source': 'property_collaterals', 'many': True}),
+        'non_property_collateral': ('openNPL.npl_serializers.NPL_NonPropertyCollateralDetailSerializer',
+                                    {'source': 'non_property_collaterals', 'many': True}),
+        'enforcement': ('openNPL.npl_serializers.NPL_EnforcementDetailSerializer',
+                        {'source': 'enforcement_set', 'many': True}),
+        'forbearance': ('openNPL.npl_serializers.NPL_ForbearanceDetailSerializer',
+                        {'source': 'forbearance_set', 'many': True}),
+        'external_collection': ('openNPL.npl_serializers.NPL_ExternalCollectionDetailSerializer',
+                                {'source': 'externalcollection_set', 'many': True}),
+    }
 
     class Meta:
         model = Counterparty
@@ -213,17 +230,32 @@ class NPL_LoanSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Loan
-        fields = ('id', 'contract_identifier', 'link')
+        fields = ('id', 'loan_identifier', 'link')
 
     def get_link(self, obj):
         link = ROOT_VIEW + "/api/npl_data/loans/" + str(obj.pk)
         return link
 
 
-class NPL_LoanDetailSerializer(serializers.ModelSerializer):
+class NPL_LoanDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL Loan Data (Detail)
     """
+    expandable_fields = {
+        'counterparty': ('openNPL.npl_serializers.NPL_CounterpartyDetailSerializer',
+                         {'source': 'counterparty_identifier'}),
+        'property_collateral': ('openNPL.npl_serializers.NPL_PropertyCollateralDetailSerializer',
+                                {'source': 'propertycollateral_set', 'many': True}),
+        'non_property_collateral': ('openNPL.npl_serializers.NPL_NonPropertyCollateralDetailSerializer',
+                                    {'source': 'nonpropertycollateral_set', 'many': True}),
+        'mortgage': ('openNPL.npl_serializers.NPL_MortgageDetailSerializer', {'source': 'mortgage_set', 'many': True}),
+        'forbearance': ('openNPL.npl_serializers.NPL_ForbearanceDetailSerializer',
+                        {'source': 'forbearance_set', 'many': True}),
+        'historical_repayment': ('openNPL.npl_serializers.NPL_HistoricalRepaymentDetailSerializer',
+                                 {'source': 'historicalrepayment_set', 'many': True}),
+        'external_collection': ('openNPL.npl_serializers.NPL_ExternalCollectionDetailSerializer',
+                                {'source': 'externalcollection_set', 'many': True}),
+    }
 
     class Meta:
         model = Loan
@@ -245,7 +277,7 @@ class NPL_PropertyCollateralSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_PropertyCollateralDetailSerializer(serializers.ModelSerializer):
+class NPL_PropertyCollateralDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL Property Collateral Data (Detail)
     """
@@ -270,7 +302,7 @@ class NPL_MortgageSerializer(serializers.ModelSerializer):
         return link
 
 
-class NPL_MortgageDetailSerializer(serializers.ModelSerializer):
+class NPL_MortgageDetailSerializer(ExpandableFieldsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize NPL Mortgage Data (Detail)
     """
@@ -279,3 +311,35 @@ class NPL_MortgageDetailSerializer(serializers.ModelSerializer):
         model = Mortgage
         fields = '__all__'
 
+
+class NPL_SnapshotSummarySerializer(serializers.ModelSerializer):
+    """
+    Serialize NPL Snapshot Summaries
+    """
+
+    class Meta:
+        model = SnapshotSummary
+        fields = ('id', 'snapshot_id', 'name', 'data', 'stale', 'computed_date')
+
+
+class NPL_LoanCoverageSerializer(serializers.ModelSerializer):
+    """
+    Serialize NPL Loan Coverage
+    """
+
+    class Meta:
+        model = LoanCoverage
+        fields = ('id', 'snapshot_id', 'loan_identifier', 'exposure', 'property_value', 'senior_claims',
+                  'allocated_property_value', 'allocated_non_property_value', 'coverage_ratio',
+                  'property_coverage_ratio', 'loan_to_value')
+
+
+class NPL_PricingSimulationSerializer(serializers.ModelSerializer):
+    """
+    Serialize NPL Pricing Simulations (without the simulated cash flows)
+    """
+
+    class Meta:
+        model = PricingSimulation
+        fields = ('id', 'snapshot_id', 'scenarios', 'seed', 'parameters', 'start_date', 'horizon', 'loans', 'stale',
+                  'creation_date')
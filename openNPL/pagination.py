@@ -0,0 +1,142 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Pagination of the openNPL API collections
+
+Collections are paged by page number by default (``?page=N``). Large collections (e.g. historical repayments or
+loan states) can instead be traversed with keyset pagination (``?pagination=cursor`` for the first page, then the
+``next`` links): each page is selected with a ``WHERE pk > ...`` condition on the ordering key instead of an OFFSET,
+so every page costs the same as the first one. The number of entries per page can be chosen with ``?page_size=``
+up to API_MAX_PAGE_SIZE. Keyset pages do not count the collection, unless the first page is asked for with
+``?count=exact`` or ``?count=estimate`` (the query planner estimate on PostgreSQL).
+
+"""
+
+import json
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+
+
+def estimate_count(queryset):
+    """
+    Estimated number of rows of a queryset: the row estimate of the query planner on PostgreSQL (obtained without
+    scanning the table), the exact count on other databases
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.count()
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination on the primary key, with a page size selectable per request and an optional count
+    """
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset, request):
+        """The requested count, computed for the first page only (the following pages carry a cursor)"""
+        if self.cursor_query_param in request.query_params:
+            return None
+        mode = request.query_params.get(self.count_query_param)
+        if mode in ('exact', 'true'):
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    def get_paginated_response(self, data):
+        content = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            content = {'count': self.count, **content}
+        return Response(content)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Include the exact or estimated number of results (exact, estimate).',
+            'schema': {'type': 'string', 'enum': ['exact', 'estimate']},
+        }]
+
+
+class OpenNPLPagination(PageNumberPagination):
+    """
+    Page number pagination (the default), switching to keyset pagination when a cursor is requested
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    keyset = None
+
+    def use_keyset(self, request):
+        return (self.keyset_class.cursor_query_param in request.query_params
+                or request.query_params.get(self.mode_query_param) == 'cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset:
+            return self.keyset.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        names = {p['name'] for p in parameters}
+        parameters += [p for p in self.keyset_class().get_schema_operation_parameters(view) if p['name'] not in names]
+        parameters.append({
+            'name': self.mode_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Use keyset pagination (cursor) instead of page numbers.',
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        })
+        return parameters
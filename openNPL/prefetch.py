@@ -0,0 +1,146 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Relation-aware query planning for the openNPL API
+
+The serializer of a request determines which relations are rendered. plan_queryset walks its fields (including
+nested serializers) and derives the joins and prefetches that load those relations with a fixed number of queries
+per page, instead of one query per rendered object:
+
+- nested serializers of a forward foreign key (and dotted sources such as ``snapshot_id.name``) are joined with
+  ``select_related``
+- nested serializers of many related objects (reverse foreign keys, many-to-many) are prefetched with a queryset
+  planned recursively from the nested serializer
+- many-to-many fields rendered as primary keys are prefetched loading the primary keys only
+- foreign keys rendered as primary keys need no query at all (the key is read from the row)
+
+The plan also collects the columns read by the serializer, which are used to narrow the SQL projection.
+
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """The select_related / prefetch_related lookups and the columns needed to render a serializer"""
+
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = []
+        self.columns = set()
+
+    def add_column(self, column):
+        if self.columns is not None:
+            self.columns.add(column)
+
+    def merge(self, other):
+        self.select_related += [s for s in other.select_related if s not in self.select_related]
+        self.prefetch_related += other.prefetch_related
+        if self.columns is not None:
+            self.columns = None if other.columns is None else self.columns | other.columns
+
+
+def model_serializer(field):
+    """The ModelSerializer of a (possibly many) nested serializer field"""
+    return field.child if isinstance(field, serializers.ListSerializer) else field
+
+
+def relation(model, name):
+    """
+    The relation of a model accessed with the given attribute name (a forward relation field, or a reverse
+    relation by its accessor name, e.g. ``propertycollateral_set``), None for other attributes
+    """
+    try:
+        field = model._meta.get_field(name)
+        if field.is_relation and not field.auto_created:
+            return field
+    except FieldDoesNotExist:
+        pass
+    for field in model._meta.related_objects:
+        if field.get_accessor_name() == name:
+            return field
+    return None
+
+
+def plan_serializer(serializer, model, prefix=''):
+    """The QueryPlan rendering a (model) serializer on rows of model, for lookups starting at prefix"""
+    plan = QueryPlan()
+    plan.add_column(prefix + model._meta.pk.name)
+    for field in serializer.fields.values():
+        if isinstance(field, serializers.SerializerMethodField):
+            # assumed to only use the primary key (e.g. links)
+            continue
+        if field.source == '*':
+            plan.columns = None
+            continue
+        name = field.source_attrs[0]
+        related = relation(model, name)
+        lookup = prefix + name
+        if isinstance(field, serializers.BaseSerializer):
+            nested = model_serializer(field)
+            nested_model = nested.Meta.model
+            if related is not None and (related.many_to_one or related.one_to_one):
+                plan.select_related.append(lookup)
+                plan.add_column(lookup)
+                plan.merge(plan_serializer(nested, nested_model, lookup + '__'))
+            else:
+                # the prefetched rows must carry the foreign key matching them to their parent
+                columns = [related.field.name] if related is not None and related.one_to_many else []
+                queryset = plan_queryset(nested_model._default_manager.all(), nested, project=True, columns=columns)
+                plan.prefetch_related.append(Prefetch(lookup, queryset=queryset))
+        elif isinstance(field, serializers.ManyRelatedField):
+            related_model = related.related_model
+            child = field.child_relation
+            if isinstance(child, serializers.PrimaryKeyRelatedField):
+                queryset = related_model._default_manager.only(related_model._meta.pk.name)
+                plan.prefetch_related.append(Prefetch(lookup, queryset=queryset))
+            else:
+                plan.prefetch_related.append(lookup)
+        elif related is not None and (related.many_to_one or related.one_to_one):
+            plan.add_column(lookup)
+            pk_only = isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization()
+            if len(field.source_attrs) > 1 or not pk_only:
+                plan.select_related.append(lookup)
+                plan.columns = None
+        elif related is None and len(field.source_attrs) == 1:
+            plan.add_column(lookup)
+        else:
+            plan.columns = None
+    return plan
+
+
+def plan_queryset(queryset, serializer, project=False, columns=()):
+    """
+    Apply the query plan of a serializer to a queryset. With project, only the columns read by the serializer
+    (and any further columns given) are selected, when they can be determined.
+    """
+    plan = plan_serializer(model_serializer(serializer), queryset.model)
+    for column in columns:
+        plan.add_column(column)
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetch_related:
+        queryset = queryset.prefetch_related(*plan.prefetch_related)
+    if project and plan.columns is not None:
+        queryset = queryset.only(*plan.columns)
+    return queryset
@@ -146,10 +146,30 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'openNPL.pagination.OpenNPLPagination',
     'PAGE_SIZE': 10,
 }
 
+# Largest page size API clients may request with ?page_size=
+API_MAX_PAGE_SIZE = 1000
+
+# Seconds the pages of the admin repayment matrix stay cached (they are invalidated on changes)
+REPAYMENT_MATRIX_CACHE_TIMEOUT = 3600
+
+# Seconds the portfolio aggregates of the API stay cached per snapshot (they are invalidated on changes)
+PORTFOLIO_AGGREGATES_CACHE_TIMEOUT = 3600
+
+# Seconds the SFLP roll rate matrices of a pair of snapshots stay cached (keyed on the delinquency data of both)
+ROLL_RATES_CACHE_TIMEOUT = 24 * 3600
+
+# Months of recovery cash flows projected for NPL snapshots and worker processes of the refresh_npl_recoveries and
+# simulate_npl_prices commands (default: one per CPU, API requests project in the request process)
+NPL_RECOVERY_HORIZON = 120
+NPL_RECOVERY_WORKERS = None
+
+# Create the partitions of new SFLP snapshots (PostgreSQL, after running the partition_sflp_tables command)
+SFLP_PARTITION_BY_SNAPSHOT = False
+
 LANGUAGE_CODE = 'en-us'
 # LANGUAGE_CODE = 'nl'
 # LANGUAGE_CODE = 'el'
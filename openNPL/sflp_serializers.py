@@ -21,6 +21,7 @@
 from rest_framework import serializers
 
 from openNPL.settings import ROOT_VIEW
+from openNPL.sparse_fields import SparseFieldsMixin
 from sflp_portfolio.models.counterparty import Counterparty
 from sflp_portfolio.models.loan import Loan
 from sflp_portfolio.models.enforcement import Enforcement
@@ -48,7 +49,7 @@ class SFLP_ForbearanceSerializer(serializers.ModelSerializer):
         return link
 
 
-class SFLP_ForbearanceDetailSerializer(serializers.ModelSerializer):
+class SFLP_ForbearanceDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize SFLP_Forbearance Data (Detail)
     """
@@ -73,7 +74,7 @@ class SFLP_EnforcementSerializer(serializers.ModelSerializer):
         return link
 
 
-class SFLP_EnforcementDetailSerializer(serializers.ModelSerializer):
+class SFLP_EnforcementDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize SFLP_Enforcement Data (Detail)
     """
@@ -98,7 +99,7 @@ class SFLP_CounterpartySerializer(serializers.ModelSerializer):
         return link
 
 
-class SFLP_CounterpartyDetailSerializer(serializers.ModelSerializer):
+class SFLP_CounterpartyDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Counterparty
         fields = '__all__'
@@ -119,7 +120,7 @@ class SFLP_LoanSerializer(serializers.ModelSerializer):
         return link
 
 
-class SFLP_LoanDetailSerializer(serializers.ModelSerializer):
+class SFLP_LoanDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = '__all__'
@@ -140,7 +141,7 @@ class SFLP_PropertyCollateralSerializer(serializers.ModelSerializer):
         return link
 
 
-class SFLP_PropertyCollateralDetailSerializer(serializers.ModelSerializer):
+class SFLP_PropertyCollateralDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PropertyCollateral
         fields = '__all__'
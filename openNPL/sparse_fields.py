@@ -0,0 +1,75 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Sparse fieldsets for the openNPL API
+
+Clients may narrow the representation of entries to the fields they need with ``?fields=a,b,c`` and / or drop
+fields with ``?exclude=d,e``. The serializer then only renders those fields, and the viewset only selects the
+corresponding table columns from the database (``QuerySet.only``).
+
+"""
+
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+EXCLUDE_QUERY_PARAM = 'exclude'
+
+
+def split_param(request, name):
+    if request is None:
+        return set()
+    value = request.query_params.get(name, '')
+    return {v.strip() for v in value.split(',') if v.strip()}
+
+
+def requested_fields(request):
+    """The (requested, excluded) field names of a request, requested is None when not restricted"""
+    requested = split_param(request, FIELDS_QUERY_PARAM)
+    return requested or None, split_param(request, EXCLUDE_QUERY_PARAM)
+
+
+def is_sparse(request):
+    requested, excluded = requested_fields(request)
+    return requested is not None or bool(excluded)
+
+
+def select_fields(names, request):
+    """The names kept by the ?fields= / ?exclude= parameters of a request (in their original order)"""
+    requested, excluded = requested_fields(request)
+    return [n for n in names if (requested is None or n in requested) and n not in excluded]
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin restricting the rendered fields to those selected by the ?fields= / ?exclude= query
+    parameters of the request in the serializer context. Only applies to the top level serializer.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        root = self.root
+        if root is not self and not (isinstance(root, serializers.ListSerializer) and root.child is self):
+            return fields
+        request = self.context.get('request')
+        if not is_sparse(request):
+            return fields
+        return {name: fields[name] for name in select_fields(list(fields), request)}
+
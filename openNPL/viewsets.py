@@ -0,0 +1,91 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Common base of the openNPL API viewsets
+
+Collections are listed with a compact list serializer (identifiers and links), individual entries (and any list
+narrowed with ?fields= / ?exclude= or expanded with ?expand=) with the detail serializer. All viewsets offer the
+streaming export and the bulk create / update / upsert actions.
+
+"""
+
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+
+from openNPL.bulk import BulkMixin
+from openNPL.expand import is_expanded
+from openNPL.export import ExportMixin
+from openNPL.prefetch import plan_queryset
+from openNPL.sparse_fields import is_sparse
+
+SNAPSHOT_QUERY_PARAM = 'snapshot'
+
+
+def snapshot_param(request, model=None, required=False):
+    """
+    The snapshot id requested with ?snapshot= (None if absent). Raises ValidationError if the id is missing but
+    required, is not a number or, with the snapshot ``model``, if the snapshot does not exist.
+    """
+    snapshot = request.query_params.get(SNAPSHOT_QUERY_PARAM)
+    if not snapshot:
+        if required:
+            raise ValidationError({SNAPSHOT_QUERY_PARAM: 'A snapshot id is required'})
+        return None
+    if not snapshot.isdigit():
+        raise ValidationError({SNAPSHOT_QUERY_PARAM: 'A snapshot id is required'})
+    if model is not None and not model.objects.filter(pk=snapshot).exists():
+        raise ValidationError({SNAPSHOT_QUERY_PARAM: 'Unknown snapshot %s' % snapshot})
+    return int(snapshot)
+
+
+class OpenNPLViewSet(BulkMixin, ExportMixin, viewsets.ModelViewSet):
+    """
+    Model viewset using ``list_serializer_class`` for plain listings and ``serializer_class`` otherwise. The
+    queryset joins and prefetches the relations rendered by the serializer, sparse fieldsets narrow both the
+    representation and the columns selected from the database.
+
+    Collections of snapshot data (``snapshot_field``) are narrowed to one snapshot with ``?snapshot=``, which on
+    partitioned tables restricts the query to the partition of the snapshot.
+    """
+    list_serializer_class = None
+    snapshot_field = None
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.list_serializer_class and not self.is_detailed():
+            return self.list_serializer_class
+        return self.serializer_class
+
+    def is_detailed(self):
+        """Whether a listing renders the detail representation (narrowed or expanded entries)"""
+        return is_sparse(self.request) or is_expanded(self.request)
+
+    def get_snapshot(self, model=None, required=False):
+        """The snapshot id requested with ?snapshot= (None if absent), see snapshot_param"""
+        return snapshot_param(self.request, model, required)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        snapshot = self.get_snapshot() if self.snapshot_field else None
+        if snapshot:
+            queryset = queryset.filter(**{self.snapshot_field: snapshot})
+        if self.action in ('list', 'retrieve'):
+            queryset = plan_queryset(queryset, self.get_serializer(), project=is_sparse(self.request))
+        return queryset
@@ -38,6 +38,7 @@ from sflp_portfolio.models.property_collateral import PropertyCollateral
 from sflp_portfolio.models.property_collateral_state import PropertyCollateralState
 from sflp_portfolio.models.enforcement import Enforcement
 from sflp_portfolio.models.forbearance import Forbearance
+from sflp_portfolio.models.import_checkpoint import ImportCheckpoint
 
 
 class PortfolioAdmin(admin.ModelAdmin):
@@ -64,6 +65,8 @@ class CounterpartyAdmin(admin.ModelAdmin):
 class CounterpartyStateAdmin(admin.ModelAdmin):
     save_as = True
     view_on_site = False
+    list_filter = ('portfolio_snapshot_id',)
+    show_full_result_count = False
     # TODO date_hierarchy = ('portfolio_snapshot_id')
     list_display = ('counterparty_identifier', 'portfolio_snapshot_id')
 
@@ -79,6 +82,8 @@ class LoanAdmin(admin.ModelAdmin):
 class LoanStateAdmin(admin.ModelAdmin):
     save_as = True
     view_on_site = False
+    list_filter = ('portfolio_snapshot_id',)
+    show_full_result_count = False
     list_display = ('loan_identifier', 'portfolio_snapshot_id', 'servicer_name', 'total_principal_current',
                     'remaining_months_to_legal_maturity')
 
@@ -93,12 +98,16 @@ class PropertyCollateralAdmin(admin.ModelAdmin):
 class PropertyCollateralStateAdmin(admin.ModelAdmin):
     save_as = True
     view_on_site = False
+    list_filter = ('portfolio_snapshot_id',)
+    show_full_result_count = False
     list_display = ('property_collateral_id', 'portfolio_snapshot_id', 'property_valuation_method')
 
 
 class EnforcementAdmin(admin.ModelAdmin):
     save_as = True
     view_on_site = False
+    list_filter = ('portfolio_snapshot_id',)
+    show_full_result_count = False
     list_display = ('property_collateral_identifier', 'portfolio_snapshot_id',
                     'net_sales_proceeds', 'asset_recovery_costs', 'foreclosure_costs')
 
@@ -106,10 +115,18 @@ class EnforcementAdmin(admin.ModelAdmin):
 class ForbearanceAdmin(admin.ModelAdmin):
     save_as = True
     view_on_site = False
+    list_filter = ('portfolio_snapshot_id',)
+    show_full_result_count = False
     list_display = ('loan_identifier', 'portfolio_snapshot_id', 'modification_flag',
                     'noninterest_bearing_upb', 'principal_forgiveness_amount')
 
 
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    view_on_site = False
+    list_display = ('job', 'table', 'chunks_done', 'rows_read', 'rows_inserted', 'rows_updated', 'completed',
+                    'last_change_date')
+
+
 admin.site.register(Portfolio, PortfolioAdmin)
 admin.site.register(PortfolioSnapshot, Portfolio_SnapshotAdmin)
 admin.site.register(Counterparty, CounterpartyAdmin)
@@ -120,3 +137,4 @@ admin.site.register(PropertyCollateral, PropertyCollateralAdmin)
 admin.site.register(PropertyCollateralState, PropertyCollateralStateAdmin)
 admin.site.register(Enforcement, EnforcementAdmin)
 admin.site.register(Forbearance, ForbearanceAdmin)
+admin.site.register(ImportCheckpoint, ImportCheckpointAdmin)
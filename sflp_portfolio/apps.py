@@ -24,3 +24,38 @@ from django.apps import AppConfig
 class SFLPPortfolioConfig(AppConfig):
     """Class configuring the SFLP Portfolio App."""
     name = 'sflp_portfolio'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate, post_save
+
+        from common.indexes import create_brin_indexes
+        from common.ingestion import bulk_saved
+        from sflp_portfolio import losses, vintages
+        from sflp_portfolio.delinquency import state_saved, states_bulk_saved
+        from sflp_portfolio.models.counterparty import Counterparty
+        from sflp_portfolio.models.enforcement import Enforcement
+        from sflp_portfolio.models.forbearance import Forbearance
+        from sflp_portfolio.models.loan import Loan
+        from sflp_portfolio.models.loan_state import LoanState
+        from sflp_portfolio.models.models import PortfolioSnapshot
+        from sflp_portfolio.models.property_collateral import PropertyCollateral
+        from sflp_portfolio.partitioning import snapshot_saved
+
+        post_migrate.connect(create_brin_indexes, sender=self)
+        post_save.connect(snapshot_saved, sender=PortfolioSnapshot, dispatch_uid='sflp_snapshot_partitions')
+        # remove the delinquency panels of changed snapshots (no post_delete receiver, which would disable the fast
+        # deletes of the state rows of a reloaded period; the reload itself sends bulk_saved)
+        for model in (LoanState, Forbearance):
+            name = 'delinquency_panel_' + model._meta.model_name
+            post_save.connect(state_saved, sender=model, dispatch_uid=name + '_save')
+            bulk_saved.connect(states_bulk_saved, sender=model, dispatch_uid=name + '_bulk')
+        # remove the vintage curves and liquidation losses of changed loan data (newer snapshots are detected when
+        # the vintage curves are read)
+        for module in (vintages, losses):
+            prefix = module.__name__.rsplit('.', 1)[-1] + '_'
+            for model in (LoanState, Enforcement):
+                post_save.connect(module.loan_data_saved, sender=model,
+                                  dispatch_uid=prefix + model._meta.model_name + '_save')
+            for model in (Loan, LoanState, Enforcement, PropertyCollateral, Counterparty):
+                bulk_saved.connect(module.loan_data_bulk_saved, sender=model,
+                                   dispatch_uid=prefix + model._meta.model_name + '_bulk')
@@ -0,0 +1,199 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Delinquency panel of the SFLP loans of a snapshot
+
+``LoanState.repayment_history`` codes the payment performance of the most recent 24 months as a string of two
+character codes (most recent month to the right), ``Forbearance.current_loan_delinquency_status`` the current status.
+A code is the number of months a loan is delinquent (``00`` current, ``01`` 30-59 days past due, ``02`` 60-89 days
+and so on), ``XX`` (or any non numeric code) marks an unknown status.
+
+The codes of all loans of a snapshot are decoded in one vectorized pass into an int8 matrix (loans x months, oldest
+month first, ``UNKNOWN`` for unknown codes). The panel is stored as compressed arrays (DelinquencyPanel) and removed
+when the loan states or forbearance records of its snapshot are saved or bulk loaded. Delinquency metrics are
+computed from the stored arrays, without parsing the codes again.
+
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from sflp_portfolio.models.delinquency_panel import DelinquencyPanel
+from sflp_portfolio.models.forbearance import Forbearance
+from sflp_portfolio.models.loan_state import LoanState
+
+HISTORY_MONTHS = 24
+CODE_WIDTH = 2
+UNKNOWN = -1
+
+# months delinquent from which a loan is 90+ days past due
+NINETY_PLUS = 3
+
+# current status buckets: label -> lowest months delinquent of the bucket
+STATUS_BUCKETS = {'current': 0, '30': 1, '60': 2, '90+': NINETY_PLUS}
+
+
+def decode(values, months, fill='X'):
+    """
+    Decode coded strings of ``months`` two character codes into an int8 matrix (len(values) x months). Strings are
+    aligned to the right (the most recent month): shorter strings are padded with ``fill``, longer strings keep their
+    last ``months`` codes. Missing values and non numeric codes decode to UNKNOWN.
+    """
+    width = months * CODE_WIDTH
+    strings = np.char.strip(pd.Series(values, dtype=object).fillna('').to_numpy(dtype=str))
+    if not len(strings):
+        return np.empty((0, months), dtype=np.int8)
+    lengths = np.char.str_len(strings)
+    missing = lengths == 0
+    # pad every string to the longest one so that the last ``width`` bytes hold the most recent codes
+    longest = max(width, int(lengths.max(initial=0)))
+    strings = np.char.rjust(strings, longest, fill).astype('S%d' % longest)
+    raw = np.frombuffer(strings.tobytes(), dtype=np.uint8).reshape(len(strings), -1)[:, -width:]
+    # digits map to 0..9, every other byte (unsigned wrap-around below '0') to a larger value
+    digits = (raw - np.uint8(ord('0'))).reshape(len(strings), months, CODE_WIDTH)
+    valid = (digits <= 9).all(axis=2) & ~missing[:, None]
+    codes = digits[..., 0].astype(np.int16) * 10 + digits[..., 1]
+    return np.where(valid, np.minimum(codes, np.iinfo(np.int8).max), UNKNOWN).astype(np.int8)
+
+
+def decode_history(values):
+    """The months delinquent of the 24 months of repayment histories (loans x months, oldest month first)"""
+    return decode(values, HISTORY_MONTHS)
+
+
+def decode_status(values):
+    """The months delinquent of current loan delinquency status codes"""
+    return decode(values, 1, fill='0')[:, 0]
+
+
+def build_panel(snapshot_id):
+    """
+    The panel of the loans of a snapshot as a dict of arrays: ``loan`` (sorted loan primary keys), ``history``
+    (loans x 24 months), ``status`` (the forbearance delinquency status, else the last month of the history) and
+    ``zero_balance`` (the zero balance code, UNKNOWN if none)
+    """
+    states = pd.DataFrame.from_records(
+        list(LoanState.objects.filter(portfolio_snapshot_id=snapshot_id, loan_identifier__isnull=False)
+             .order_by('loan_identifier_id', 'pk')
+             .values_list('loan_identifier_id', 'repayment_history', 'zero_balance_code')),
+        columns=['loan', 'history', 'zero_balance']).drop_duplicates('loan', keep='last')
+    loans = states['loan'].to_numpy(dtype=np.int64)
+    history = decode_history(states['history'])
+    zero_balance = pd.to_numeric(states['zero_balance']).fillna(UNKNOWN).to_numpy(dtype=np.int16)
+
+    status = history[:, -1].copy()
+    records = list(Forbearance.objects.filter(portfolio_snapshot_id=snapshot_id, loan_identifier__isnull=False)
+                   .exclude(current_loan_delinquency_status__isnull=True).order_by('pk')
+                   .values_list('loan_identifier_id', 'current_loan_delinquency_status'))
+    if records:
+        ids = np.array([r[0] for r in records], dtype=np.int64)
+        codes = decode_status([r[1] for r in records])
+        # forbearance records of loans without a loan state in the snapshot are ignored
+        known = (codes != UNKNOWN) & np.isin(ids, loans)
+        status[np.searchsorted(loans, ids[known])] = codes[known]
+    return {'loan': loans, 'history': history, 'status': status, 'zero_balance': zero_balance}
+
+
+def store_panel(snapshot_id, panel):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **panel)
+    DelinquencyPanel.objects.update_or_create(portfolio_snapshot_id_id=snapshot_id, defaults={
+        'loans': len(panel['loan']), 'arrays': buffer.getvalue()})
+
+
+def load_panel(snapshot_id):
+    """The stored panel of a snapshot (None if missing)"""
+    arrays = DelinquencyPanel.objects.filter(portfolio_snapshot_id=snapshot_id).values_list('arrays', flat=True).first()
+    if arrays is None:
+        return None
+    with np.load(io.BytesIO(bytes(arrays))) as stored:
+        return {name: stored[name] for name in stored.files}
+
+
+def snapshot_panel(snapshot_id):
+    """The panel of a snapshot, built and stored if missing"""
+    panel = load_panel(snapshot_id)
+    if panel is None:
+        panel = build_panel(snapshot_id)
+        store_panel(snapshot_id, panel)
+    return panel
+
+
+def loan_metrics(panel):
+    """
+    Delinquency metrics per loan: ``months_delinquent`` (months of the history with a delinquent status),
+    ``max_dpd`` (lower bound of the maximum days past due over the history, -1 if unknown), ``ever_90_plus`` and
+    the current ``status`` (months delinquent, -1 if unknown)
+    """
+    history = panel['history']
+    worst = history.max(axis=1).astype(np.int16)
+    return {
+        'loan': panel['loan'],
+        'status': panel['status'],
+        'months_delinquent': (history > 0).sum(axis=1).astype(np.int8),
+        'max_dpd': np.where(worst == UNKNOWN, UNKNOWN, worst * 30),
+        'ever_90_plus': (history >= NINETY_PLUS).any(axis=1),
+    }
+
+
+def portfolio_metrics(panel):
+    """
+    Delinquency metrics of the snapshot: the number of loans delinquent, 90+ days past due and of unknown status in
+    each month of the history (``month`` is the offset to the current month), the number of loans ever 90+ days past
+    due and the number of loans by current status
+    """
+    history, status = panel['history'], panel['status']
+    bounds = list(STATUS_BUCKETS.values())
+    buckets = np.digitize(status, bounds[1:])
+    counts = np.bincount(buckets[status != UNKNOWN], minlength=len(bounds))
+    return {
+        'loans': len(panel['loan']),
+        'month': np.arange(1 - HISTORY_MONTHS, 1),
+        'delinquent': (history > 0).sum(axis=0),
+        'ninety_plus': (history >= NINETY_PLUS).sum(axis=0),
+        'unknown': (history == UNKNOWN).sum(axis=0),
+        'ever_90_plus': int((history >= NINETY_PLUS).any(axis=1).sum()),
+        'status_counts': {**dict(zip(STATUS_BUCKETS, counts.tolist())), 'unknown': int((status == UNKNOWN).sum())},
+    }
+
+
+def invalidate(snapshot_id=None):
+    """Remove the stored panel of a snapshot, without a snapshot every panel"""
+    panels = DelinquencyPanel.objects.all()
+    if snapshot_id:
+        panels = panels.filter(portfolio_snapshot_id=snapshot_id)
+    panels.delete()
+
+
+def state_saved(sender, instance, **kwargs):
+    """post_save receiver of LoanState and Forbearance"""
+    if instance.portfolio_snapshot_id_id:
+        invalidate(instance.portfolio_snapshot_id_id)
+
+
+def states_bulk_saved(sender, snapshots=None, **kwargs):
+    """bulk_saved receiver of LoanState and Forbearance, removes the panels of the snapshots of the written rows"""
+    if snapshots is None:
+        invalidate()
+    else:
+        DelinquencyPanel.objects.filter(portfolio_snapshot_id__in=snapshots).delete()
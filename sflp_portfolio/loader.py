@@ -0,0 +1,415 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Chunked loading of segmented Single Family Loan Performance (SFLP) data files
+
+Each pipe-delimited file is described declaratively by a TableSpec: the model it populates, the model field held
+in each column position and the foreign keys that are resolved against identifier maps pre-loaded from the database.
+Files are read in fixed size chunks, foreign keys are resolved with vectorized lookups and every chunk is inserted
+before the next one is read, so memory use is bounded by the chunk size and not by the size of the file. Chunks are
+inserted with PostgreSQL COPY where available (see common.ingestion).
+
+An import job records an ImportCheckpoint per table, advanced in the same transaction as each chunk. Running the same
+job again after a failure skips the completed tables and the committed chunks of the interrupted one.
+
+A job restricted to a single monthly reporting period appends that snapshot to the existing data: only the state rows
+of the period are inserted (replacing those of an earlier run for the same period), static rows are inserted when new
+and updated only when their values changed, so the work done in the database tracks the size of the monthly delta.
+
+Coded columns holding the raw codes of the SFLP files (e.g. zero balance code 01 for prepaid loans) are translated
+to the stored codes of their model choices, so that the engines only deal with the codes of ZERO_BALANCE_CODE_CHOICES.
+
+"""
+
+import re
+import time
+
+import pandas as pd
+from django.db import models, transaction
+
+from common.ingestion import bulk_insert, bulk_update_changed, identifier_map
+
+from sflp_portfolio.models.counterparty import Counterparty
+from sflp_portfolio.models.counterparty_state import CounterpartyState
+from sflp_portfolio.models.enforcement import Enforcement
+from sflp_portfolio.models.forbearance import Forbearance
+from sflp_portfolio.models.import_checkpoint import ImportCheckpoint
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import Portfolio
+from sflp_portfolio.models.model_choices import ZERO_BALANCE_CODE_CHOICES
+from sflp_portfolio.models.models import PortfolioSnapshot
+from sflp_portfolio.models.property_collateral import PropertyCollateral
+from sflp_portfolio.models.property_collateral_state import PropertyCollateralState
+from sflp_portfolio.partitioning import truncate_partitions
+
+FIXTURE_DIR = './sflp_portfolio/fixtures/'
+CHUNK_SIZE = 100000
+
+READ_OPTIONS = dict(sep='|', index_col=None, na_values=None, true_values=['Y'], false_values=['N'])
+
+
+def file_codes(choices):
+    """Raw code of the SFLP files -> stored code, for choices labelled with the raw code, e.g. (0, '(01) Prepaid')"""
+    codes = {}
+    for code, label in choices:
+        raw = re.match(r'\((\d+)\)', label)
+        if raw:
+            codes[int(raw.group(1))] = code
+    return codes
+
+
+ZERO_BALANCE_CODES = file_codes(ZERO_BALANCE_CODE_CHOICES)
+
+
+class TableSpec:
+    """
+    Declarative description of an SFLP data file.
+
+    :param name: Short table name used in progress reports
+    :param model: The model populated from the file
+    :param filename: The file name within the data directory
+    :param columns: The model field held in each column of the file (in file order). Columns that only feed a
+        foreign key carry a source name instead of a field name, columns set to None are skipped
+    :param foreign_keys: Map of foreign key field to a (source column, identifier map) pair
+    :param natural_key: For static tables, the (source column, identifier map) pair identifying existing rows
+    :param codes: Map of coded field to the translation of its raw file codes into stored codes
+    """
+
+    def __init__(self, name, model, filename, columns, foreign_keys=None, natural_key=None, codes=None):
+        self.name = name
+        self.model = model
+        self.filename = filename
+        self.columns = columns
+        self.foreign_keys = foreign_keys or {}
+        self.natural_key = natural_key
+        self.codes = codes or {}
+
+    @property
+    def is_dynamic(self):
+        """Dynamic (state) tables hold one row per loan and monthly reporting period"""
+        return 'period' in self.columns
+
+    @property
+    def text_columns(self):
+        """Columns read as text: identifiers feeding foreign keys and text fields (e.g. coded strings)"""
+        sources = {source for source, _ in self.foreign_keys.values()}
+        text_fields = {f.name for f in self.model._meta.concrete_fields
+                       if isinstance(f, (models.TextField, models.CharField))}
+        return [c for c in self.columns if c in sources or c in text_fields]
+
+
+#
+# Identifier maps used to resolve foreign keys: map name -> (model, natural key)
+#
+
+IDENTIFIER_MAPS = {
+    'portfolio': (Portfolio, 'name'),
+    'snapshot': (PortfolioSnapshot, 'monthly_reporting_period'),
+    'loan': (Loan, 'loan_identifier'),
+    'counterparty': (Counterparty, 'counterparty_identifier'),
+    'property_collateral': (PropertyCollateral, 'loan_identifier__loan_identifier'),
+}
+
+#
+# SFLP data files in load order (static tables before the dynamic tables referring to them)
+#
+
+LOAN_SPEC = TableSpec(
+    'Loan', Loan, 'loan.csv',
+    ['loan_identifier', 'portfolio_name', 'channel', 'original_interest_rate', 'original_upb',
+     'original_loan_term', 'origination_date', 'first_payment_date', 'original_loan_to_value_ratio',
+     'loan_purpose', 'amortization_type', 'relocation_mortgage_indicator', 'high_balance_loan_indicator',
+     'mortgage_insurance_percentage', 'mortgage_insurance_type', 'original_combined_loan_to_value_ratio'],
+    {'portfolio': ('portfolio_name', 'portfolio')},
+    natural_key=('loan_identifier', 'loan'))
+
+# The loan file of the segmented core extracts carries the reporting period in the third column
+CORE_LOAN_SPEC = TableSpec(
+    'Loan', Loan, 'loan.csv', LOAN_SPEC.columns[:2] + [None] + LOAN_SPEC.columns[2:],
+    LOAN_SPEC.foreign_keys, LOAN_SPEC.natural_key)
+
+LOAN_STATE_SPEC = TableSpec(
+    'LoanState', LoanState, 'loan_state.csv',
+    ['loan_id', 'period', 'high_loan_to_value_refinance_option_indicator', 'zero_balance_code',
+     'zero_balance_effective_date', 'upb_at_the_time_of_removal', 'total_principal_current',
+     'last_paid_installment_date', 'months_to_amortization', 'mortgage_insurance_cancellation_indicator',
+     'scheduled_principal_current', 'unscheduled_principal_current', 'zero_balance_code_change_date',
+     'loan_holdback_indicator', 'loan_holdback_effective_date', 'next_interest_rate_adjustment_date',
+     'next_payment_change_date', 'servicer_name', 'current_interest_rate', 'current_actual_upb', 'loan_age',
+     'remaining_months_to_legal_maturity', 'remaining_months_to_maturity', 'maturity_date',
+     'servicing_activity_indicator', 'repayment_history'],
+    {'loan_identifier': ('loan_id', 'loan'), 'portfolio_snapshot_id': ('period', 'snapshot')},
+    codes={'zero_balance_code': ZERO_BALANCE_CODES})
+
+# The core extracts do not include the repayment history
+CORE_LOAN_STATE_SPEC = TableSpec(
+    'LoanState', LoanState, 'loan_state.csv', LOAN_STATE_SPEC.columns[:-1], LOAN_STATE_SPEC.foreign_keys,
+    codes=LOAN_STATE_SPEC.codes)
+
+COUNTERPARTY_SPEC = TableSpec(
+    'Counterparty', Counterparty, 'counterparty.csv',
+    ['counterparty_identifier', 'number_of_borrowers', 'debt_to_income', 'borrower_credit_score_at_origination',
+     'coborrower_credit_score_at_origination', 'first_time_home_buyer_indicator'],
+    # the counterparty ID is identical to the loan ID
+    {'loan_identifier': ('counterparty_identifier', 'loan')},
+    natural_key=('counterparty_identifier', 'counterparty'))
+
+COUNTERPARTY_STATE_SPEC = TableSpec(
+    'CounterpartyState', CounterpartyState, 'counterparty_state.csv',
+    ['counterparty_id', 'period', 'borrower_credit_score_current', 'coborrower_credit_score_current'],
+    {'counterparty_identifier': ('counterparty_id', 'counterparty'), 'portfolio_snapshot_id': ('period', 'snapshot')})
+
+PROPERTY_COLLATERAL_SPEC = TableSpec(
+    'PropertyCollateral', PropertyCollateral, 'property_collateral.csv',
+    ['loan_id', 'property_type', 'number_of_units', 'occupancy_status', 'property_state',
+     'metropolitan_statistical_area', 'zip_code_short'],
+    {'loan_identifier': ('loan_id', 'loan')},
+    natural_key=('loan_id', 'property_collateral'))
+
+PROPERTY_COLLATERAL_STATE_SPEC = TableSpec(
+    'PropertyCollateralState', PropertyCollateralState, 'property_collateral_state.csv',
+    ['loan_id', 'period', 'property_preservation_and_repair_costs', 'miscellaneous_holding_expenses_and_credits',
+     'associated_taxes_for_holding_property', 'property_valuation_method'],
+    {'property_collateral_id': ('loan_id', 'property_collateral'), 'portfolio_snapshot_id': ('period', 'snapshot')})
+
+FORBEARANCE_SPEC = TableSpec(
+    'Forbearance', Forbearance, 'forbearance.csv',
+    ['loan_id', 'period', 'current_loan_delinquency_status', 'modification_flag', 'noninterest_bearing_upb',
+     'principal_forgiveness_amount', 'current_period_modification_loss_amount',
+     'cumulative_modification_loss_amount', 'current_period_credit_event_net_gain_or_loss', None, None,
+     'delinquent_accrued_interest', 'borrower_assistance_plan', 'alternative_delinquency_resolution',
+     'alternative_delinquency_resolution_count', 'total_deferral_amount'],
+    {'loan_identifier': ('loan_id', 'loan'), 'portfolio_snapshot_id': ('period', 'snapshot')})
+
+ENFORCEMENT_SPEC = TableSpec(
+    'Enforcement', Enforcement, 'enforcement.csv',
+    ['loan_id', 'period', 'repurchase_date', 'foreclosure_date', 'disposition_date', 'foreclosure_costs',
+     'asset_recovery_costs', 'net_sales_proceeds', 'credit_enhancement_proceeds', 'repurchase_make_whole_proceeds',
+     'other_foreclosure_proceeds', 'original_list_start_date', 'original_list_price', 'current_list_start_date',
+     'current_list_price', 'cumulative_credit_event_net_gain_or_loss', 'foreclosure_principal_writeoff_amount',
+     'repurchase_make_whole_proceeds_flag'],
+    {'loan_identifier': ('loan_id', 'loan'), 'property_collateral_identifier': ('loan_id', 'property_collateral'),
+     'portfolio_snapshot_id': ('period', 'snapshot')})
+
+FULL_TABLES = [LOAN_SPEC, LOAN_STATE_SPEC, COUNTERPARTY_SPEC, COUNTERPARTY_STATE_SPEC,
+               PROPERTY_COLLATERAL_SPEC, PROPERTY_COLLATERAL_STATE_SPEC, FORBEARANCE_SPEC, ENFORCEMENT_SPEC]
+CORE_TABLES = [CORE_LOAN_SPEC, CORE_LOAN_STATE_SPEC, COUNTERPARTY_SPEC, COUNTERPARTY_STATE_SPEC,
+               PROPERTY_COLLATERAL_SPEC, PROPERTY_COLLATERAL_STATE_SPEC]
+STATIC_TABLES = [CORE_LOAN_SPEC, COUNTERPARTY_SPEC, PROPERTY_COLLATERAL_SPEC]
+
+
+class SFLPLoader:
+    """
+    Loads SFLP data files chunk by chunk, reporting the throughput achieved for each table.
+
+    :param directory: The directory holding the pipe-delimited data files
+    :param chunk_size: The number of rows read (and inserted) at a time
+    :param log: Callable receiving progress messages
+    :param job: Name of the import job under which progress is checkpointed (no checkpoints if None)
+    :param period: Restrict the import to one monthly reporting period, appended to the existing data
+    :param limit: Maximum number of rows read from each data file
+    """
+
+    def __init__(self, directory=FIXTURE_DIR, chunk_size=CHUNK_SIZE, log=print, job=None, period=None, limit=None):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.log = log
+        self.job = job
+        self.period = period
+        self.limit = limit
+        self.maps = {}
+
+    def path(self, filename):
+        return self.directory.rstrip('/') + '/' + filename
+
+    def identifier_map(self, name):
+        """Natural key -> primary key Series for one of the IDENTIFIER_MAPS (cached until reset)"""
+        if name not in self.maps:
+            model, key = IDENTIFIER_MAPS[name]
+            self.maps[name] = identifier_map(model.objects.all(), key)
+        return self.maps[name]
+
+    def reset_maps(self):
+        self.maps = {}
+
+    def load_portfolios(self):
+        data = pd.read_csv(self.path('portfolio.csv'), dtype=str, **READ_OPTIONS)
+        for name in data.iloc[:, 0].dropna().unique():
+            Portfolio.objects.update_or_create(name=name, description='Test SFLP Portfolio')
+        self.reset_maps()
+        self.log('Portfolio: %d portfolios' % len(data))
+
+    def load_snapshots(self):
+        if self.period:
+            periods = [self.period]
+        else:
+            data = pd.read_csv(self.path('portfolio_snapshot.csv'), dtype=str, **READ_OPTIONS)
+            periods = data.iloc[:, 0].dropna().unique()
+        for period in periods:
+            PortfolioSnapshot.objects.get_or_create(monthly_reporting_period=period)
+        self.reset_maps()
+        self.log('PortfolioSnapshot: %d snapshots' % len(periods))
+
+    def clear(self):
+        """Delete all SFLP data (dependent tables are removed by cascade)"""
+        Portfolio.objects.all().delete()
+        PortfolioSnapshot.objects.all().delete()
+        Loan.objects.all().delete()
+        Counterparty.objects.all().delete()
+        Enforcement.objects.all().delete()
+        Forbearance.objects.all().delete()
+        PropertyCollateral.objects.all().delete()
+        self.reset_maps()
+
+    def clear_period(self):
+        """
+        Delete the state rows of the appended period, so that loading a period again replaces them (partitioned
+        tables are truncated)
+        """
+        snapshots = list(PortfolioSnapshot.objects.filter(monthly_reporting_period=self.period)
+                         .values_list('pk', flat=True))
+        truncate_partitions(snapshots)
+        for model in (LoanState, CounterpartyState, PropertyCollateralState, Forbearance, Enforcement):
+            model.objects.filter(portfolio_snapshot_id__in=snapshots).delete()
+
+    def read_chunks(self, spec, skip=0):
+        """Iterate over the file in chunks (after skipping rows), with columns renamed to the names of the spec"""
+        path = self.path(spec.filename)
+        header = list(pd.read_csv(path, nrows=0, **READ_OPTIONS).columns)
+        if len(header) < len(spec.columns):
+            raise ValueError('%s has %d columns, expected at least %d' % (path, len(header), len(spec.columns)))
+        names = dict(zip(header, spec.columns))
+        usecols = [h for h, c in names.items() if c is not None]
+        dtype = {h: str for h, c in names.items() if c in spec.text_columns}
+        nrows = None
+        if self.limit is not None:
+            nrows = self.limit - skip
+            if nrows <= 0:
+                return
+        for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=self.chunk_size, nrows=nrows,
+                                 skiprows=lambda i: 0 < i <= skip, low_memory=False, **READ_OPTIONS):
+            yield chunk.rename(columns=names)
+
+    def prepare_chunk(self, spec, chunk):
+        """Resolve foreign keys, translate raw codes and keep the columns holding model fields"""
+        opts = spec.model._meta
+        frame = chunk.copy()
+        for field_name, codes in spec.codes.items():
+            raw = pd.to_numeric(frame[field_name], errors='coerce')
+            frame[field_name] = raw.map(codes).astype('Int64')
+            unknown = int((frame[field_name].isna() & raw.notna()).sum())
+            if unknown:
+                self.log('%s: %d rows with unknown %s' % (spec.name, unknown, field_name))
+        for field_name, (source, map_name) in spec.foreign_keys.items():
+            ids = self.identifier_map(map_name)
+            attname = opts.get_field(field_name).attname
+            frame[attname] = frame[source].map(ids).astype('Int64')
+            missing = int((frame[attname].isna() & frame[source].notna()).sum())
+            if missing:
+                self.log('%s: %d rows with unresolved %s' % (spec.name, missing, field_name))
+        attnames = {f.attname for f in opts.concrete_fields}
+        return frame[[c for c in frame.columns if c in attnames]]
+
+    def insert_chunk(self, spec, frame):
+        """Insert a prepared chunk (COPY on PostgreSQL, bulk_create otherwise), returns the number of rows"""
+        return bulk_insert(spec.model, frame)
+
+    def write_chunk(self, spec, chunk):
+        """
+        Write a chunk to the database, returns the number of rows inserted and updated. When appending a single
+        period only its state rows are inserted, static rows already stored are updated if their values changed.
+        """
+        if self.period and spec.is_dynamic:
+            chunk = chunk[chunk['period'] == self.period]
+        frame = self.prepare_chunk(spec, chunk)
+        if not (self.period and spec.natural_key):
+            return self.insert_chunk(spec, frame), 0
+        source, map_name = spec.natural_key
+        pks = chunk[source].map(self.identifier_map(map_name)).astype('Int64')
+        stored = pks.notna()
+        existing = frame[stored].assign(**{spec.model._meta.pk.attname: pks[stored]})
+        return self.insert_chunk(spec, frame[~stored]), bulk_update_changed(spec.model, existing)
+
+    def checkpoint(self, spec):
+        """The checkpoint of the table within the current job (None when not checkpointing)"""
+        if self.job is None:
+            return None
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(job=self.job, table=spec.name)
+        return checkpoint
+
+    def load_table(self, spec):
+        """Load one data file chunk by chunk, resuming after the last checkpoint. Returns the number of rows inserted"""
+        checkpoint = self.checkpoint(spec)
+        if checkpoint and checkpoint.completed:
+            self.log('%s: already loaded (%d rows)' % (spec.name, checkpoint.rows_inserted))
+            return 0
+        skip = checkpoint.rows_read if checkpoint else 0
+        if skip:
+            self.log('%s: resuming after %d rows' % (spec.name, skip))
+        start = time.perf_counter()
+        rows = updated = 0
+        for chunk in self.read_chunks(spec, skip):
+            with transaction.atomic():
+                inserted, changed = self.write_chunk(spec, chunk)
+                if checkpoint:
+                    checkpoint.rows_read += len(chunk)
+                    checkpoint.rows_inserted += inserted
+                    checkpoint.rows_updated += changed
+                    checkpoint.chunks_done += 1
+                    checkpoint.save()
+            rows += inserted
+            updated += changed
+        if checkpoint:
+            checkpoint.completed = True
+            checkpoint.save()
+        elapsed = time.perf_counter() - start
+        self.log('%s: %d rows in %.1fs (%s rows/sec)' % (spec.name, rows, elapsed,
+                                                        format(int(rows / elapsed) if elapsed else rows, ',')))
+        if updated:
+            self.log('%s: %d changed rows updated' % (spec.name, updated))
+        # Newly inserted static rows must be visible to the tables that refer to them
+        self.reset_maps()
+        return rows
+
+    def run(self, specs, restart=False):
+        """
+        Run the import job over the given tables. A job without checkpoints starts afresh: all SFLP data is
+        deleted first, or only the state rows of the period when appending one. A job with checkpoints resumes
+        where it stopped.
+        The checkpoints are removed once every table has been loaded.
+        """
+        checkpoints = ImportCheckpoint.objects.filter(job=self.job)
+        if restart:
+            checkpoints.delete()
+        if checkpoints.exists():
+            self.log('Resuming import job %s' % self.job)
+        elif self.period:
+            self.clear_period()
+        else:
+            self.clear()
+        self.load_portfolios()
+        self.load_snapshots()
+        rows = 0
+        for spec in specs:
+            rows += self.load_table(spec)
+        checkpoints.delete()
+        return rows
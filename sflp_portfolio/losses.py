@@ -0,0 +1,215 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Realized losses of liquidated SFLP loans
+
+A loan is liquidated in a snapshot when its enforcement record of the snapshot carries a disposition date or net
+sales proceeds. Its realized loss is the unpaid balance at the time of removal (``LoanState``) plus the foreclosure
+and asset recovery costs, less the net sales, credit enhancement, repurchase make whole and other foreclosure
+proceeds. The loss severity is the loss relative to the balance at removal, the recovery timing the months from the
+last paid installment to the disposition (and from the foreclosure to the disposition).
+
+The inputs of all liquidated loans of a snapshot are read with two grouped queries, the losses computed in one
+vectorized pass and stored as compressed arrays (LiquidationLosses), together with the segment labels of the loans
+(see sflp_portfolio.vintages). Distributions and segment averages are computed from the stored arrays.
+
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+from django.db.models import Max, Min, Q, Sum
+
+from sflp_portfolio.models.enforcement import Enforcement
+from sflp_portfolio.models.liquidation_losses import LiquidationLosses
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import PortfolioSnapshot
+from sflp_portfolio.vintages import DIMENSIONS, loan_segments, month_difference
+
+SEGMENTS = ['vintage'] + DIMENSIONS
+
+PROCEEDS = ['net_sales_proceeds', 'credit_enhancement_proceeds', 'repurchase_make_whole_proceeds',
+            'other_foreclosure_proceeds']
+COSTS = ['foreclosure_costs', 'asset_recovery_costs']
+
+# loss severity bins (severities below 0 and above 1 are counted in the first and last bin)
+SEVERITY_BINS = np.linspace(0, 1, 11)
+# months from the last paid installment to the disposition (longer recoveries are counted in the last bin)
+TIMING_BINS = np.arange(0, 66, 6)
+
+LOAN_ARRAYS = ['loan', 'exposure', 'proceeds', 'costs', 'writeoff', 'loss', 'severity', 'months_to_disposition',
+               'months_in_foreclosure']
+
+
+def liquidations(snapshot_id):
+    """
+    One row per loan liquidated in a snapshot: the summed proceeds, costs and principal write-off of its enforcement
+    records, the foreclosure and disposition dates, the unpaid balance at removal and the last paid installment date
+    """
+    records = Enforcement.objects.filter(
+        Q(disposition_date__isnull=False) | Q(net_sales_proceeds__isnull=False),
+        portfolio_snapshot_id=snapshot_id, loan_identifier__isnull=False)
+    amounts = PROCEEDS + COSTS + ['foreclosure_principal_writeoff_amount']
+    enforcements = records.order_by().values('loan_identifier_id').annotate(
+        **{'total_' + name: Sum(name) for name in amounts},
+        first_foreclosure_date=Min('foreclosure_date'), last_disposition_date=Max('disposition_date')) \
+        .values_list('loan_identifier_id', *['total_' + name for name in amounts], 'first_foreclosure_date',
+                     'last_disposition_date')
+    frame = pd.DataFrame.from_records(list(enforcements), columns=['loan'] + amounts + ['foreclosure_date',
+                                                                                        'disposition_date'])
+    states = LoanState.objects.filter(portfolio_snapshot_id=snapshot_id,
+                                      loan_identifier__in=records.values('loan_identifier_id')).order_by() \
+        .values('loan_identifier_id').annotate(exposure=Max('upb_at_the_time_of_removal'),
+                                               last_paid=Max('last_paid_installment_date')) \
+        .values_list('loan_identifier_id', 'exposure', 'last_paid')
+    states = pd.DataFrame.from_records(list(states), columns=['loan', 'exposure', 'last_paid_installment_date'])
+    return frame.set_index('loan').join(states.set_index('loan')).sort_index()
+
+
+def compute_losses(frame):
+    """The loss arrays (LOAN_ARRAYS) of a frame of liquidations, missing proceeds and costs count as zero"""
+    def amount(columns):
+        return frame[columns].apply(pd.to_numeric).astype(float).fillna(0).sum(axis=1).to_numpy()
+
+    exposure = pd.to_numeric(frame['exposure']).astype(float).to_numpy()
+    proceeds, costs = amount(PROCEEDS), amount(COSTS)
+    loss = exposure + costs - proceeds
+    with np.errstate(invalid='ignore', divide='ignore'):
+        severity = np.where(exposure > 0, loss / exposure, np.nan)
+    return {
+        'loan': frame.index.to_numpy(dtype=np.int64),
+        'exposure': exposure,
+        'proceeds': proceeds,
+        'costs': costs,
+        'writeoff': pd.to_numeric(frame['foreclosure_principal_writeoff_amount']).astype(float).to_numpy(),
+        'loss': loss,
+        'severity': severity,
+        'months_to_disposition': month_difference(frame['last_paid_installment_date'], frame['disposition_date']),
+        'months_in_foreclosure': month_difference(frame['foreclosure_date'], frame['disposition_date']),
+    }
+
+
+def build_losses(snapshot_id):
+    """The loss arrays of the loans liquidated in a snapshot, with the label indexes and labels of their segments"""
+    frame = liquidations(snapshot_id)
+    arrays = compute_losses(frame)
+    segments = loan_segments(Loan.objects.filter(pk__in=Enforcement.objects.filter(
+        portfolio_snapshot_id=snapshot_id).values('loan_identifier_id'))).reindex(frame.index)
+    for name in SEGMENTS:
+        index, labels = pd.factorize(segments[name].fillna('unknown'), sort=True)
+        arrays[name] = index.astype(np.int32)
+        arrays[name + '_labels'] = np.asarray(labels, dtype=str)
+    return arrays
+
+
+def store_losses(snapshot_id, arrays):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    LiquidationLosses.objects.update_or_create(portfolio_snapshot_id_id=snapshot_id, defaults={
+        'loans': len(arrays['loan']), 'arrays': buffer.getvalue()})
+
+
+def snapshot_losses(snapshot_id):
+    """The stored loss arrays of a snapshot, built and stored if missing (nothing is stored for unknown snapshots)"""
+    stored = LiquidationLosses.objects.filter(portfolio_snapshot_id=snapshot_id) \
+        .values_list('arrays', flat=True).first()
+    if stored is None:
+        arrays = build_losses(snapshot_id)
+        if PortfolioSnapshot.objects.filter(pk=snapshot_id).exists():
+            store_losses(snapshot_id, arrays)
+        return arrays
+    with np.load(io.BytesIO(bytes(stored))) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+def distribution(values, bins):
+    """Counts of the values in bins, values outside the bins are counted in the first and last bin"""
+    values = values[~np.isnan(values)]
+    counts = np.bincount(np.clip(np.digitize(values, bins) - 1, 0, len(bins) - 2), minlength=len(bins) - 1)
+    return {'bins': bins, 'counts': counts}
+
+
+def totals(arrays, selected=None):
+    """Totals and averages of the liquidations (optionally of a boolean selection of the loans)"""
+    if selected is not None:
+        arrays = {name: arrays[name][selected] for name in LOAN_ARRAYS}
+    exposure, loss = np.nansum(arrays['exposure']), np.nansum(arrays['loss'][~np.isnan(arrays['exposure'])])
+
+    def mean(name):
+        values = arrays[name][~np.isnan(arrays[name])]
+        return float(values.mean()) if len(values) else None
+
+    return {
+        'loans': len(arrays['loan']),
+        'exposure': float(exposure),
+        'loss': float(loss),
+        'proceeds': float(np.nansum(arrays['proceeds'])),
+        'costs': float(np.nansum(arrays['costs'])),
+        'severity': float(loss / exposure) if exposure > 0 else None,
+        'mean_severity': mean('severity'),
+        'mean_months_to_disposition': mean('months_to_disposition'),
+        'mean_months_in_foreclosure': mean('months_in_foreclosure'),
+    }
+
+
+def loss_summary(arrays, group_by=None):
+    """
+    The totals, exposure weighted and mean severity and mean recovery timing of the liquidations of a snapshot, the
+    distributions of the severities and of the months to disposition and, with ``group_by`` (one of SEGMENTS), the
+    same totals per segment
+    """
+    result = totals(arrays)
+    result['severity_distribution'] = distribution(arrays['severity'], SEVERITY_BINS)
+    result['timing_distribution'] = distribution(arrays['months_to_disposition'], TIMING_BINS)
+    if group_by:
+        codes = arrays[group_by]
+        result['segments'] = [{group_by: str(label), **totals(arrays, codes == code)}
+                              for code, label in enumerate(arrays[group_by + '_labels']) if (codes == code).any()]
+    return result
+
+
+def invalidate(snapshot_ids=None):
+    """Remove the stored losses of the snapshots, without snapshots all stored losses"""
+    stored = LiquidationLosses.objects.all()
+    if snapshot_ids is not None:
+        stored = stored.filter(portfolio_snapshot_id__in=snapshot_ids)
+    stored.delete()
+
+
+def loan_data_saved(sender, instance, **kwargs):
+    """post_save receiver of LoanState and Enforcement, removes the losses of the snapshots liquidating the loan"""
+    if instance.loan_identifier_id:
+        LiquidationLosses.objects.filter(portfolio_snapshot_id__in=Enforcement.objects.filter(
+            loan_identifier=instance.loan_identifier_id).values('portfolio_snapshot_id')).delete()
+
+
+def loan_data_bulk_saved(sender, created=False, snapshots=None, **kwargs):
+    """
+    bulk_saved receiver of the SFLP loan tables, removes the losses of the snapshots of the saved rows. Inserted
+    rows of the static tables (loans, counterparties, collateral) are not part of any stored losses yet, updated ones
+    remove the losses of all snapshots.
+    """
+    if snapshots is not None:
+        if snapshots:
+            invalidate(snapshots)
+    elif not created:
+        invalidate()
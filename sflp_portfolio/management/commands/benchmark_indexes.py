@@ -0,0 +1,133 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from common.indexes import brin_indexes
+from common.ingestion import bulk_insert, identifier_map
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import PortfolioSnapshot
+
+PREFIX = 'BENCH'
+
+
+class Command(BaseCommand):
+    help = 'Compares query plans and timings of the hot SFLP filter paths with and without the openNPL indexes ' \
+           'on a synthetic dataset. The indexes are dropped inside a transaction that is rolled back (on ' \
+           'PostgreSQL this locks the tables while the benchmark runs).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000000, help='Number of synthetic loan state rows')
+        parser.add_argument('--periods', type=int, default=12, help='Number of monthly reporting periods')
+        parser.add_argument('--chunk-size', type=int, default=500000, help='Number of rows inserted at a time')
+        parser.add_argument('--repeat', type=int, default=5, help='Executions timed per query')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic dataset after the benchmark')
+
+    def handle(self, *args, **options):
+        snapshots = self.generate(options['rows'], options['periods'], options['chunk_size'])
+        loan = Loan.objects.filter(loan_identifier__startswith=PREFIX).order_by('-pk').first()
+        snapshot = snapshots[len(snapshots) // 2]
+        queries = {
+            'loan by identifier': lambda: Loan.objects.filter(loan_identifier=loan.loan_identifier),
+            'loan state by snapshot and loan': lambda: LoanState.objects.filter(portfolio_snapshot_id=snapshot,
+                                                                                loan_identifier=loan),
+            'loan history': lambda: LoanState.objects.filter(loan_identifier=loan).order_by('portfolio_snapshot_id'),
+            'terminated loans of a snapshot': lambda: LoanState.objects.filter(
+                portfolio_snapshot_id=snapshot, zero_balance_code__isnull=False),
+            'states of the last period': lambda: LoanState.objects.filter(portfolio_snapshot_id__gte=snapshots[-1]),
+        }
+        try:
+            with transaction.atomic():
+                self.drop_indexes()
+                before = self.run_queries(queries, options['repeat'])
+                transaction.set_rollback(True)
+            after = self.run_queries(queries, options['repeat'])
+            for name in queries:
+                self.stdout.write(self.style.MIGRATE_HEADING('%s: %.2f ms without, %.2f ms with indexes' % (
+                    name, before[name][0], after[name][0])))
+                self.stdout.write('-- without indexes\n%s\n-- with indexes\n%s\n' % (before[name][1], after[name][1]))
+        finally:
+            if not options['keep']:
+                self.clear(snapshots)
+
+    def generate(self, rows, periods, chunk_size):
+        """Insert a synthetic portfolio of rows // periods loans observed in each period"""
+        count = max(rows // periods, 1)
+        rng = np.random.default_rng(0)
+        self.stdout.write('Generating %s loan states (%s loans x %d periods)' % (format(count * periods, ','),
+                                                                               format(count, ','), periods))
+        for start in range(0, count, chunk_size):
+            ids = np.arange(start, min(start + chunk_size, count))
+            bulk_insert(Loan, pd.DataFrame({'loan_identifier': ['%s%09d' % (PREFIX, i) for i in ids]}))
+        loan_ids = identifier_map(Loan.objects.filter(loan_identifier__startswith=PREFIX), 'loan_identifier')
+        loan_ids = loan_ids.sort_index().to_numpy(dtype=np.int64)
+
+        snapshots = []
+        for period in range(periods):
+            snapshot = PortfolioSnapshot.objects.create(name=PREFIX, monthly_reporting_period='%s-%02d' % (
+                PREFIX, period + 1))
+            snapshots.append(snapshot)
+            for start in range(0, count, chunk_size):
+                ids = loan_ids[start:start + chunk_size]
+                terminated = rng.random(len(ids)) < 0.01
+                bulk_insert(LoanState, pd.DataFrame({
+                    'portfolio_snapshot_id_id': snapshot.pk,
+                    'loan_identifier_id': ids,
+                    'current_actual_upb': rng.uniform(10000, 500000, len(ids)).round(2),
+                    'zero_balance_code': pd.Series(rng.integers(0, 10, len(ids))).where(terminated).astype('Int64'),
+                }))
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE %s' % connection.ops.quote_name(LoanState._meta.db_table))
+                cursor.execute('ANALYZE %s' % connection.ops.quote_name(Loan._meta.db_table))
+        return snapshots
+
+    def drop_indexes(self):
+        """Drop the indexes declared by the Loan and LoanState models and the BRIN indexes (within a transaction)"""
+        quote = connection.ops.quote_name
+        names = [index.name for model in (Loan, LoanState) for index in model._meta.indexes]
+        names += [name for model, columns, name in brin_indexes('sflp_portfolio')]
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute('DROP INDEX IF EXISTS %s' % quote(name))
+
+    def run_queries(self, queries, repeat):
+        """Mean execution time in ms and the plan of each query"""
+        results = {}
+        options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+        for name, queryset in queries.items():
+            list(queryset())
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset())
+            elapsed = (time.perf_counter() - start) * 1000 / repeat
+            results[name] = (elapsed, queryset().explain(**options))
+        return results
+
+    def clear(self, snapshots):
+        LoanState.objects.filter(portfolio_snapshot_id__in=snapshots).delete()
+        PortfolioSnapshot.objects.filter(pk__in=[s.pk for s in snapshots]).delete()
+        Loan.objects.filter(loan_identifier__startswith=PREFIX).delete()
@@ -0,0 +1,58 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sflp_portfolio import delinquency, losses
+from sflp_portfolio.models.models import PortfolioSnapshot
+from sflp_portfolio.partitioning import detach_partitions
+
+
+class Command(BaseCommand):
+    help = 'Detaches the partitions of a monthly reporting period from the partitioned SFLP tables, e.g. to ' \
+           'archive them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', help='The monthly reporting period of the snapshot')
+        parser.add_argument('--drop', action='store_true', help='Drop the detached partitions')
+        parser.add_argument('--delete-snapshot', action='store_true',
+                            help='Delete the portfolio snapshot after dropping its partitions (requires --drop, '
+                                 'detached partitions keep their foreign key to the snapshot)')
+
+    def handle(self, *args, **options):
+        if options['delete_snapshot'] and not options['drop']:
+            raise CommandError('--delete-snapshot requires --drop, the detached partitions reference the snapshot')
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL')
+        snapshots = PortfolioSnapshot.objects.filter(monthly_reporting_period=options['period'])
+        if not snapshots:
+            raise CommandError('Unknown reporting period: %s' % options['period'])
+        for snapshot in snapshots:
+            names = detach_partitions(snapshot.pk, drop=options['drop'])
+            if not names:
+                raise CommandError('The SFLP tables are not partitioned, see partition_sflp_tables')
+            self.stdout.write('%s %s' % ('Dropped' if options['drop'] else 'Detached', ', '.join(names)))
+            delinquency.invalidate(snapshot.pk)
+            losses.invalidate([snapshot.pk])
+            if options['delete_snapshot']:
+                snapshot.delete()
+
+        self.stdout.write(self.style.SUCCESS('Successfully detached period %s' % options['period']))
@@ -18,277 +18,29 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import numpy as np
-import pandas as pd
 from django.core.management.base import BaseCommand
 
-from sflp_portfolio.models.counterparty import Counterparty
-from sflp_portfolio.models.counterparty_state import CounterpartyState
-from sflp_portfolio.models.loan import Loan
-from sflp_portfolio.models.loan_state import LoanState
-from sflp_portfolio.models.models import Portfolio
-from sflp_portfolio.models.models import PortfolioSnapshot
-from sflp_portfolio.models.property_collateral import PropertyCollateral
-from sflp_portfolio.models.property_collateral_state import PropertyCollateralState
-
-"""
-Note: this is not a performant insertion of data, use for debugging data schemas / pipelines 
-
-"""
+from sflp_portfolio.loader import SFLPLoader, CORE_TABLES, FIXTURE_DIR, CHUNK_SIZE
 
 
 class Command(BaseCommand):
     help = 'Imports Segmented Single Family Loan Performance data (Core Models)'
 
-    # Clean up the database
-    Portfolio.objects.all().delete()
-    PortfolioSnapshot.objects.all().delete()
-    Loan.objects.all().delete()
-    Counterparty.objects.all().delete()
-    PropertyCollateral.objects.all().delete()
-
-    #
-    # Portfolio data
-    #
-    portfolio_data = pd.read_csv("./sflp_portfolio/fixtures/portfolio.csv", sep='|', index_col=None, low_memory=False,
-                                 na_values=None,
-                                 true_values=['Y'], false_values=['N'])
-    print('Loaded Portfolio Data')
-
-    portfolio_dict = {}
-    for index, entry in portfolio_data.iterrows():
-        portfolio, _ = Portfolio.objects.update_or_create(
-            name=entry[0],
-            description='Test SFLP Portfolio',
-        )
-        portfolio.save()
-        portfolio_dict[entry[0]] = portfolio
-
-    print('Created Portfolio Entities')
-    #
-    # Portfolio snapshot data
-    #
-    portfolio_snapshot_data = pd.read_csv("./sflp_portfolio/fixtures/portfolio_snapshot.csv", sep='|', index_col=None,
-                                          low_memory=False, na_values=None,
-                                          true_values=['Y'], false_values=['N'])
-
-    print('Loaded Portfolio Snapshots')
-    portfolio_snapshot_dict = {}
-    for index, entry in portfolio_snapshot_data.iterrows():
-        portfolio_snapshot, _ = PortfolioSnapshot.objects.update_or_create(
-            monthly_reporting_period=entry[0],
-        )
-        portfolio_snapshot.save()
-        portfolio_snapshot_dict[entry[0]] = portfolio_snapshot
-
-    print('Created Portfolio Snapshots')
-    #
-    # Static Loan Data
-    #
-    loan_data = pd.read_csv("./sflp_portfolio/fixtures/loan.csv", sep='|', index_col=None, low_memory=False,
-                            na_values=None,
-                            true_values=['Y'], false_values=['N'])
-
-    print('Loaded Static Loan Data')
-    loan_data_list = []
-    i = 0
-    loan_dict = {}
-    for index, entry in loan_data.iterrows():
-        # print('Loan: ', i)
-        loan = Loan(
-            id=i,
-            loan_identifier=entry[0],
-            portfolio=portfolio_dict[entry[1]],
-            # snapshot=portfolio_snapshot_dict[entry[2]],
-            channel=entry[3],
-            original_interest_rate=entry[4],
-            original_upb=entry[5],
-            original_loan_term=entry[6],
-            origination_date=entry[7],
-            first_payment_date=entry[8],
-            original_loan_to_value_ratio=entry[9],
-            loan_purpose=entry[10],
-            amortization_type=entry[11],
-            relocation_mortgage_indicator=entry[12],
-            high_balance_loan_indicator=entry[13],
-            mortgage_insurance_percentage=entry[14],
-            mortgage_insurance_type=entry[15],
-            original_combined_loan_to_value_ratio=entry[16],
-            # prepayment_penalty_indicator=entry[17],
-            # interest_only_loan_indicator=entry[18],
-        )
-        # loan.save()
-        loan_data_list.append(loan)
-        loan_dict[entry[0]] = loan
-        i += 1
-
-    Loan.objects.bulk_create(loan_data_list)
-    print('Created Static Loan Entries')
-    #
-    # Dynamic Loan Data
-    #
-
-    column_datatypes = {
-        'zero_balance_code': pd.Int64Dtype(),
-        'loan_holdback_indicator': pd.Int64Dtype()
-    }
-    loan_state_data = pd.read_csv("./sflp_portfolio/fixtures/loan_state.csv", sep='|', index_col=None,
-                                  true_values=['Y'], false_values=['N'], dtype=column_datatypes)
-
-    loan_state_data = loan_state_data.replace({np.nan: None})
-
-    print("Loaded Dynamic Loan Data")
-
-    loan_state_data_list = []
-    i = 0
-    for index, entry in loan_state_data.iterrows():
-        # print('LoanState: ', i)
-        loan_state = LoanState(
-            id=i,
-            loan_identifier=loan_dict[entry[0]],
-            portfolio_snapshot_id=portfolio_snapshot_dict[entry[1]],
-            high_loan_to_value_refinance_option_indicator=entry[2],
-            zero_balance_code=entry[3],
-            zero_balance_effective_date=entry[4],
-            upb_at_the_time_of_removal=entry[5],
-            total_principal_current=entry[6],
-            last_paid_installment_date=entry[7],
-            months_to_amortization=entry[8],
-            mortgage_insurance_cancellation_indicator=entry[9],
-            scheduled_principal_current=entry[10],
-            unscheduled_principal_current=entry[11],
-            zero_balance_code_change_date=entry[12],
-            loan_holdback_indicator=entry[13],
-            loan_holdback_effective_date=entry[14],
-            next_interest_rate_adjustment_date=entry[15],
-            next_payment_change_date=entry[16],
-            servicer_name=entry[17],
-            current_interest_rate=entry[18],
-            current_actual_upb=entry[19],
-            loan_age=entry[20],
-            remaining_months_to_legal_maturity=entry[21],
-            remaining_months_to_maturity=entry[22],
-            maturity_date=entry[23],
-            servicing_activity_indicator=entry[24]
-        )
-        loan_state_data_list.append(loan_state)
-        i += 1
-
-    LoanState.objects.bulk_create(loan_state_data_list)
-    print("Created Dynamic Loan Data")
-
-    #
-    # Static Counterparty data
-    #
-    counterparty_data = pd.read_csv("./sflp_portfolio/fixtures/counterparty.csv", sep='|', index_col=None,
-                                    low_memory=False, na_values=None,
-                                    true_values=['Y'], false_values=['N'])
-
-    print("Loaded Static Counterparty Data")
-
-    counterparty_data_list = []
-    i = 0
-    counterparty_dict = {}
-    for index, entry in counterparty_data.iterrows():
-        counterparty = Counterparty(
-            id=i,
-            loan_identifier=loan_dict[entry[0]],  # loan FK reference
-            counterparty_identifier=entry[0],  # counterparty ID is identical to loan ID
-            number_of_borrowers=entry[1],
-            debt_to_income=entry[2],
-            borrower_credit_score_at_origination=entry[3],
-            coborrower_credit_score_at_origination=entry[4],
-            first_time_home_buyer_indicator=entry[5],
-        )
-        counterparty_data_list.append(counterparty)
-        counterparty_dict[entry[0]] = counterparty
-        i += 1
-
-    Counterparty.objects.bulk_create(counterparty_data_list)
-    print("Created Static Counterparty Data")
-
-    #
-    # Counterparty State data
-    #
-    counterparty_state_data = pd.read_csv("./sflp_portfolio/fixtures/counterparty_state.csv", sep='|', index_col=None,
-                                          low_memory=False, na_values=None,
-                                          true_values=['Y'], false_values=['N'])
-    counterparty_state_data = counterparty_state_data.replace({np.nan: None})
-
-    print("Loaded Counterparty State Data")
-
-    counterparty_state_data_list = []
-    i = 0
-    for index, entry in counterparty_state_data.iterrows():
-        counterparty_state = CounterpartyState(
-            id=i,
-            counterparty_identifier=counterparty_dict[entry[0]],
-            portfolio_snapshot_id=portfolio_snapshot_dict[entry[1]],
-            borrower_credit_score_current=entry[2],
-            coborrower_credit_score_current=entry[3],
-        )
-        counterparty_state_data_list.append(counterparty_state)
-        i += 1
-
-    CounterpartyState.objects.bulk_create(counterparty_state_data_list)
-    print("Created Counterparty State Data")
-
-    #
-    # Static Property collateral data
-    #
-    property_collateral_data = pd.read_csv("./sflp_portfolio/fixtures/property_collateral.csv", sep='|', index_col=None,
-                                           low_memory=False, na_values=None,
-                                           true_values=['Y'], false_values=['N'])
-
-    print("Loaded Static Collateral Data")
-
-    property_collateral_data_list = []
-    i = 0
-    property_collateral_dict = {}
-    for index, entry in property_collateral_data.iterrows():
-        property_collateral = PropertyCollateral(
-            id=i,
-            loan_identifier=loan_dict[entry[0]],  # loan FK reference
-            property_type=entry[1],
-            number_of_units=entry[2],
-            occupancy_status=entry[3],
-            property_state=entry[4],
-            metropolitan_statistical_area=entry[5],
-            zip_code_short=entry[6]
-        )
-        property_collateral_data_list.append(property_collateral)
-        i += 1
-        property_collateral_dict[entry[0]] = property_collateral
-    PropertyCollateral.objects.bulk_create(property_collateral_data_list)
-    print("Created Property Collateral Static Data")
-
-    #
-    # Property Collateral State data
-    #
-    property_collateral_state_data = pd.read_csv("./sflp_portfolio/fixtures/property_collateral_state.csv", sep='|',
-                                                 index_col=None,
-                                                 low_memory=False, na_values=None,
-                                                 true_values=['Y'], false_values=['N'])
-    property_collateral_state_data = property_collateral_state_data.replace({np.nan: None})
-    print("Loaded Property Collateral State Data")
-
-    property_collateral_state_data_list = []
-    i = 0
-    for index, entry in property_collateral_state_data.iterrows():
-        property_collateral_state = PropertyCollateralState(
-            id=i,
-            property_collateral_id=property_collateral_dict[entry[0]],
-            portfolio_snapshot_id=portfolio_snapshot_dict[entry[1]],
-            property_preservation_and_repair_costs=entry[2],
-            miscellaneous_holding_expenses_and_credits=entry[3],
-            associated_taxes_for_holding_property=entry[4],
-            property_valuation_method=entry[5],
-        )
-        property_collateral_state_data_list.append(property_collateral_state)
-        i += 1
-
-    PropertyCollateralState.objects.bulk_create(property_collateral_state_data_list)
-    print("Created Property Collateral State Data")
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default=FIXTURE_DIR,
+                            help='Directory holding the pipe-delimited SFLP data files')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Number of rows read and inserted at a time')
+        parser.add_argument('--snapshot', metavar='PERIOD',
+                            help='Append a single monthly reporting period (e.g. 012020) to the existing data')
+        parser.add_argument('--restart', action='store_true',
+                            help='Discard the checkpoints of an interrupted import and start again')
 
     def handle(self, *args, **options):
+        period = options['snapshot']
+        job = 'load_core_sflp_csv' + (':' + period if period else '')
+        loader = SFLPLoader(options['directory'], options['chunk_size'], log=self.stdout.write, job=job,
+                            period=period)
+        loader.run(CORE_TABLES, restart=options['restart'])
+
         self.stdout.write(self.style.SUCCESS('Successfully inserted Core SFLP data into database'))
@@ -0,0 +1,43 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sflp_portfolio.models.models import PortfolioSnapshot
+from sflp_portfolio.partitioning import is_partitioned, partition_table, partitioned_models
+
+
+class Command(BaseCommand):
+    help = 'Converts the SFLP time series tables into tables partitioned by portfolio snapshot (PostgreSQL only)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL')
+        snapshot_ids = list(PortfolioSnapshot.objects.order_by('pk').values_list('pk', flat=True))
+        for model in partitioned_models():
+            if is_partitioned(model):
+                self.stdout.write('%s is already partitioned' % model._meta.db_table)
+                continue
+            partition_table(model, snapshot_ids)
+            self.stdout.write('%s: %d partitions' % (model._meta.db_table, len(snapshot_ids)))
+
+        self.stdout.write(self.style.SUCCESS('Successfully partitioned the SFLP tables. Enable '
+                                             'SFLP_PARTITION_BY_SNAPSHOT to create the partitions of new snapshots'))
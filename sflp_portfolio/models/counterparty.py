@@ -103,3 +103,6 @@ class Counterparty(models.Model):
     class Meta:
         verbose_name = "Counterparty"
         verbose_name_plural = "Counterparties"
+        indexes = [
+            models.Index(fields=['counterparty_identifier'], name='sflp_cp_identifier_idx'),
+        ]
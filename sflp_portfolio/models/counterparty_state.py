@@ -76,3 +76,6 @@ class CounterpartyState(models.Model):
     class Meta:
         verbose_name = "Counterparty State"
         verbose_name_plural = "Counterparty States"
+        indexes = [
+            models.Index(fields=['portfolio_snapshot_id', 'counterparty_identifier'], name='sflp_cps_snapshot_cp_idx'),
+        ]
@@ -0,0 +1,53 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.db import models
+
+from sflp_portfolio.models.models import PortfolioSnapshot
+
+
+class DelinquencyPanel(models.Model):
+    """
+    The DelinquencyPanel model stores the decoded payment histories and delinquency status of the loans of a
+    portfolio snapshot as compressed NumPy arrays (see sflp_portfolio.delinquency). Panels are removed when the loan
+    states or forbearance records of their snapshot change and rebuilt on the next request.
+
+    """
+
+    portfolio_snapshot_id = models.OneToOneField(PortfolioSnapshot, on_delete=models.CASCADE,
+                                                 related_name='delinquency_panel',
+                                                 help_text="The portfolio snapshot of the panel")
+    """The portfolio snapshot of the panel"""
+
+    loans = models.IntegerField(default=0, help_text='Number of loans (rows) of the panel')
+    """Number of loans (rows) of the panel"""
+
+    arrays = models.BinaryField(help_text='The arrays of the panel in the NumPy npz format')
+    """The arrays of the panel in the NumPy npz format"""
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+    creation_date = models.DateTimeField(auto_now_add=True)
+    """The first insertion date of the data point"""
+
+    class Meta:
+        verbose_name = "Delinquency Panel"
+        verbose_name_plural = "Delinquency Panels"
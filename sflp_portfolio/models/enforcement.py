@@ -137,3 +137,6 @@ class Enforcement(models.Model):
     class Meta:
         verbose_name = "Enforcement"
         verbose_name_plural = "Enforcement"
+        indexes = [
+            models.Index(fields=['portfolio_snapshot_id', 'loan_identifier'], name='sflp_enf_snapshot_loan_idx'),
+        ]
@@ -131,3 +131,6 @@ class Forbearance(models.Model):
     class Meta:
         verbose_name = "Forbearance"
         verbose_name_plural = "Forbearance"
+        indexes = [
+            models.Index(fields=['portfolio_snapshot_id', 'loan_identifier'], name='sflp_forb_snapshot_loan_idx'),
+        ]
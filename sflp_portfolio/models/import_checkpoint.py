@@ -0,0 +1,72 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.db import models
+
+
+class ImportCheckpoint(models.Model):
+    """
+    The ImportCheckpoint model records the progress of a chunked SFLP data import, one entry per import job and data
+    table. It is updated in the same transaction as each inserted chunk, so an interrupted import can resume after
+    the last committed chunk instead of starting again.
+
+    .. note:: Checkpoints of a job are removed once all its tables have been loaded
+
+    """
+
+    job = models.CharField(max_length=200,
+                           help_text='The import job (command and reporting period) the checkpoint belongs to')
+    """The import job (command and reporting period) the checkpoint belongs to"""
+
+    table = models.CharField(max_length=100, help_text='The data table being loaded')
+    """The data table being loaded"""
+
+    rows_read = models.BigIntegerField(default=0, help_text='Number of data file rows processed so far')
+    """Number of data file rows processed so far"""
+
+    rows_inserted = models.BigIntegerField(default=0, help_text='Number of database rows inserted so far')
+    """Number of database rows inserted so far"""
+
+    rows_updated = models.BigIntegerField(default=0, help_text='Number of existing database rows updated so far')
+    """Number of existing database rows updated so far"""
+
+    chunks_done = models.IntegerField(default=0, help_text='Number of chunks committed so far')
+    """Number of chunks committed so far"""
+
+    completed = models.BooleanField(default=False, help_text='Whether the table has been loaded in full')
+    """Whether the table has been loaded in full"""
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+    creation_date = models.DateTimeField(auto_now_add=True)
+    """The first insertion date of the data point"""
+
+    last_change_date = models.DateTimeField(auto_now=True)
+    """The last change date of the data point"""
+
+    def __str__(self):
+        """String representing the data object"""
+        return self.job + ' / ' + self.table
+
+    class Meta:
+        verbose_name = "Import Checkpoint"
+        verbose_name_plural = "Import Checkpoints"
+        unique_together = [['job', 'table']]
@@ -179,3 +179,6 @@ class Loan(models.Model):
     class Meta:
         verbose_name = "Loan"
         verbose_name_plural = "Loans"
+        indexes = [
+            models.Index(fields=['loan_identifier'], name='sflp_loan_identifier_idx'),
+        ]
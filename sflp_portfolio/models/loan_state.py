@@ -19,6 +19,7 @@
 # SOFTWARE.
 
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 
 from sflp_portfolio.models.loan import Loan
@@ -194,3 +195,9 @@ class LoanState(models.Model):
     class Meta:
         verbose_name = "Loan State"
         verbose_name_plural = "Loan States"
+        indexes = [
+            models.Index(fields=['portfolio_snapshot_id', 'loan_identifier'], name='sflp_ls_snapshot_loan_idx'),
+            models.Index(fields=['loan_identifier', 'portfolio_snapshot_id'], name='sflp_ls_loan_snapshot_idx'),
+            models.Index(fields=['portfolio_snapshot_id', 'zero_balance_code'], name='sflp_ls_zero_balance_idx',
+                         condition=Q(zero_balance_code__isnull=False)),
+        ]
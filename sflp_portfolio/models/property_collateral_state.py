@@ -85,3 +85,6 @@ class PropertyCollateralState(models.Model):
     class Meta:
         verbose_name = "Property Collateral State"
         verbose_name_plural = "Property Collateral States"
+        indexes = [
+            models.Index(fields=['portfolio_snapshot_id', 'property_collateral_id'], name='sflp_pcs_snapshot_pc_idx'),
+        ]
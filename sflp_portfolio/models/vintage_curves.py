@@ -0,0 +1,56 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from django.db import models
+
+from sflp_portfolio.models.models import Portfolio, PortfolioSnapshot
+
+
+class VintageCurves(models.Model):
+    """
+    The VintageCurves model stores the default and prepayment events of the loans of a portfolio, grouped by
+    origination quarter, channel, loan purpose, property state and FICO band, as compressed NumPy arrays (see
+    sflp_portfolio.vintages). The arrays are rebuilt when a newer portfolio snapshot is available and removed when
+    the loan data are bulk loaded.
+
+    """
+
+    portfolio = models.OneToOneField(Portfolio, on_delete=models.CASCADE, related_name='vintage_curves',
+                                     help_text="The portfolio of the vintage curves")
+    """The portfolio of the vintage curves"""
+
+    portfolio_snapshot_id = models.ForeignKey(PortfolioSnapshot, on_delete=models.SET_NULL, blank=True, null=True,
+                                              help_text="The latest portfolio snapshot when the curves were built")
+    """The latest portfolio snapshot when the curves were built"""
+
+    loans = models.IntegerField(default=0, help_text='Number of loans of the vintage curves')
+    """Number of loans of the vintage curves"""
+
+    arrays = models.BinaryField(help_text='The arrays of the vintage curves in the NumPy npz format')
+    """The arrays of the vintage curves in the NumPy npz format"""
+
+    #
+    # BOOKKEEPING FIELDS
+    #
+    creation_date = models.DateTimeField(auto_now_add=True)
+    """The first insertion date of the data point"""
+
+    class Meta:
+        verbose_name = "Vintage Curves"
+        verbose_name_plural = "Vintage Curves"
@@ -0,0 +1,164 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Optional PostgreSQL partitioning of the SFLP time series tables by portfolio snapshot (monthly reporting period)
+
+With ``SFLP_PARTITION_BY_SNAPSHOT`` enabled the state tables are converted (``partition_sflp_tables`` command) into
+tables LIST partitioned on ``portfolio_snapshot_id``, with one partition per snapshot and a default partition. The
+partitions of a snapshot are created when the snapshot is saved. Queries filtering on the snapshot only scan its
+partitions, reloading a period truncates its partitions and an old period is archived by detaching them
+(``detach_sflp_snapshot`` command) instead of deleting millions of rows.
+
+The primary key of a partitioned table must include the partition key, hence the tables get the composite primary
+key (id, portfolio_snapshot_id) and rows must belong to a snapshot. Django keeps addressing rows by ``id``, which
+remains unique (drawn from one sequence).
+
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from common.indexes import brin_indexes
+
+PARTITIONED_MODELS = ['LoanState', 'CounterpartyState', 'PropertyCollateralState', 'Forbearance', 'Enforcement']
+PARTITION_KEY = 'portfolio_snapshot_id'
+
+
+def partitioning_enabled(using=DEFAULT_DB_ALIAS):
+    return getattr(settings, 'SFLP_PARTITION_BY_SNAPSHOT', False) and connections[using].vendor == 'postgresql'
+
+
+def partitioned_models():
+    return [apps.get_model('sflp_portfolio', name) for name in PARTITIONED_MODELS]
+
+
+def partition_name(model, snapshot_id):
+    return '%s_p%d' % (model._meta.db_table, snapshot_id)
+
+
+def is_partitioned(model, using=DEFAULT_DB_ALIAS):
+    """Whether the table of a model is a partitioned table"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+                       'WHERE c.relname = %s AND pg_table_is_visible(c.oid)', [model._meta.db_table])
+        return cursor.fetchone() is not None
+
+
+def create_partitions(snapshot_id, using=DEFAULT_DB_ALIAS):
+    """Create the partitions of a snapshot in the partitioned tables"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in partitioned_models():
+            if is_partitioned(model, using):
+                cursor.execute('CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES IN (%d)' % (
+                    quote(partition_name(model, snapshot_id)), quote(model._meta.db_table), int(snapshot_id)))
+
+
+def truncate_partitions(snapshot_ids, using=DEFAULT_DB_ALIAS):
+    """Empty the existing partitions of snapshots"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in partitioned_models():
+            if not is_partitioned(model, using):
+                continue
+            for snapshot_id in snapshot_ids:
+                name = partition_name(model, snapshot_id)
+                cursor.execute('SELECT to_regclass(%s)', [name])
+                if cursor.fetchone()[0] is not None:
+                    cursor.execute('TRUNCATE %s' % quote(name))
+
+
+def detach_partitions(snapshot_id, drop=False, using=DEFAULT_DB_ALIAS):
+    """
+    Detach the partitions of a snapshot from the partitioned tables (they remain available as plain tables for
+    archiving unless dropped), returns the names of the partitions
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    names = []
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for model in partitioned_models():
+            if not is_partitioned(model, using):
+                continue
+            name = partition_name(model, snapshot_id)
+            cursor.execute('ALTER TABLE %s DETACH PARTITION %s' % (quote(model._meta.db_table), quote(name)))
+            if drop:
+                cursor.execute('DROP TABLE %s' % quote(name))
+            names.append(name)
+    return names
+
+
+def partition_table(model, snapshot_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Convert the table of a model into a table partitioned by snapshot, with partitions for the given snapshots and
+    a default partition. The rows are copied into the new table, constraints and indexes are recreated.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    old = table + '_unpartitioned'
+    sequence = table + '_pk_seq'
+    pk = model._meta.pk.column
+    key = model._meta.get_field(PARTITION_KEY).column
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute('LOCK TABLE %s IN ACCESS EXCLUSIVE MODE' % quote(table))
+            cursor.execute('ALTER TABLE %s RENAME TO %s' % (quote(table), quote(old)))
+            cursor.execute('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS) PARTITION BY LIST (%s)' % (
+                quote(table), quote(old), quote(key)))
+            cursor.execute('CREATE SEQUENCE %s OWNED BY %s.%s' % (quote(sequence), quote(table), quote(pk)))
+            cursor.execute("ALTER TABLE %s ALTER COLUMN %s SET DEFAULT nextval('%s')" % (
+                quote(table), quote(pk), sequence))
+            cursor.execute('SELECT setval(%%s, COALESCE((SELECT MAX(%s) FROM %s), 0) + 1, false)' % (
+                quote(pk), quote(old)), [sequence])
+            cursor.execute('ALTER TABLE %s ALTER COLUMN %s SET NOT NULL' % (quote(table), quote(key)))
+            cursor.execute('ALTER TABLE %s ADD PRIMARY KEY (%s, %s)' % (quote(table), quote(pk), quote(key)))
+            for snapshot_id in snapshot_ids:
+                cursor.execute('CREATE TABLE %s PARTITION OF %s FOR VALUES IN (%d)' % (
+                    quote(partition_name(model, snapshot_id)), quote(table), int(snapshot_id)))
+            cursor.execute('CREATE TABLE %s PARTITION OF %s DEFAULT' % (quote(table + '_default'), quote(table)))
+            cursor.execute('INSERT INTO %s SELECT * FROM %s' % (quote(table), quote(old)))
+            cursor.execute('DROP TABLE %s' % quote(old))
+
+        with connection.schema_editor(atomic=False) as editor:
+            for field in model._meta.local_fields:
+                if field.remote_field and field.db_constraint:
+                    editor.execute(editor._create_fk_sql(model, field, '_fk_%(to_table)s_%(to_column)s'))
+                if field.db_index and not field.unique:
+                    editor.execute(editor._create_index_sql(model, fields=[field]))
+            for index in model._meta.indexes:
+                editor.add_index(model, index)
+            for brin_model, columns, name in brin_indexes('sflp_portfolio'):
+                if brin_model is model:
+                    editor.execute('CREATE INDEX %s ON %s USING brin (%s)' % (
+                        quote(name), quote(table), ', '.join(quote(column) for column in columns)))
+
+
+def snapshot_saved(sender, instance, created, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_save receiver of PortfolioSnapshot creating the partitions of new snapshots"""
+    if created and partitioning_enabled(using):
+        create_partitions(instance.pk, using)
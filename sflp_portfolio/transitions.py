@@ -0,0 +1,188 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Delinquency transition (roll rate) matrices of SFLP loans between consecutive monthly snapshots
+
+Every loan of a snapshot is assigned one of the ``STATES``: its delinquency status (current, 30, 60 or 90+ days past
+due) or, once it carries a zero balance code, prepaid, default (credit events) or removed (repurchases, note sales
+and other non-credit removals). States are integer encoded from the stored delinquency panels of the snapshots (see
+sflp_portfolio.delinquency) and the transitions of the loans present in both snapshots are counted with a single
+``np.bincount``. Loans of the first snapshot missing from the second (e.g. removed earlier) are counted separately.
+
+Matrices of a pair of snapshots are cached until the panel of either snapshot is rebuilt.
+
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+
+from sflp_portfolio.delinquency import NINETY_PLUS, UNKNOWN, snapshot_panel
+from sflp_portfolio.models.delinquency_panel import DelinquencyPanel
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.models import PortfolioSnapshot
+
+STATES = ['current', '30', '60', '90+', 'prepaid', 'default', 'removed']
+PREPAID, DEFAULT, REMOVED = 4, 5, 6
+
+# stored zero balance code (see ZERO_BALANCE_CODE_CHOICES, the loader translates the raw codes of the SFLP files) ->
+# state, 999 (performing) keeps the delinquency status
+ZERO_BALANCE_STATES = {0: PREPAID, 1: DEFAULT, 2: DEFAULT, 4: DEFAULT, 8: DEFAULT, 9: DEFAULT,
+                       3: REMOVED, 5: REMOVED, 6: REMOVED, 7: REMOVED}
+
+CACHE_TIMEOUT = getattr(settings, 'ROLL_RATES_CACHE_TIMEOUT', 24 * 3600)
+CACHE_PREFIX = 'roll_rates'
+
+
+def encode_states(panel):
+    """The state (index of STATES) of every loan of a panel, UNKNOWN if its delinquency status is unknown"""
+    lookup = np.full(1000, UNKNOWN, dtype=np.int8)
+    for code, state in ZERO_BALANCE_STATES.items():
+        lookup[code] = state
+    zero_balance = panel['zero_balance']
+    terminated = np.where(zero_balance >= 0, lookup[np.clip(zero_balance, 0, len(lookup) - 1)], UNKNOWN)
+    return np.where(terminated != UNKNOWN, terminated, np.minimum(panel['status'], NINETY_PLUS)).astype(np.int8)
+
+
+def period_date(period):
+    """The first day of a monthly reporting period given as MMYYYY (as in the SFLP files) or e.g. 2020-01"""
+    period = (period or '').strip()
+    if re.fullmatch(r'\d{6}', period):
+        return pd.Timestamp(year=int(period[2:]), month=int(period[:2]), day=1)
+    try:
+        return pd.Timestamp(period).to_period('M').to_timestamp()
+    except ValueError:
+        return None
+
+
+def snapshot_sequence(start=None, end=None):
+    """
+    The snapshots of the monthly reporting periods from ``start`` to ``end`` (inclusive, any period format of
+    period_date) in chronological order, as a list of (snapshot id, 'YYYY-MM' label) pairs
+    """
+    start, end = period_date(start) if start else None, period_date(end) if end else None
+    sequence = []
+    for pk, period, cutoff in PortfolioSnapshot.objects.values_list('pk', 'monthly_reporting_period', 'cutoff_date'):
+        date = period_date(period) if period else None
+        if date is None and cutoff is not None:
+            date = pd.Timestamp(cutoff.year, cutoff.month, 1)
+        if date is None or (start and date < start) or (end and date > end):
+            continue
+        sequence.append((date, pk))
+    return [(pk, date.strftime('%Y-%m')) for date, pk in sorted(sequence)]
+
+
+def transition_counts(from_panel, to_panel, loans=None):
+    """
+    The transitions of the loans of two panels (optionally restricted to the sorted array of loans) as a dict of
+    ``counts`` (states x states), ``exits`` (loans per state of the first panel missing from the second) and
+    ``unknown`` (loans present in both with an unknown state in either)
+    """
+    from_states, to_states = encode_states(from_panel), encode_states(to_panel)
+    from_loans = from_panel['loan']
+    if loans is not None:
+        selected = np.isin(from_loans, loans, assume_unique=True)
+        from_loans, from_states = from_loans[selected], from_states[selected]
+    _, from_index, to_index = np.intersect1d(from_loans, to_panel['loan'], assume_unique=True, return_indices=True)
+    before, after = from_states[from_index], to_states[to_index]
+    known = (before != UNKNOWN) & (after != UNKNOWN)
+    size = len(STATES)
+    counts = np.bincount(before[known].astype(np.int64) * size + after[known], minlength=size * size)
+    missing = np.ones(len(from_loans), dtype=bool)
+    missing[from_index] = False
+    exits = np.bincount(from_states[missing & (from_states != UNKNOWN)], minlength=size)
+    return {'counts': counts.reshape(size, size), 'exits': exits, 'unknown': int((~known).sum())}
+
+
+def portfolio_loans(portfolio_id):
+    return np.array(sorted(Loan.objects.filter(portfolio_id=portfolio_id).values_list('pk', flat=True)),
+                    dtype=np.int64)
+
+
+def pair_key(from_snapshot, to_snapshot, portfolio_id):
+    """The cache key of a pair of snapshots, keyed on their stored panels (None if a panel is missing)"""
+    panels = dict(DelinquencyPanel.objects.filter(portfolio_snapshot_id__in=[from_snapshot, to_snapshot])
+                  .values_list('portfolio_snapshot_id', 'pk'))
+    if from_snapshot not in panels or to_snapshot not in panels:
+        return None
+    return '%s:%s:%s:%s' % (CACHE_PREFIX, panels[from_snapshot], panels[to_snapshot], portfolio_id or '')
+
+
+def pair_counts(from_snapshot, to_snapshot, portfolio_id=None, panel=snapshot_panel):
+    """
+    transition_counts of two snapshots (panels loaded with the callable ``panel``), cached until the panel of either
+    snapshot is rebuilt
+    """
+    key = pair_key(from_snapshot, to_snapshot, portfolio_id)
+    result = cache.get(key) if key else None
+    if result is None:
+        loans = portfolio_loans(portfolio_id) if portfolio_id else None
+        result = transition_counts(panel(from_snapshot), panel(to_snapshot), loans)
+        # the panels exist now (built if missing)
+        cache.set(key or pair_key(from_snapshot, to_snapshot, portfolio_id), result, CACHE_TIMEOUT)
+    return result
+
+
+def row_rates(counts):
+    """Counts normalised by their row totals (NaN for rows without loans)"""
+    totals = counts.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, counts / np.maximum(totals, 1), np.nan)
+
+
+def roll_rates(start=None, end=None, portfolio_id=None):
+    """
+    The month over month transitions of the snapshots from ``start`` to ``end`` (see snapshot_sequence): the
+    ``periods`` (label pairs), the ``counts`` (pairs x states x states), ``exits`` and ``unknown`` per pair, the
+    ``total`` counts over all pairs and their row normalised ``rates``
+    """
+    sequence = snapshot_sequence(start, end)
+    pairs = list(zip(sequence, sequence[1:]))
+    size = len(STATES)
+    counts = np.zeros((len(pairs), size, size), dtype=np.int64)
+    exits = np.zeros((len(pairs), size), dtype=np.int64)
+    unknown = np.zeros(len(pairs), dtype=np.int64)
+    loaded = {}
+
+    def panel(snapshot_id):
+        # consecutive pairs share a snapshot, keep the last panels loaded
+        if snapshot_id not in loaded:
+            if len(loaded) > 1:
+                loaded.pop(next(iter(loaded)))
+            loaded[snapshot_id] = snapshot_panel(snapshot_id)
+        return loaded[snapshot_id]
+
+    for i, ((from_snapshot, _), (to_snapshot, _)) in enumerate(pairs):
+        result = pair_counts(from_snapshot, to_snapshot, portfolio_id, panel)
+        counts[i], exits[i], unknown[i] = result['counts'], result['exits'], result['unknown']
+    total = counts.sum(axis=0)
+    return {
+        'states': STATES,
+        'periods': [[a, b] for (_, a), (_, b) in pairs],
+        'counts': counts,
+        'exits': exits,
+        'unknown': unknown,
+        'total': total,
+        'rates': row_rates(total),
+    }
@@ -18,70 +18,148 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from rest_framework import viewsets
+import numpy as np
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
 
+from openNPL.export import ArrowRenderer, arrow_requested
 from openNPL.sflp_serializers import SFLP_CounterpartySerializer, SFLP_CounterpartyDetailSerializer
 from openNPL.sflp_serializers import SFLP_EnforcementSerializer, SFLP_EnforcementDetailSerializer
 from openNPL.sflp_serializers import SFLP_ForbearanceSerializer, SFLP_ForbearanceDetailSerializer
 from openNPL.sflp_serializers import SFLP_LoanSerializer, SFLP_LoanDetailSerializer
 from openNPL.sflp_serializers import SFLP_PropertyCollateralSerializer, SFLP_PropertyCollateralDetailSerializer
+from openNPL.viewsets import OpenNPLViewSet
+from sflp_portfolio.delinquency import loan_metrics, portfolio_metrics, snapshot_panel
+from sflp_portfolio.losses import LOAN_ARRAYS, SEGMENTS, loss_summary, snapshot_losses
+from sflp_portfolio.transitions import period_date, roll_rates
+from sflp_portfolio.vintages import DIMENSIONS, FICO_BANDS, UNKNOWN, WEIGHTS, curves, portfolio_curves
 from sflp_portfolio.models.counterparty import Counterparty
 from sflp_portfolio.models.enforcement import Enforcement
 from sflp_portfolio.models.forbearance import Forbearance
 from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.models import Portfolio, PortfolioSnapshot
 from sflp_portfolio.models.property_collateral import PropertyCollateral
 
 
-class sflp_counterparty_api(viewsets.ModelViewSet):
+class sflp_counterparty_api(OpenNPLViewSet):
     queryset = Counterparty.objects.all().order_by('pk')
+    serializer_class = SFLP_CounterpartyDetailSerializer
+    list_serializer_class = SFLP_CounterpartySerializer
 
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return SFLP_CounterpartyDetailSerializer
-        elif self.action == 'list':
-            return SFLP_CounterpartySerializer
-        return SFLP_CounterpartyDetailSerializer
 
-
-class sflp_loan_api(viewsets.ModelViewSet):
+class sflp_loan_api(OpenNPLViewSet):
     queryset = Loan.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return SFLP_LoanDetailSerializer
-        elif self.action == 'list':
-            return SFLP_LoanSerializer
-        return SFLP_LoanDetailSerializer
-
-
-class sflp_property_collateral_api(viewsets.ModelViewSet):
+    serializer_class = SFLP_LoanDetailSerializer
+    list_serializer_class = SFLP_LoanSerializer
+
+    @action(detail=False, methods=['get'], url_path='delinquency',
+            renderer_classes=[JSONRenderer, BrowsableAPIRenderer, ArrowRenderer])
+    def delinquency(self, request, *args, **kwargs):
+        """
+        Delinquency metrics of the loans of a snapshot (``?snapshot=``) decoded from their repayment histories: the
+        delinquent and 90+ days past due loans per month and by current status, or with ``?detail=loans`` the months
+        delinquent, maximum days past due and ever 90+ flag of every loan (also as an Arrow stream, ``?format=arrow``)
+        """
+        snapshot = self.get_snapshot(PortfolioSnapshot, required=True)
+        arrow = arrow_requested(request)
+        panel = snapshot_panel(snapshot)
+        metrics = loan_metrics(panel) if request.query_params.get('detail') == 'loans' else portfolio_metrics(panel)
+        if not arrow:
+            metrics = {name: value.tolist() if isinstance(value, np.ndarray) else value
+                       for name, value in metrics.items()}
+        return Response(metrics)
+
+    @action(detail=False, methods=['get'], url_path='roll_rates')
+    def roll_rates(self, request, *args, **kwargs):
+        """
+        Month over month delinquency transition matrices of the monthly snapshots from ``?start=`` to ``?end=``
+        (reporting periods, e.g. 2020-01), optionally of the loans of a ``?portfolio=``
+        """
+        portfolio = request.query_params.get('portfolio')
+        if portfolio and not portfolio.isdigit():
+            raise ValidationError({'portfolio': 'A portfolio id is required'})
+        start, end = request.query_params.get('start'), request.query_params.get('end')
+        for name, period in (('start', start), ('end', end)):
+            if period and period_date(period) is None:
+                raise ValidationError({name: 'A monthly reporting period is required (e.g. 2020-01)'})
+        result = roll_rates(start, end, portfolio)
+        result['rates'] = np.where(np.isnan(result['rates']), None, result['rates'])
+        return Response({name: value.tolist() if isinstance(value, np.ndarray) else value
+                         for name, value in result.items()})
+
+    @action(detail=False, methods=['get'], url_path='vintages')
+    def vintages(self, request, *args, **kwargs):
+        """
+        Cumulative default and prepayment curves by origination quarter and loan age of the loans of a
+        ``?portfolio=``, sliced by the comma separated ``?channel=``, ``?loan_purpose=``, ``?property_state=`` and
+        ``?fico=`` (band) labels, by number of loans or by original balance (``?weight=upb``)
+        """
+        portfolio = request.query_params.get('portfolio', '')
+        if not portfolio.isdigit() or not Portfolio.objects.filter(pk=portfolio).exists():
+            raise ValidationError({'portfolio': 'A portfolio id is required'})
+        weight = request.query_params.get('weight', 'count')
+        if weight not in WEIGHTS:
+            raise ValidationError({'weight': 'One of %s' % ', '.join(WEIGHTS)})
+        filters = {}
+        for name in DIMENSIONS:
+            value = request.query_params.get(name)
+            if value:
+                filters[name] = [label.strip() for label in value.split(',') if label.strip()]
+        unknown = set(filters.get('fico', [])) - set(FICO_BANDS) - {UNKNOWN}
+        if unknown:
+            raise ValidationError({'fico': 'Unknown FICO bands: %s' % ', '.join(sorted(unknown))})
+        result = curves(portfolio_curves(int(portfolio)), filters, weight)
+        for name in ('default', 'prepaid'):
+            result[name] = np.where(np.isnan(result[name]), None, result[name])
+        result['weight'] = weight
+        return Response({name: value.tolist() if isinstance(value, np.ndarray) else value
+                         for name, value in result.items()})
+
+
+class sflp_property_collateral_api(OpenNPLViewSet):
     queryset = PropertyCollateral.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return SFLP_PropertyCollateralDetailSerializer
-        elif self.action == 'list':
-            return SFLP_PropertyCollateralSerializer
-        return SFLP_PropertyCollateralDetailSerializer
+    serializer_class = SFLP_PropertyCollateralDetailSerializer
+    list_serializer_class = SFLP_PropertyCollateralSerializer
 
 
-class sflp_enforcement_api(viewsets.ModelViewSet):
+class sflp_enforcement_api(OpenNPLViewSet):
     queryset = Enforcement.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return SFLP_EnforcementDetailSerializer
-        elif self.action == 'list':
-            return SFLP_EnforcementSerializer
-        return SFLP_EnforcementDetailSerializer
-
-
-class sflp_forbearance_api(viewsets.ModelViewSet):
+    serializer_class = SFLP_EnforcementDetailSerializer
+    list_serializer_class = SFLP_EnforcementSerializer
+    snapshot_field = 'portfolio_snapshot_id'
+
+    @action(detail=False, methods=['get'], url_path='losses',
+            renderer_classes=[JSONRenderer, BrowsableAPIRenderer, ArrowRenderer])
+    def losses(self, request, *args, **kwargs):
+        """
+        Realized losses, severities and recovery timing of the loans liquidated in a snapshot (``?snapshot=``):
+        totals, distributions and with ``?group_by=`` the averages per segment, or with ``?detail=loans`` the losses
+        of every loan (also as an Arrow stream, ``?format=arrow``)
+        """
+        snapshot = self.get_snapshot(PortfolioSnapshot, required=True)
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by not in SEGMENTS:
+            raise ValidationError({'group_by': 'One of %s' % ', '.join(SEGMENTS)})
+        arrow = arrow_requested(request)
+        arrays = snapshot_losses(snapshot)
+        if request.query_params.get('detail') == 'loans':
+            result = {name: arrays[name] for name in LOAN_ARRAYS}
+        else:
+            result = loss_summary(arrays, group_by)
+            for name in ('severity_distribution', 'timing_distribution'):
+                result[name] = {key: value.tolist() for key, value in result[name].items()}
+        if not arrow:
+            result = {name: np.where(np.isnan(value), None, value).tolist()
+                      if isinstance(value, np.ndarray) and value.dtype.kind == 'f' else
+                      value.tolist() if isinstance(value, np.ndarray) else value
+                      for name, value in result.items()}
+        return Response(result)
+
+
+class sflp_forbearance_api(OpenNPLViewSet):
     queryset = Forbearance.objects.all().order_by('pk')
-
-    def get_serializer_class(self):
-        if self.action == 'retrieve':
-            return SFLP_ForbearanceDetailSerializer
-        elif self.action == 'list':
-            return SFLP_ForbearanceSerializer
-        return SFLP_ForbearanceDetailSerializer
+    serializer_class = SFLP_ForbearanceDetailSerializer
+    list_serializer_class = SFLP_ForbearanceSerializer
+    snapshot_field = 'portfolio_snapshot_id'
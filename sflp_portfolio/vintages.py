@@ -0,0 +1,273 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Vintage curves of SFLP loans
+
+Loans are grouped into vintages by the quarter of their origination date. The cumulative default and prepayment
+rates of a vintage at a loan age are the loans (or the original balance) of the vintage defaulted or prepaid up to
+that age, relative to all loans (balance) of the vintage. Ages beyond the oldest loan age observed in the vintage
+are missing (NaN).
+
+The age at which every loan of a portfolio first carries a credit event or prepayment zero balance code (see
+sflp_portfolio.transitions) is computed with a grouped query of its loan states, together with the earliest
+foreclosure or disposition of its enforcement records (which count as defaults). The events are grouped by cells
+of vintage, channel, loan purpose, property state and FICO band and stored per portfolio as compressed arrays
+(VintageCurves). Curves of any slice of the cells are summed from the stored events. Stored curves are rebuilt once a
+newer portfolio snapshot is available and removed when the loan data are loaded or edited.
+
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+from django.db.models import Max, Min, Q
+from django.db.models.functions import Coalesce
+
+from sflp_portfolio.models.counterparty import Counterparty
+from sflp_portfolio.models.enforcement import Enforcement
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import PortfolioSnapshot
+from sflp_portfolio.models.property_collateral import PropertyCollateral
+from sflp_portfolio.models.vintage_curves import VintageCurves
+from sflp_portfolio.transitions import DEFAULT, PREPAID, ZERO_BALANCE_STATES
+
+# the dimensions the curves can be sliced by (the vintage is the first column of the stored cells)
+DIMENSIONS = ['channel', 'loan_purpose', 'property_state', 'fico']
+EVENTS = ['default', 'prepaid']
+WEIGHTS = ['count', 'upb']
+
+# stored zero balance codes (choice codes, translated from the raw file codes by the loader) of the events
+DEFAULT_CODES = [code for code, state in ZERO_BALANCE_STATES.items() if state == DEFAULT]
+PREPAID_CODES = [code for code, state in ZERO_BALANCE_STATES.items() if state == PREPAID]
+
+# borrower credit score at origination bands: label -> lower bound
+FICO_BANDS = {'<620': 0, '620-679': 620, '680-739': 680, '740-779': 740, '780+': 780}
+UNKNOWN = 'unknown'
+
+MAX_AGE = 480
+
+
+def fico_bands(scores):
+    """The FICO band labels of credit scores (UNKNOWN if missing)"""
+    scores = pd.to_numeric(pd.Series(scores, dtype=object), errors='coerce').to_numpy(dtype=float)
+    labels = np.array(list(FICO_BANDS) + [UNKNOWN])
+    index = np.digitize(scores, list(FICO_BANDS.values())[1:])
+    return labels[np.where(np.isnan(scores), len(FICO_BANDS), index)]
+
+
+def code_labels(values):
+    """Integer codes as text labels (UNKNOWN if missing)"""
+    values = pd.to_numeric(values).astype('Int64')
+    return np.where(values.isna(), UNKNOWN, values.astype(object).astype(str))
+
+
+def quarter_labels(dates):
+    """The origination quarter labels (e.g. 2020Q1) of dates (UNKNOWN if missing)"""
+    dates = pd.to_datetime(pd.Series(dates))
+    labels = dates.dt.year.astype('Int64').astype(object).astype(str) + 'Q' + \
+        dates.dt.quarter.astype('Int64').astype(object).astype(str)
+    return np.where(dates.isna(), UNKNOWN, labels)
+
+
+def month_difference(start, end):
+    """Whole months from the months of ``start`` to the months of ``end`` (NaN if either is missing)"""
+    start, end = pd.to_datetime(pd.Series(start)), pd.to_datetime(pd.Series(end))
+    return ((end.dt.year - start.dt.year) * 12 + end.dt.month - start.dt.month).to_numpy(dtype=float)
+
+
+def loan_segments(loans):
+    """
+    The segment labels (``vintage`` and DIMENSIONS), ``origination_date`` and original balance (``upb``) of the
+    loans of a Loan queryset, indexed by loan
+    """
+    frame = pd.DataFrame.from_records(
+        list(loans.order_by('pk').values_list('pk', 'origination_date', 'channel', 'loan_purpose', 'original_upb')),
+        columns=['loan', 'origination_date', 'channel', 'loan_purpose', 'upb']).set_index('loan')
+    collateral = pd.DataFrame.from_records(
+        list(PropertyCollateral.objects.filter(loan_identifier__in=loans.values('pk'), property_state__isnull=False)
+             .order_by('pk').values_list('loan_identifier_id', 'property_state')),
+        columns=['loan', 'property_state'])
+    scores = Counterparty.objects.filter(loan_identifier__in=loans.values('pk')).order_by() \
+        .values('loan_identifier_id').annotate(score=Min('borrower_credit_score_at_origination')) \
+        .values_list('loan_identifier_id', 'score')
+    scores = pd.DataFrame.from_records(list(scores), columns=['loan', 'score'])
+    frame = frame.join(collateral.drop_duplicates('loan', keep='last').set_index('loan')) \
+        .join(scores.set_index('loan'))
+    return pd.DataFrame({
+        'vintage': quarter_labels(frame['origination_date']),
+        'channel': code_labels(frame['channel']),
+        'loan_purpose': code_labels(frame['loan_purpose']),
+        'property_state': frame['property_state'].fillna(UNKNOWN).astype(str).to_numpy(),
+        'fico': fico_bands(frame['score']),
+        'origination_date': frame['origination_date'],
+        'upb': pd.to_numeric(frame['upb']).astype(float),
+    }, index=frame.index)
+
+
+def loan_events(portfolio_id):
+    """
+    One row per loan of a portfolio with an origination date: the vintage and dimension labels, the original
+    balance (``upb``), the oldest loan age observed and the loan ages of the first default and prepayment (NaN if none)
+    """
+    segments = loan_segments(Loan.objects.filter(portfolio_id=portfolio_id, origination_date__isnull=False))
+    states = LoanState.objects.filter(loan_identifier__portfolio_id=portfolio_id).order_by() \
+        .values('loan_identifier_id').annotate(
+            observed=Max('loan_age'),
+            default=Min('loan_age', filter=Q(zero_balance_code__in=DEFAULT_CODES)),
+            prepaid=Min('loan_age', filter=Q(zero_balance_code__in=PREPAID_CODES))) \
+        .values_list('loan_identifier_id', 'observed', 'default', 'prepaid')
+    states = pd.DataFrame.from_records(list(states), columns=['loan', 'observed', 'default', 'prepaid'])
+    enforcements = Enforcement.objects.filter(loan_identifier__portfolio_id=portfolio_id).order_by() \
+        .values('loan_identifier_id').annotate(date=Min(Coalesce('foreclosure_date', 'disposition_date'))) \
+        .values_list('loan_identifier_id', 'date')
+    enforcements = pd.DataFrame.from_records(list(enforcements), columns=['loan', 'enforcement_date'])
+
+    frame = segments.join(states.set_index('loan')).join(enforcements.set_index('loan'))
+    for column in ('observed', 'default', 'prepaid'):
+        frame[column] = pd.to_numeric(frame[column]).astype(float)
+    enforced = month_difference(frame['origination_date'], frame['enforcement_date']).clip(0)
+    frame['default'] = np.fmin(frame['default'].to_numpy(), enforced)
+    # a loan terminates once, with the earlier of the two events
+    default, prepaid = frame['default'].to_numpy(), frame['prepaid'].to_numpy()
+    frame['prepaid'] = np.where(default <= prepaid, np.nan, prepaid)
+    frame['default'] = np.where(prepaid < default, np.nan, default)
+    frame['observed'] = np.fmax(frame['observed'].to_numpy(), np.fmax(frame['default'], frame['prepaid']))
+
+    events = frame[['vintage'] + DIMENSIONS].copy()
+    for column in ('observed', 'default', 'prepaid'):
+        events[column] = frame[column].clip(0, MAX_AGE)
+    events['upb'] = frame['upb'].fillna(0)
+    return events
+
+
+def build_curves(portfolio_id):
+    """
+    The vintage events of a portfolio as a dict of arrays: the labels of the vintages and of every dimension, the
+    ``cells`` (label indexes of the vintage and the dimensions), the ``loans``, original balance (``upb``) and oldest
+    ``observed`` age of every cell and for every event the cells, ages, loans and balance of its (cell, age) pairs
+    """
+    events = loan_events(portfolio_id)
+    arrays, codes = {}, []
+    for name in ['vintage'] + DIMENSIONS:
+        index, labels = pd.factorize(events[name], sort=True)
+        arrays[name] = np.asarray(labels, dtype=str)
+        codes.append(index)
+    # one mixed radix key per loan, decoded back into the label indexes of the cells
+    sizes = [max(len(arrays[name]), 1) for name in ['vintage'] + DIMENSIONS]
+    keys, cell = np.unique(np.ravel_multi_index(codes, sizes) if len(events) else np.zeros(0, dtype=np.int64),
+                           return_inverse=True)
+    cell = cell.reshape(-1)
+    arrays['cells'] = np.column_stack(np.unravel_index(keys, sizes)).astype(np.int32).reshape(len(keys), len(sizes))
+    arrays['loans'] = np.bincount(cell, minlength=len(keys)).astype(np.int64)
+    arrays['upb'] = np.bincount(cell, weights=events['upb'], minlength=len(keys))
+    observed = events['observed'].fillna(-1).to_numpy(dtype=np.int64)
+    arrays['observed'] = np.full(len(keys), -1, dtype=np.int16)
+    np.maximum.at(arrays['observed'], cell, observed.astype(np.int16))
+    for event in EVENTS:
+        ages = events[event].to_numpy()
+        occurred = ~np.isnan(ages)
+        pairs, pair = np.unique(cell[occurred].astype(np.int64) * (MAX_AGE + 1) + ages[occurred].astype(np.int64),
+                                return_inverse=True)
+        pair = pair.reshape(-1)
+        arrays[event + '_cell'] = (pairs // (MAX_AGE + 1)).astype(np.int32)
+        arrays[event + '_age'] = (pairs % (MAX_AGE + 1)).astype(np.int16)
+        arrays[event + '_loans'] = np.bincount(pair, minlength=len(pairs)).astype(np.int64)
+        arrays[event + '_upb'] = np.bincount(pair, weights=events['upb'].to_numpy()[occurred], minlength=len(pairs))
+    return arrays
+
+
+def latest_snapshot():
+    return PortfolioSnapshot.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+
+def store_curves(portfolio_id, arrays, snapshot_id):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    VintageCurves.objects.update_or_create(portfolio_id=portfolio_id, defaults={
+        'portfolio_snapshot_id_id': snapshot_id, 'loans': int(arrays['loans'].sum()), 'arrays': buffer.getvalue()})
+
+
+def portfolio_curves(portfolio_id):
+    """The stored vintage events of a portfolio, built and stored if missing or older than the latest snapshot"""
+    snapshot_id = latest_snapshot()
+    stored = VintageCurves.objects.filter(portfolio_id=portfolio_id) \
+        .values_list('portfolio_snapshot_id', 'arrays').first()
+    if stored is not None and stored[0] == snapshot_id:
+        with np.load(io.BytesIO(bytes(stored[1]))) as arrays:
+            return {name: arrays[name] for name in arrays.files}
+    arrays = build_curves(portfolio_id)
+    store_curves(portfolio_id, arrays, snapshot_id)
+    return arrays
+
+
+def curves(arrays, filters=None, weight='count'):
+    """
+    The cumulative default and prepayment curves (vintages x loan ages) of the cells whose labels are in
+    ``filters`` (dimension -> list of labels), by number of loans or by original balance (``weight='upb'``)
+    """
+    cells = arrays['cells']
+    selected = np.ones(len(cells), dtype=bool)
+    for column, name in enumerate(DIMENSIONS, 1):
+        if filters and filters.get(name):
+            selected &= np.isin(arrays[name][cells[:, column]], filters[name])
+    used = np.unique(cells[selected, 0])
+    position = np.full(len(arrays['vintage']), -1, dtype=np.int64)
+    position[used] = np.arange(len(used))
+    row = position[cells[:, 0]]
+    ages = int(arrays['observed'][selected].max(initial=-1)) + 1
+    observed = np.full(len(used), -1, dtype=np.int64)
+    np.maximum.at(observed, row[selected], arrays['observed'][selected])
+    loans = np.bincount(row[selected], weights=arrays['loans'][selected], minlength=len(used)).astype(np.int64)
+    upb = np.bincount(row[selected], weights=arrays['upb'][selected], minlength=len(used))
+    totals = upb if weight == 'upb' else loans
+    result = {'vintages': arrays['vintage'][used].tolist(), 'age': np.arange(ages), 'loans': loans, 'upb': upb}
+    for event in EVENTS:
+        keep = selected[arrays[event + '_cell']]
+        index = row[arrays[event + '_cell'][keep]] * ages + arrays[event + '_age'][keep]
+        amounts = np.bincount(index, weights=arrays['%s_%s' % (event, 'upb' if weight == 'upb' else 'loans')][keep],
+                              minlength=len(used) * ages).reshape(len(used), ages)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cumulative = np.where(totals[:, None] > 0, amounts.cumsum(axis=1) / np.maximum(totals, 1e-12)[:, None],
+                                  np.nan)
+        cumulative[np.arange(ages)[None, :] > observed[:, None]] = np.nan
+        result[event] = cumulative
+    return result
+
+
+def invalidate(portfolio_id=None):
+    """Remove the stored vintage curves of a portfolio, without a portfolio all stored curves"""
+    stored = VintageCurves.objects.all()
+    if portfolio_id:
+        stored = stored.filter(portfolio_id=portfolio_id)
+    stored.delete()
+
+
+def loan_data_saved(sender, instance, **kwargs):
+    """post_save receiver of LoanState and Enforcement"""
+    if instance.loan_identifier_id:
+        VintageCurves.objects.filter(
+            portfolio__in=Loan.objects.filter(pk=instance.loan_identifier_id).values('portfolio_id')).delete()
+
+
+def loan_data_bulk_saved(sender, **kwargs):
+    """bulk_saved receiver of the SFLP loan tables"""
+    invalidate()
@@ -18,6 +18,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import json
+
 from django.test import TestCase
 
 
@@ -29,3 +31,212 @@ class APITests(TestCase):
         response = self.client.get('/api/')
         self.assertEqual(response.status_code, 200)
 
+
+    def test_export_streams_csv_and_ndjson(self):
+        from npl_portfolio.models import Loan
+        Loan.objects.create(loan_identifier='C1')
+        Loan.objects.create(loan_identifier='C2')
+
+        response = self.client.get('/api/npl_data/loans/export/?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertIn('loan_identifier', lines[0].split(','))
+
+        response = self.client.get('/api/npl_data/loans/export/?format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(['C1', 'C2'], [r['loan_identifier'] for r in records])
+
+    def test_keyset_pagination(self):
+        from sflp_portfolio.models.loan import Loan
+        Loan.objects.bulk_create([Loan(loan_identifier=str(i)) for i in range(25)])
+
+        response = self.client.get('/api/sflp_data/loans/?pagination=cursor&page_size=10&count=exact')
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual(25, page['count'])
+        self.assertEqual(10, len(page['results']))
+        self.assertIn('cursor=', page['next'])
+
+        seen = [r['id'] for r in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            self.assertNotIn('count', page)
+            seen += [r['id'] for r in page['results']]
+        self.assertEqual(sorted(Loan.objects.values_list('pk', flat=True)), seen)
+
+        # page numbers remain the default
+        page = self.client.get('/api/sflp_data/loans/?page=2&page_size=20').json()
+        self.assertEqual(25, page['count'])
+        self.assertEqual(5, len(page['results']))
+
+    def test_sparse_fieldsets(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from sflp_portfolio.models.loan import Loan
+        loan = Loan.objects.create(loan_identifier='L1', channel=1, original_upb=1000.0)
+
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get('/api/sflp_data/loans/?fields=loan_identifier,channel').json()
+        self.assertEqual([{'loan_identifier': 'L1', 'channel': 1}], page['results'])
+        select = [q['sql'] for q in queries if 'sflp_portfolio_loan' in q['sql'] and 'COUNT' not in q['sql']][0]
+        self.assertNotIn('original_upb', select)
+
+        entry = self.client.get('/api/sflp_data/loans/%d/?exclude=original_upb' % loan.pk).json()
+        self.assertNotIn('original_upb', entry)
+        self.assertEqual('L1', entry['loan_identifier'])
+
+    def test_query_count_independent_of_page_size(self):
+        from npl_portfolio.models import Counterparty, PropertyCollateral, NonPropertyCollateral, Loan
+        for i in range(12):
+            counterparty = Counterparty.objects.create(counterparty_identifier='CP%d' % i)
+            counterparty.property_collaterals.add(PropertyCollateral.objects.create(protection_identifier='P%d' % i))
+            counterparty.non_property_collaterals.add(NonPropertyCollateral.objects.create())
+            Loan.objects.create(loan_identifier='L%d' % i, counterparty_identifier=counterparty)
+
+        for url, expected in (('/api/npl_data/counterparties/?exclude=description&page_size=%d', 4),
+                              ('/api/npl_data/loans/?page_size=%d', 2),
+                              ('/api/npl_data/loans/?pagination=cursor&page_size=%d', 1)):
+            for page_size in (2, 10):
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url % page_size)
+                self.assertEqual(page_size, len(response.json()['results']))
+
+    def test_expand_loan_tape(self):
+        from npl_portfolio.models import Counterparty, CounterpartyGroup, Enforcement, HistoricalRepayment, Loan, \
+            PropertyCollateral
+        for i in range(6):
+            group = CounterpartyGroup.objects.create()
+            counterparty = Counterparty.objects.create(counterparty_identifier='CP%d' % i,
+                                                       counterparty_group_identifier=group)
+            Enforcement.objects.create(counterparty_identifier=counterparty)
+            loan = Loan.objects.create(loan_identifier='L%d' % i, counterparty_identifier=counterparty)
+            PropertyCollateral.objects.create(protection_identifier='P%d' % i, loan_identifier=loan)
+            for month in (1, 2):
+                HistoricalRepayment.objects.create(loan_identifier=loan, reference_month=month)
+
+        url = ('/api/npl_data/loans/?page_size=%d&expand=counterparty.counterparty_group,counterparty.enforcement,'
+               'property_collateral,historical_repayment')
+        with self.assertNumQueries(7):
+            self.client.get(url % 1)
+        with self.assertNumQueries(7):
+            loans = self.client.get(url % 6).json()['results']
+        self.assertEqual(6, len(loans))
+        loan = loans[0]
+        self.assertEqual('CP0', loan['counterparty']['counterparty_identifier'])
+        self.assertIn('id', loan['counterparty']['counterparty_group'])
+        self.assertEqual(1, len(loan['counterparty']['enforcement']))
+        self.assertEqual('P0', loan['property_collateral'][0]['protection_identifier'])
+        self.assertEqual([1, 2], sorted(r['reference_month'] for r in loan['historical_repayment']))
+
+    def test_bulk_upsert(self):
+        from django.contrib.auth.models import User
+        from common.ingestion import bulk_saved
+        from npl_portfolio.models import Loan, PortfolioSnapshot
+        snapshot = PortfolioSnapshot.objects.create(name='S1')
+        Loan.objects.create(snapshot_id=snapshot, loan_identifier='L1', principal_balance=10.0)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+        signals = []
+
+        def receiver(sender, created=False, snapshots=None, **kwargs):
+            signals.append((sender, created, snapshots))
+        bulk_saved.connect(receiver)
+        self.addCleanup(bulk_saved.disconnect, receiver)
+
+        entries = [{'snapshot_id': snapshot.pk, 'loan_identifier': 'L1', 'principal_balance': 20.0},
+                   {'snapshot_id': snapshot.pk, 'loan_identifier': 'L2', 'principal_balance': 30.0},
+                   {'snapshot_id': snapshot.pk + 1, 'loan_identifier': 'L3'},
+                   {'snapshot_id': snapshot.pk, 'loan_identifier': 'L4', 'principal_balance': 'x'}]
+        body = '\n'.join(json.dumps(e) for e in entries)
+        response = self.client.post('/api/npl_data/loans/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((1, 1), (result['created'], result['updated']))
+        self.assertEqual([2, 3], [e['index'] for e in result['errors']])
+        self.assertEqual([0, 1], result['saved'])
+        self.assertEqual({'L1': 20.0, 'L2': 30.0}, dict(Loan.objects.values_list('loan_identifier', 'principal_balance')))
+        # the created and the updated entries are signalled separately, with their snapshots
+        self.assertEqual([(Loan, True, {snapshot.pk}), (Loan, False, {snapshot.pk})], signals)
+
+        # entries rejected by the database are reported without rolling back the others
+        entries = [{'snapshot_id': snapshot.pk, 'loan_identifier': 'L%d' % i} for i in (6, 1, 7)]
+        response = self.client.post('/api/npl_data/loans/bulk/?mode=create', entries, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((2, [0, 2]), (result['created'], result['saved']))
+        self.assertEqual([1], [e['index'] for e in result['errors']])
+        self.assertEqual(4, Loan.objects.count())
+
+        response = self.client.post('/api/npl_data/loans/bulk/?mode=update',
+                                    [{'snapshot_id': snapshot.pk, 'loan_identifier': 'L5'}], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_repayment_matrix(self):
+        from npl_portfolio.models import HistoricalRepayment, Loan, PortfolioSnapshot
+        snapshot = PortfolioSnapshot.objects.create(name='S1')
+        loans = [Loan.objects.create(snapshot_id=snapshot, loan_identifier='L%d' % i) for i in range(2)]
+        HistoricalRepayment.objects.create(snapshot_id=snapshot, loan_identifier=loans[0], reference_year=2022,
+                                           reference_month=12, history_of_total_repayments=10)
+        HistoricalRepayment.objects.create(snapshot_id=snapshot, loan_identifier=loans[1], reference_year=2023,
+                                           reference_month=1, history_of_total_repayments=20,
+                                           history_of_repayments_from_collateral_sales=5)
+
+        url = '/api/npl_data/historicalrepayment/matrix/?snapshot=%d' % snapshot.pk
+        matrix = self.client.get(url + '&format=json').json()
+        self.assertEqual(['2022-12', '2023-01'], matrix['months'])
+        self.assertEqual(['L0', 'L1'], matrix['loan_identifier'])
+        self.assertEqual([[10, None], [None, 20]], matrix['total'])
+        self.assertEqual([[None, None], [None, 5]], matrix['collateral'])
+        response = self.client.get('/api/npl_data/historicalrepayment/matrix/?snapshot=S1&format=json')
+        self.assertEqual(400, response.status_code)
+
+        try:
+            import pyarrow
+        except ImportError:
+            self.assertEqual(406, self.client.get(url + '&format=arrow').status_code)
+            return
+        response = self.client.get(url + '&format=arrow')
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        self.assertEqual([loans[0].pk, loans[1].pk], table['loan'].to_pylist())
+        self.assertEqual([[10, None], [None, 20]], table['total'].to_pylist())
+        self.assertEqual(['2022-12', '2023-01'], json.loads(table.schema.metadata[b'months']))
+
+    def test_snapshot_scope(self):
+        from npl_portfolio.models import Loan, PortfolioSnapshot
+        snapshots = [PortfolioSnapshot.objects.create(name=name) for name in ('S1', 'S2')]
+        for snapshot in snapshots:
+            Loan.objects.create(snapshot_id=snapshot, loan_identifier='L1')
+
+        page = self.client.get('/api/npl_data/loans/?snapshot=%d' % snapshots[1].pk).json()
+        self.assertEqual(1, page['count'])
+        self.assertEqual(400, self.client.get('/api/npl_data/loans/?snapshot=x').status_code)
+
+    def test_aggregate(self):
+        from django.core.cache import cache
+        from npl_portfolio.models import Loan, PortfolioSnapshot
+        cache.clear()
+        snapshots = [PortfolioSnapshot.objects.create(name=name) for name in ('S1', 'S2')]
+        for asset_class, balance, days in ((0, 100, 10), (0, 50, 400), (1, 30, 0)):
+            Loan.objects.create(snapshot_id=snapshots[0], asset_class=asset_class, principal_balance=balance,
+                                days_in_pastdue=days)
+        Loan.objects.create(snapshot_id=snapshots[1], asset_class=0, principal_balance=1000)
+
+        url = '/api/npl_data/loans/aggregate/?snapshot=%d' % snapshots[0].pk
+        result = self.client.get(url + '&group_by=asset_class&measures=count,sum_principal_balance').json()
+        self.assertEqual([{'asset_class': 0, 'count': 2, 'sum_principal_balance': 150},
+                          {'asset_class': 1, 'count': 1, 'sum_principal_balance': 30}], result['results'])
+        result = self.client.get(url + '&group_by=pastdue_bucket&measures=avg_days_in_pastdue').json()
+        self.assertEqual(['0', '1-30', '>365'], [row['pastdue_bucket'] for row in result['results']])
+
+        # cached per snapshot, saving a loan of the snapshot invalidates its aggregates
+        with self.assertNumQueries(0):
+            self.client.get(url + '&group_by=asset_class')
+        Loan.objects.create(snapshot_id=snapshots[0], asset_class=1, principal_balance=5)
+        result = self.client.get(url + '&group_by=asset_class').json()
+        self.assertEqual(35, result['results'][1]['sum_principal_balance'])
+        self.assertEqual(1185, self.client.get('/api/npl_data/loans/aggregate/').json()['results'][0]
+                         ['sum_principal_balance'])
+        self.assertEqual(400, self.client.get(url + '&group_by=loan_identifier').status_code)
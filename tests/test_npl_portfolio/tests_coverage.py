@@ -0,0 +1,101 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from django.test import TestCase
+
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.coverage import snapshot_coverage
+from npl_portfolio.loan import Loan
+from npl_portfolio.loan_coverage import LoanCoverage
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.mortgage import Mortgage
+from npl_portfolio.non_property_collateral import NonPropertyCollateral
+from npl_portfolio.property_collateral import PropertyCollateral
+
+
+class LoanCoverageTests(TestCase):
+
+    def setUp(self):
+        self.snapshot = PortfolioSnapshot.objects.create(name='S1')
+        counterparties = [Counterparty.objects.create(snapshot_id=self.snapshot) for _ in range(3)]
+        self.loans = {}
+        for name, counterparty, legal, principal in (('A', 0, 100, 100), ('B', 0, 100, 100), ('D', 1, None, 50),
+                                                     ('E', 2, 100, 100), ('F', 2, 50, 50)):
+            self.loans[name] = Loan.objects.create(snapshot_id=self.snapshot, loan_identifier=name,
+                                                   counterparty_identifier=counterparties[counterparty],
+                                                   legal_balance=legal, principal_balance=principal)
+        # A first and B second lien on a property with a third party loan ranking ahead
+        house = PropertyCollateral.objects.create(loan_identifier=self.loans['A'], latest_valuation_amount=150,
+                                                  higher_ranking_loan=20)
+        Mortgage.objects.create(loan_identifier=self.loans['A'], protection_identifier=house, lien_position=1,
+                                mortgage_amount=80)
+        Mortgage.objects.create(loan_identifier=self.loans['B'], protection_identifier=house, lien_position=2)
+        # a guarantee of the counterparty of D
+        guarantee = NonPropertyCollateral.objects.create(guarantee_amount=30)
+        counterparties[1].non_property_collaterals.add(guarantee)
+        # a property of the counterparty of E and F, shared pro rata
+        shop = PropertyCollateral.objects.create(loan_identifier=self.loans['E'], latest_valuation_amount=100)
+        counterparties[2].property_collaterals.add(shop)
+
+    def coverage(self):
+        return {row.loan_identifier.loan_identifier: row
+                for row in snapshot_coverage(self.snapshot.pk).select_related('loan_identifier')}
+
+    def test_allocation(self):
+        coverage = self.coverage()
+        self.assertEqual(5, len(coverage))
+        self.assertAlmostEqual(80, coverage['A'].allocated_property_value)
+        self.assertAlmostEqual(50, coverage['B'].allocated_property_value)
+        self.assertAlmostEqual(0.5, coverage['B'].coverage_ratio)
+        self.assertAlmostEqual(20, coverage['A'].senior_claims)
+        self.assertAlmostEqual(100, coverage['B'].senior_claims)
+        self.assertAlmostEqual(120 / 150, coverage['A'].loan_to_value)
+        self.assertAlmostEqual(200 / 150, coverage['B'].loan_to_value)
+        self.assertAlmostEqual(0.6, coverage['D'].coverage_ratio)
+        self.assertIsNone(coverage['D'].loan_to_value)
+        self.assertAlmostEqual(200 / 3, coverage['E'].allocated_property_value)
+        self.assertAlmostEqual(100 / 3, coverage['F'].allocated_property_value)
+
+    def test_invalidation(self):
+        self.coverage()
+        self.loans['A'].legal_balance = 60
+        self.loans['A'].save()
+        self.assertFalse(LoanCoverage.objects.exists())
+        self.assertAlmostEqual(70, self.coverage()['B'].allocated_property_value)
+        self.loans['D'].counterparty_identifier.non_property_collaterals.clear()
+        self.assertFalse(LoanCoverage.objects.exists())
+        self.assertAlmostEqual(0, self.coverage()['D'].coverage_ratio)
+
+        # only the coverage of the snapshot of a changed record is removed
+        other = PortfolioSnapshot.objects.create(name='S2')
+        Loan.objects.create(snapshot_id=other, loan_identifier='A', legal_balance=100)
+        snapshot_coverage(other.pk)
+        collateral = PropertyCollateral.objects.get(loan_identifier=self.loans['A'])
+        collateral.latest_valuation_amount = 200
+        collateral.save()
+        self.assertEqual([other.pk], list(LoanCoverage.objects.values_list('snapshot_id', flat=True)))
+
+    def test_coverage_api(self):
+        response = self.client.get('/api/npl_data/coverage/?snapshot=%d&loan=%d'
+                                   % (self.snapshot.pk, self.loans['B'].pk))
+        self.assertEqual(200, response.status_code)
+        self.assertAlmostEqual(0.5, response.json()['results'][0]['coverage_ratio'])
+        self.assertEqual(400, self.client.get('/api/npl_data/coverage/?snapshot=x').status_code)
+        response = self.client.get('/api/npl_data/coverage/?snapshot=%d' % (self.snapshot.pk + 1))
+        self.assertEqual(400, response.status_code)
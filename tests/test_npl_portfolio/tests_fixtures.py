@@ -0,0 +1,74 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from common.fixtures import model_order
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import Portfolio, PortfolioSnapshot
+from npl_portfolio.property_collateral import PropertyCollateral
+
+FIXTURE = [
+    {'model': 'npl_portfolio.loan', 'pk': 7, 'fields': {'loan_identifier': 'L7', 'counterparty_identifier': 3,
+                                                        'snapshot_id': 2}},
+    {'model': 'npl_portfolio.counterparty', 'pk': 3, 'fields': {'counterparty_identifier': 'C3', 'snapshot_id': 2,
+                                                                'property_collaterals': [5]}},
+    {'model': 'npl_portfolio.propertycollateral', 'pk': 5, 'fields': {'protection_identifier': 'P5'}},
+    {'model': 'npl_portfolio.portfoliosnapshot', 'pk': 2,
+     'fields': {'name': 'S2', 'cutoff_date': '2019-12-25T00:00:00'}},
+]
+
+
+class FixtureLoaderTests(TestCase):
+
+    def test_model_order(self):
+        ordered = model_order([Loan, Counterparty, PortfolioSnapshot, Portfolio])
+        self.assertLess(ordered.index(PortfolioSnapshot), ordered.index(Counterparty))
+        self.assertLess(ordered.index(Counterparty), ordered.index(Loan))
+
+    def test_load_fixtures(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fixture.json')
+            with open(path, 'w') as f:
+                json.dump(FIXTURE, f)
+            call_command('load_npl_fixtures', path, stdout=StringIO())
+
+            loan = Loan.objects.select_related('counterparty_identifier').get()
+            self.assertEqual((7, 'C3', 2), (loan.pk, loan.counterparty_identifier.counterparty_identifier,
+                                            loan.snapshot_id_id))
+            self.assertEqual([5], [p.pk for p in loan.counterparty_identifier.property_collaterals.all()])
+            self.assertEqual(2019, PortfolioSnapshot.objects.get().cutoff_date.year)
+
+            # records of stored primary keys update the stored rows
+            FIXTURE[0]['fields']['loan_identifier'] = 'L7b'
+            with open(path, 'w') as f:
+                json.dump(FIXTURE[:1], f)
+            call_command('load_npl_fixtures', path, stdout=StringIO())
+            FIXTURE[0]['fields']['loan_identifier'] = 'L7'
+        self.assertEqual(['L7b'], list(Loan.objects.values_list('loan_identifier', flat=True)))
+        self.assertEqual(1, PropertyCollateral.objects.count())
+        self.assertEqual(8, Loan.objects.create(loan_identifier='L8').pk)
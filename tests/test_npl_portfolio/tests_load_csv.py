@@ -0,0 +1,81 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import Portfolio, PortfolioSnapshot
+
+
+class LoadCSVTests(TestCase):
+
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='P1')
+        self.snapshot = PortfolioSnapshot.objects.create(name='S1')
+        self.other = PortfolioSnapshot.objects.create(name='S2')
+        self.counterparty = Counterparty.objects.create(portfolio_id=self.portfolio, snapshot_id=self.snapshot,
+                                                        counterparty_identifier='C1')
+        Counterparty.objects.create(portfolio_id=Portfolio.objects.create(name='P2'), snapshot_id=self.other,
+                                    counterparty_identifier='C1')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def load(self, table, lines, **options):
+        path = os.path.join(self.directory, table + '.csv')
+        with open(path, 'w') as stream:
+            stream.write('\n'.join(lines) + '\n')
+        out = StringIO()
+        call_command('load_npl_csv', table, path, snapshot=self.snapshot.pk, stdout=out, **options)
+        return out.getvalue()
+
+    def test_load_with_foreign_keys(self):
+        output = self.load('loan', ['loan_identifier,counterparty_identifier,principal_balance,comment',
+                                    'L1,C1,100,a', 'L2,C1,200,b', 'L3,,300,c'], chunk_size=2)
+        self.assertIn('Ignoring columns: comment', output)
+        self.assertIn('Loan: 3 rows', output)
+        loans = Loan.objects.filter(snapshot_id=self.snapshot).order_by('loan_identifier')
+        self.assertEqual([('L1', self.counterparty.pk, 100), ('L2', self.counterparty.pk, 200), ('L3', None, 300)],
+                         list(loans.values_list('loan_identifier', 'counterparty_identifier', 'principal_balance')))
+
+        # loan identifiers are resolved within the snapshot, unknown ones are reported and stored as null
+        Loan.objects.create(snapshot_id=self.other, loan_identifier='L1')
+        output = self.load('historicalrepayment', [
+            'loan_identifier,reference_year,reference_month,history_of_total_repayments',
+            'L1,2023,1,10', 'L2,2023,2,20', 'L9,2023,3,5'])
+        self.assertIn('1 rows with unresolved loan_identifier', output)
+        self.assertEqual(3, HistoricalRepayment.objects.filter(snapshot_id=self.snapshot).count())
+        self.assertEqual({('L1', 10), ('L2', 20), (None, 5)}, set(HistoricalRepayment.objects.values_list(
+            'loan_identifier__loan_identifier', 'history_of_total_repayments')))
+        self.assertFalse(HistoricalRepayment.objects.filter(loan_identifier__snapshot_id=self.other).exists())
+
+    def test_unknown_table_or_snapshot(self):
+        with self.assertRaises(CommandError):
+            self.load('unknown', ['a'])
+        with self.assertRaises(CommandError):
+            call_command('load_npl_csv', 'loan', 'missing.csv', snapshot=self.other.pk + 1, stdout=StringIO())
@@ -0,0 +1,71 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import datetime
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import Portfolio, PortfolioSnapshot
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+@unittest.skipIf(pq is None, 'requires pyarrow')
+class ParquetSnapshotTests(TestCase):
+
+    def test_round_trip(self):
+        portfolio = Portfolio.objects.create(name='P1')
+        snapshot = PortfolioSnapshot.objects.create(name='S1')
+        counterparty = Counterparty.objects.create(portfolio_id=portfolio, snapshot_id=snapshot,
+                                                   counterparty_identifier='C1')
+        Loan.objects.create(snapshot_id=snapshot, counterparty_identifier=counterparty, loan_identifier='L1',
+                            amortisation_type=2, date_of_default=datetime.date(2020, 5, 1), current_reversion_interest_rate=1.5,
+                            stage_reached_in_legal_proceedings={'stage': 1})
+        PortfolioSnapshot.objects.create(name='S2')
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_npl_parquet', snapshot=snapshot.pk, directory=directory, stdout=StringIO())
+            stored = pq.ParquetFile('%s/loan/snapshot_id=%d/part-0.parquet' % (directory, snapshot.pk))
+            field = stored.schema_arrow.field('amortisation_type')
+            self.assertEqual('int16', str(field.type))
+            self.assertIn(b'choices', field.metadata)
+            column = stored.metadata.row_group(0).column(stored.schema_arrow.get_field_index('amortisation_type'))
+            self.assertIn('RLE_DICTIONARY', column.encodings)
+
+            snapshot.delete()
+            self.assertFalse(Loan.objects.exists())
+            call_command('import_npl_parquet', directory=directory, stdout=StringIO())
+
+        loan = Loan.objects.get()
+        self.assertEqual(('L1', 2, datetime.date(2020, 5, 1), 1.5, {'stage': 1}),
+                         (loan.loan_identifier, loan.amortisation_type, loan.date_of_default,
+                          loan.current_reversion_interest_rate, loan.stage_reached_in_legal_proceedings))
+        self.assertEqual(counterparty.pk, loan.counterparty_identifier.pk)
+        self.assertEqual(1, Portfolio.objects.count())
+        self.assertEqual(2, PortfolioSnapshot.objects.count())
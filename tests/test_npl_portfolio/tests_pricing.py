@@ -0,0 +1,106 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import datetime
+import io
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.enforcement import Enforcement
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.pricing import run_simulation, scenario_flows, simulation_loans
+from npl_portfolio.pricing_simulation import PricingSimulation
+from npl_portfolio.property_collateral import PropertyCollateral
+from npl_portfolio.recoveries import ENFORCEMENT_MONTHS, start_month
+from npl_portfolio.simulation import parameter_values, simulate
+
+CERTAIN = {'haircut': 0, 'volatility': 0, 'cure_probability': 0, 'delay_mean': 0}
+
+
+class PricingSimulationTests(TestCase):
+
+    def setUp(self):
+        self.snapshot = PortfolioSnapshot.objects.create(name='S1', cutoff_date=datetime.datetime(
+            2024, 12, 31, tzinfo=datetime.timezone.utc))
+        counterparty = Counterparty.objects.create(snapshot_id=self.snapshot)
+        self.loans = {}
+        for name, legal in (('A', 1000), ('B', 500), ('C', 300)):
+            self.loans[name] = Loan.objects.create(snapshot_id=self.snapshot, loan_identifier=name, legal_balance=legal,
+                                                   counterparty_identifier=counterparty)
+        # A repays 10 a month until the auction of its collateral, settled in June 2025
+        house = PropertyCollateral.objects.create(loan_identifier=self.loans['A'], latest_valuation_amount=800)
+        Enforcement.objects.create(property_collateral_identifier=house, next_auction_date=datetime.date(2025, 3, 15),
+                                   court_auction_reserve_price_for_next_auction=600)
+        for month in range(1, 13):
+            HistoricalRepayment.objects.create(snapshot_id=self.snapshot, loan_identifier=self.loans['A'],
+                                               reference_year=2024, reference_month=month,
+                                               history_of_total_repayments=10)
+        # B is secured by a property without enforcement, C is unsecured
+        PropertyCollateral.objects.create(loan_identifier=self.loans['B'], latest_valuation_amount=400)
+
+    def test_certain_scenarios(self):
+        loans = simulation_loans(self.snapshot.pk, start_month(self.snapshot), 60)
+        np.testing.assert_allclose([10, 0, 0], loans['rate'])
+        np.testing.assert_allclose([600, 400, 0], loans['value'])
+        np.testing.assert_array_equal([5, ENFORCEMENT_MONTHS - 1, ENFORCEMENT_MONTHS - 1], loans['month'])
+        flows = simulate(loans, parameter_values(CERTAIN), 3, 0, 60)
+        expected = np.zeros(60)
+        expected[:5], expected[5], expected[ENFORCEMENT_MONTHS - 1] = 10, 600, 400
+        np.testing.assert_allclose(np.tile(expected, (3, 1)), flows)
+        # cured loans repay their exposure in equal instalments
+        flows = simulate(loans, parameter_values(dict(CERTAIN, cure_probability=1, cure_months=10)), 1, 0, 60)
+        np.testing.assert_allclose([180] * 10 + [0] * 50, flows[0])
+        with self.assertRaises(ValueError):
+            parameter_values({'haircut': 2})
+
+    def test_deterministic_seeding(self):
+        loans = simulation_loans(self.snapshot.pk, start_month(self.snapshot), 60)
+        parameters = parameter_values()
+        serial = simulate(loans, parameters, 50, 7, 60, block_size=10)
+        np.testing.assert_array_equal(serial, simulate(loans, parameters, 50, 7, 60, workers=2, block_size=10))
+        self.assertFalse(np.array_equal(serial, simulate(loans, parameters, 50, 8, 60, block_size=10)))
+        self.assertLess(serial.sum(axis=1).max(), 1800 + 1e-6)
+
+    def test_simulation_api(self):
+        call_command('simulate_npl_prices', snapshot=self.snapshot.pk, scenarios=200, seed=1, workers=1,
+                     stdout=io.StringIO())
+        simulation = PricingSimulation.objects.get()
+        self.assertEqual((200, 120), scenario_flows(simulation).shape)
+        response = self.client.get('/api/npl_data/simulations/?snapshot=%d' % self.snapshot.pk)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, response.json()['count'])
+        response = self.client.get('/api/npl_data/simulations/?snapshot=%d' % (self.snapshot.pk + 1))
+        self.assertEqual(400, response.status_code)
+        response = self.client.get('/api/npl_data/simulations/%d/prices/?rates=0,0.1&prices=500' % simulation.pk)
+        self.assertEqual(200, response.status_code)
+        result = response.json()
+        self.assertGreater(result['prices'][0]['mean'], result['prices'][1]['mean'])
+        self.assertGreater(result['yields'][0]['quantiles']['0.5'], 0)
+        self.assertEqual(400, self.client.get('/api/npl_data/simulations/%d/prices/?prices=x'
+                                              % simulation.pk).status_code)
+        # the same seed simulates the same scenarios
+        again = run_simulation(self.snapshot.pk, 200, seed=1, workers=1)
+        np.testing.assert_array_equal(scenario_flows(simulation), scenario_flows(again))
+        self.loans['C'].save()
+        self.assertFalse(PricingSimulation.objects.filter(stale=False).exists())
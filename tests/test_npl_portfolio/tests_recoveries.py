@@ -0,0 +1,127 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import datetime
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+
+from npl_portfolio import recoveries
+from npl_portfolio.cashflows import SOURCES, irr, present_value, project_chunks
+from npl_portfolio.counterparty import Counterparty
+from npl_portfolio.enforcement import Enforcement
+from npl_portfolio.external_collection import ExternalCollection
+from npl_portfolio.forbearance import Forbearance
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.property_collateral import PropertyCollateral
+from npl_portfolio.recoveries import loan_flows, snapshot_inputs, snapshot_projection, start_month
+from npl_portfolio.recovery_projection import RecoveryProjection
+
+
+class RecoveryProjectionTests(TestCase):
+
+    def setUp(self):
+        self.snapshot = PortfolioSnapshot.objects.create(name='S1', cutoff_date=datetime.datetime(
+            2024, 12, 31, tzinfo=datetime.timezone.utc))
+        counterparties = [Counterparty.objects.create(snapshot_id=self.snapshot) for _ in range(3)]
+        self.loans = {}
+        for name, counterparty, legal in (('A', 0, 1000), ('B', 1, 100), ('C', 2, 1000), ('D', 2, 1000)):
+            self.loans[name] = Loan.objects.create(snapshot_id=self.snapshot, loan_identifier=name, legal_balance=legal,
+                                                   counterparty_identifier=counterparties[counterparty])
+        # A repays 10 a month until the auction of its collateral in March 2025, settled three months later
+        house = PropertyCollateral.objects.create(loan_identifier=self.loans['A'])
+        Enforcement.objects.create(property_collateral_identifier=house, next_auction_date=datetime.date(2025, 3, 15),
+                                   court_auction_reserve_price_for_next_auction=600, costs_at_end_of_sale=50)
+        for month in range(1, 13):
+            HistoricalRepayment.objects.create(snapshot_id=self.snapshot, loan_identifier=self.loans['A'],
+                                               reference_year=2024, reference_month=month,
+                                               history_of_total_repayments=10)
+        # B repays 30 a month under forbearance, until its balance is repaid
+        Forbearance.objects.create(loan_identifier=self.loans['B'], repayment_amount_under_forbearance=30,
+                                   repayment_frequency_under_forbearance=0,
+                                   start_date_of_forbearance=datetime.date(2024, 6, 1),
+                                   end_date_of_forbearance=datetime.date(2025, 12, 31))
+        # the agent collecting from the counterparty of C and D recovered 120 of 240 in 12 months
+        ExternalCollection.objects.create(counterparty_identifier=counterparties[2], repayment_plan=True,
+                                          cash_recoveries=120, balance_amount_sent_to_agent=240,
+                                          date_sent_to_agent=datetime.date(2024, 1, 10))
+
+    def flows(self):
+        flows = loan_flows(snapshot_projection(self.snapshot.pk))
+        return {loan.loan_identifier: flows['cash_flows'][list(flows['loan']).index(loan.pk)]
+                for loan in self.loans.values()}
+
+    def test_projection(self):
+        flows = self.flows()
+        np.testing.assert_allclose([10] * 5 + [550], flows['A'][:6])
+        self.assertAlmostEqual(600, flows['A'].sum(), places=3)
+        np.testing.assert_allclose([30, 30, 30, 10, 0], flows['B'][:5])
+        np.testing.assert_allclose([5] * 12 + [0], flows['C'][:13])
+        projection = RecoveryProjection.objects.get(snapshot_id=self.snapshot)
+        self.assertEqual(datetime.date(2025, 1, 1), projection.start_date)
+        self.assertAlmostEqual(550, sum(projection.cash_flows['sale']))
+        self.assertAlmostEqual(120, sum(projection.cash_flows['collection']))
+
+    def test_parallel_chunks(self):
+        loans, lumps, schedules = snapshot_inputs(self.snapshot.pk, start_month(self.snapshot))
+        exposure = loans['exposure'].to_numpy(dtype=float)
+        serial = project_chunks(exposure, lumps, schedules, 24)
+        parallel = project_chunks(exposure, lumps, schedules, 24, workers=2, chunk_size=1)
+        np.testing.assert_allclose(serial[0], parallel[0])
+        np.testing.assert_allclose(serial[1], parallel[1])
+        self.assertEqual((len(SOURCES), 24), serial[1].shape)
+
+    def test_pricing(self):
+        flows = np.array([0, 50, 50, 1000.0])
+        price = present_value(flows, [0.12])[0]
+        self.assertAlmostEqual(0.12, irr(flows, [price])[0])
+        self.assertTrue(np.isnan(irr(flows, [0])[0]))
+        # API requests project in the request process
+        with mock.patch.object(recoveries, 'project_chunks', wraps=project_chunks) as projected:
+            response = self.client.get('/api/npl_data/loans/recoveries/?snapshot=%d&rates=0,0.1&prices=800'
+                                       % self.snapshot.pk)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, projected.call_args.args[4])
+        result = response.json()
+        self.assertAlmostEqual(820, result['prices'][0]['price'], places=3)
+        self.assertGreater(result['yields'][0]['irr'], 0)
+        self.assertEqual('2025-01', result['months'][0])
+        self.assertEqual(400, self.client.get('/api/npl_data/loans/recoveries/?snapshot=%d&rates=x'
+                                              % self.snapshot.pk).status_code)
+        # the projection is removed when the recovery data of the snapshot change
+        Forbearance.objects.update(repayment_amount_under_forbearance=20)
+        self.loans['B'].save()
+        self.assertFalse(RecoveryProjection.objects.exists())
+        self.assertAlmostEqual(20, self.flows()['B'][0])
+
+    def test_defaults_and_empty_snapshot(self):
+        # without prices the response holds no yields
+        result = self.client.get('/api/npl_data/loans/recoveries/?snapshot=%d' % self.snapshot.pk).json()
+        self.assertEqual([], result['yields'])
+        self.assertEqual(4, len(result['prices']))
+
+        empty = PortfolioSnapshot.objects.create(name='S2')
+        result = self.client.get('/api/npl_data/loans/recoveries/?snapshot=%d&prices=100' % empty.pk).json()
+        self.assertEqual((0, 0), (result['loans'], result['total']))
+        self.assertEqual([None], [row['irr'] for row in result['yields']])
+        loans = self.client.get('/api/npl_data/loans/recoveries/?snapshot=%d&detail=loans' % empty.pk).json()
+        self.assertEqual([], loans['loan'])
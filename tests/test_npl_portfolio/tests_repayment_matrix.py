@@ -0,0 +1,80 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from common.ingestion import bulk_saved
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.repayment_matrix import cached_matrix_page, matrix_page
+
+
+class RepaymentMatrixTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.snapshot = PortfolioSnapshot.objects.create(name='S1')
+        for i in range(3):
+            loan = Loan.objects.create(snapshot_id=self.snapshot, loan_identifier='L%d' % i)
+            for month in (1, 2):
+                HistoricalRepayment.objects.create(snapshot_id=self.snapshot, loan_identifier=loan,
+                                                   reference_year=2023, reference_month=month,
+                                                   history_of_total_repayments=100 * i + month)
+
+    def test_pivot_pages(self):
+        page = matrix_page(self.snapshot.pk, page=2, page_size=2)
+        self.assertEqual(['2023-02', '2023-01'], [c['label'] for c in page['columns']])
+        self.assertEqual((3, 2), (page['count'], page['num_pages']))
+        self.assertEqual(['L2'], [r['loan'] for r in page['rows']])
+        self.assertEqual([202, 201], [c['total'] for c in page['rows'][0]['cells']])
+
+        page = matrix_page(self.snapshot.pk, loan='L1')
+        self.assertEqual(['L1'], [r['loan'] for r in page['rows']])
+
+    def test_cache_invalidated_on_save(self):
+        page = cached_matrix_page(self.snapshot.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(page, cached_matrix_page(self.snapshot.pk))
+
+        record = HistoricalRepayment.objects.get(loan_identifier__loan_identifier='L0', reference_month=1)
+        record.history_of_total_repayments = 5
+        record.save()
+        self.assertEqual(5, cached_matrix_page(self.snapshot.pk)['rows'][0]['cells'][1]['total'])
+        self.assertEqual(5, cached_matrix_page()['rows'][0]['cells'][1]['total'])
+
+        # bulk writes of another snapshot keep the pages of this snapshot
+        page = cached_matrix_page(self.snapshot.pk)
+        bulk_saved.send(sender=HistoricalRepayment, snapshots={self.snapshot.pk + 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(page, cached_matrix_page(self.snapshot.pk))
+        bulk_saved.send(sender=HistoricalRepayment, snapshots={self.snapshot.pk})
+        with self.assertNumQueries(4):
+            cached_matrix_page(self.snapshot.pk)
+
+    def test_admin_matrix_view(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+        response = self.client.get('/admin/npl_portfolio/historicalrepayment/matrix/?snapshot_id=%d&loan=L2'
+                                   % self.snapshot.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '202')
+        self.assertNotContains(response, '>L1<')
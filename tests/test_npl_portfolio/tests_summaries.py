@@ -0,0 +1,105 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from common.cache import instance_snapshots
+from common.ingestion import bulk_saved
+from npl_portfolio.enforcement import Enforcement
+from npl_portfolio.historical_repayment import HistoricalRepayment
+from npl_portfolio.loan import Loan
+from npl_portfolio.models import PortfolioSnapshot
+from npl_portfolio.property_collateral import PropertyCollateral
+from npl_portfolio.snapshot_summary import SnapshotSummary
+from npl_portfolio.summaries import SNAPSHOT_PATHS, refresh_summaries, snapshot_summaries
+
+
+class SnapshotSummaryTests(TestCase):
+
+    def setUp(self):
+        self.snapshot = PortfolioSnapshot.objects.create(name='S1')
+        self.loans = [Loan.objects.create(snapshot_id=self.snapshot, loan_identifier='L%d' % i, asset_class=i,
+                                          principal_balance=100 * (i + 1), legal_balance=200, days_in_pastdue=40)
+                      for i in range(2)]
+        self.collateral = PropertyCollateral.objects.create(loan_identifier=self.loans[0], latest_valuation_amount=300)
+        Enforcement.objects.create(property_collateral_identifier=self.collateral, indicator_of_enforcement=True)
+        HistoricalRepayment.objects.create(snapshot_id=self.snapshot, loan_identifier=self.loans[1],
+                                           reference_year=2023, reference_month=1, history_of_total_repayments=7)
+
+    def test_summaries(self):
+        summaries = snapshot_summaries(self.snapshot.pk)
+        self.assertEqual({'count': 2, 'sum_principal_balance': 300, 'sum_accrued_interest_balance_on_book': None,
+                          'sum_legal_balance': 400}, summaries['loan_balances']['total'])
+        self.assertEqual(['31-90'], [row['pastdue_bucket'] for row in summaries['loan_balances']['by_pastdue_bucket']])
+        self.assertEqual((1, 1.5), (summaries['collateral_coverage']['secured_loans'],
+                                    summaries['collateral_coverage']['coverage']))
+        self.assertEqual((1, 1), (summaries['enforcements']['count'], summaries['enforcements']['in_progress']))
+        self.assertEqual(7, summaries['repayments']['by_year'][0]['total'])
+
+        # stored summaries are read without computing them again
+        with self.assertNumQueries(1):
+            snapshot_summaries(self.snapshot.pk)
+
+    def test_saving_records_flags_dependent_summaries(self):
+        refresh_summaries([self.snapshot.pk])
+        self.assertEqual({self.snapshot.pk}, instance_snapshots(Enforcement.objects.get(), SNAPSHOT_PATHS))
+
+        self.collateral.latest_valuation_amount = 100
+        self.collateral.save()
+        stale = set(SnapshotSummary.objects.filter(stale=True).values_list('name', flat=True))
+        self.assertEqual({'collateral_coverage'}, stale)
+        self.assertEqual(0.5, snapshot_summaries(self.snapshot.pk)['collateral_coverage']['coverage'])
+
+        # saves only flag the summaries, they are recomputed when read
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Loan.objects.create(snapshot_id=self.snapshot, principal_balance=1)
+            Loan.objects.create(snapshot_id=self.snapshot, principal_balance=2)
+        self.assertEqual([], callbacks)
+        self.assertTrue(SnapshotSummary.objects.get(name='loan_balances').stale)
+        self.assertEqual(4, snapshot_summaries(self.snapshot.pk)['loan_balances']['total']['count'])
+
+        # raw saves (fixture loads) are skipped
+        loan = self.loans[0]
+        loan.principal_balance = 5
+        post_save.send(sender=Loan, instance=loan, created=False, raw=True)
+        self.assertFalse(SnapshotSummary.objects.get(name='loan_balances').stale)
+
+        bulk_saved.send(sender=HistoricalRepayment, snapshots={self.snapshot.pk + 1})
+        self.assertFalse(SnapshotSummary.objects.filter(stale=True).exists())
+        bulk_saved.send(sender=HistoricalRepayment)
+        self.assertEqual(['repayments'], list(SnapshotSummary.objects.filter(stale=True).values_list('name', flat=True)))
+
+    def test_command_api_and_admin(self):
+        call_command('refresh_npl_summaries', '--snapshot', str(self.snapshot.pk), stdout=StringIO())
+        self.assertEqual(4, SnapshotSummary.objects.count())
+
+        response = self.client.get('/api/npl_data/summaries/?snapshot=%d&name=enforcements' % self.snapshot.pk)
+        self.assertEqual(['enforcements'], [s['name'] for s in response.json()['results']])
+        response = self.client.get('/api/npl_data/summaries/?snapshot=%d' % (self.snapshot.pk + 1))
+        self.assertEqual(400, response.status_code)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'secret'))
+        response = self.client.get('/admin/npl_portfolio/portfoliosnapshot/')
+        self.assertContains(response, '150.0%')
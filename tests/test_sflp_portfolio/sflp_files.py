@@ -0,0 +1,64 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Minimal SFLP data files for tests of the engines on data loaded by the SFLPLoader (raw codes of the files)
+"""
+
+import os
+import tempfile
+
+from sflp_portfolio.loader import LOAN_SPEC, LOAN_STATE_SPEC, SFLPLoader
+
+
+def file_row(columns, values):
+    """A pipe-delimited row of a file with the given number of columns, values maps column positions to values"""
+    row = [''] * columns
+    for position, value in values.items():
+        row[position] = str(value)
+    return '|'.join(row)
+
+
+def loan_row(loan, origination='', channel='', purpose=''):
+    """A row of the loan file (16 columns) of a loan of portfolio SELLER A"""
+    return file_row(len(LOAN_SPEC.columns), {0: loan, 1: 'SELLER A', 2: channel, 6: origination, 9: purpose})
+
+
+def state_row(loan, period, zero_balance='', history='', age=''):
+    """A row of the loan state file (26 columns) with the raw zero balance code, repayment history and loan age"""
+    return file_row(len(LOAN_STATE_SPEC.columns), {0: loan, 1: period, 3: zero_balance, 20: age, 25: history})
+
+
+def load_files(periods, loans, states):
+    """Write the portfolio, snapshot, loan and loan state files and load them with the SFLPLoader"""
+    directory = tempfile.mkdtemp()
+    files = {
+        'portfolio.csv': ['name', 'SELLER A'],
+        'portfolio_snapshot.csv': ['period'] + periods,
+        'loan.csv': [file_row(len(LOAN_SPEC.columns), {})] + loans,
+        'loan_state.csv': [file_row(len(LOAN_STATE_SPEC.columns), {})] + states,
+    }
+    for name, rows in files.items():
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+    loader = SFLPLoader(directory, log=lambda message: None)
+    loader.load_portfolios()
+    loader.load_snapshots()
+    for spec in (LOAN_SPEC, LOAN_STATE_SPEC):
+        loader.load_table(spec)
@@ -0,0 +1,101 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.test import TestCase
+
+from common.ingestion import bulk_saved
+from sflp_portfolio.delinquency import decode_history, decode_status, snapshot_panel
+from sflp_portfolio.models.delinquency_panel import DelinquencyPanel
+from sflp_portfolio.models.forbearance import Forbearance
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import PortfolioSnapshot
+
+
+class DelinquencyTests(TestCase):
+
+    def setUp(self):
+        self.snapshot = PortfolioSnapshot.objects.create(monthly_reporting_period='012020')
+        histories = ['00' * 24, '00' * 20 + '01020304', 'XX' * 22 + '0001']
+        self.loans = [Loan.objects.create(loan_identifier='L%d' % i) for i in range(3)]
+        for loan, history in zip(self.loans, histories):
+            LoanState.objects.create(portfolio_snapshot_id=self.snapshot, loan_identifier=loan,
+                                     repayment_history=history)
+        Forbearance.objects.create(portfolio_snapshot_id=self.snapshot, loan_identifier=self.loans[2],
+                                   current_loan_delinquency_status='02')
+        # a forbearance record of a loan without a loan state in the snapshot
+        Forbearance.objects.create(portfolio_snapshot_id=self.snapshot, loan_identifier=Loan.objects.create(),
+                                   current_loan_delinquency_status='01')
+
+    def test_decode(self):
+        history = decode_history(['00' * 23 + '01', None, '0102', '00' * 23 + 'X1'])
+        self.assertEqual((4, 24), history.shape)
+        self.assertEqual('int8', history.dtype.name)
+        self.assertEqual([[0, 1], [-1, -1], [1, 2], [0, -1]], history[:, -2:].tolist())
+        self.assertEqual([0, 1, 12, -1, -1], decode_status(['00', '1', '12', 'XX', None]).tolist())
+        self.assertEqual((0, 24), decode_history([]).shape)
+
+        # longer strings keep their most recent codes
+        history = decode_history(['0102' + '00' * 23 + '03', '05'])
+        self.assertEqual([[0, 3], [-1, 5]], history[:, -2:].tolist())
+        self.assertEqual(0, history[0, 0])
+
+    def test_delinquency_api(self):
+        url = '/api/sflp_data/loans/delinquency/?snapshot=%d' % self.snapshot.pk
+        metrics = self.client.get(url).json()
+        self.assertEqual(3, metrics['loans'])
+        self.assertEqual(1, metrics['ever_90_plus'])
+        self.assertEqual([1, 2], metrics['delinquent'][-2:])
+        self.assertEqual({'current': 1, '30': 0, '60': 1, '90+': 1, 'unknown': 0}, metrics['status_counts'])
+
+        loans = self.client.get(url + '&detail=loans').json()
+        self.assertEqual([loan.pk for loan in self.loans], loans['loan'])
+        self.assertEqual([0, 120, 30], loans['max_dpd'])
+        self.assertEqual([0, 4, 1], loans['months_delinquent'])
+        self.assertEqual([False, True, False], loans['ever_90_plus'])
+        self.assertEqual(400, self.client.get('/api/sflp_data/loans/delinquency/').status_code)
+        self.assertEqual(400, self.client.get('/api/sflp_data/loans/delinquency/?snapshot=%d'
+                                              % (self.snapshot.pk + 1)).status_code)
+
+        # a snapshot without loan states has an empty panel
+        empty = PortfolioSnapshot.objects.create(monthly_reporting_period='022020')
+        metrics = self.client.get('/api/sflp_data/loans/delinquency/?snapshot=%d' % empty.pk).json()
+        self.assertEqual((0, [0] * 24), (metrics['loans'], metrics['delinquent']))
+        self.assertEqual([], self.client.get('/api/sflp_data/loans/delinquency/?snapshot=%d&detail=loans'
+                                             % empty.pk).json()['loan'])
+
+    def test_panel_stored_until_states_change(self):
+        snapshot_panel(self.snapshot.pk)
+        with self.assertNumQueries(1):
+            snapshot_panel(self.snapshot.pk)
+        state = LoanState.objects.get(loan_identifier=self.loans[0])
+        state.repayment_history = '00' * 23 + '05'
+        state.save()
+        self.assertFalse(DelinquencyPanel.objects.exists())
+        self.assertEqual(5, snapshot_panel(self.snapshot.pk)['history'][0, -1])
+        bulk_saved.send(sender=Forbearance)
+        self.assertFalse(DelinquencyPanel.objects.exists())
+
+        # bulk writes remove the panels of the snapshots of the written rows only
+        snapshot_panel(self.snapshot.pk)
+        bulk_saved.send(sender=LoanState, snapshots={self.snapshot.pk + 1})
+        self.assertTrue(DelinquencyPanel.objects.exists())
+        bulk_saved.send(sender=LoanState, snapshots={self.snapshot.pk})
+        self.assertFalse(DelinquencyPanel.objects.exists())
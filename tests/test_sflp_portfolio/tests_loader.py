@@ -0,0 +1,151 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from sflp_portfolio.loader import SFLPLoader, LOAN_SPEC, LOAN_STATE_SPEC
+from sflp_portfolio.models.import_checkpoint import ImportCheckpoint
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import PortfolioSnapshot
+from sflp_portfolio.partitioning import is_partitioned, partition_name
+
+FILES = {
+    'portfolio.csv': 'name\nSELLER A\n',
+    'portfolio_snapshot.csv': 'period\n012020\n022020\n',
+    'loan.csv': 'id|seller|channel|rate|upb|term|orig|first|ltv|purpose|amort|reloc|hb|mip|mit|cltv\n'
+                '100001|SELLER A|1|3.5|200000|360|2019-01-01|2019-03-01|80|2|1|N|N|0|0|80\n'
+                '100002|SELLER A|0|4.0|150000|360|2019-02-01|2019-04-01|75|1|1|N|Y|0|0|75\n',
+    'loan_state.csv': 'id|period|hltv|zbc|zbd|upbr|tpc|lpi|mta|mici|spc|upc|zbcd|lhi|lhd|nira|npc|srv|cir|upb|age|'
+                      'rmlm|rmm|mat|sai|hist\n'
+                      '100001|012020|N||||100.0|2020-01-01|||90|10||||||BANK|3.5|199000|12|348|348|2049-01-01|N|'
+                      '000000000000000000000000\n'
+                      '100001|022020|N||||100.0|2020-02-01|||90|10||||||BANK|3.5|198900|13|347|347|2049-01-01|N|'
+                      '000000000000000000000001\n'
+                      '100002|022020|N|1|2020-02-01|149000|||||||||||||||||||||\n',
+}
+
+
+class SFLPLoaderTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name, content in FILES.items():
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write(content)
+        self.messages = []
+        self.loader = SFLPLoader(self.directory, chunk_size=2, log=self.messages.append)
+
+    def test_load_resolves_foreign_keys(self):
+        self.loader.load_portfolios()
+        self.loader.load_snapshots()
+        self.assertEqual(2, self.loader.load_table(LOAN_SPEC))
+        self.assertEqual(3, self.loader.load_table(LOAN_STATE_SPEC))
+
+        loan = Loan.objects.get(loan_identifier='100001')
+        self.assertEqual('SELLER A', loan.portfolio.name)
+        states = LoanState.objects.filter(loan_identifier=loan).order_by('loan_age')
+        self.assertEqual(['012020', '022020'], [s.portfolio_snapshot_id.monthly_reporting_period for s in states])
+        self.assertEqual('000000000000000000000001', states[1].repayment_history)
+        removed = LoanState.objects.get(loan_identifier__loan_identifier='100002')
+        # raw code 01 (prepaid) is stored as its choice code
+        self.assertEqual(0, removed.zero_balance_code)
+        self.assertIsNone(removed.loan_age)
+        self.assertTrue(any('LoanState: 3 rows' in m for m in self.messages))
+
+    def test_interrupted_job_resumes_after_last_chunk(self):
+        loader = SFLPLoader(self.directory, chunk_size=2, log=self.messages.append, job='test')
+        insert_chunk = loader.insert_chunk
+        calls = []
+
+        def failing_insert(spec, frame):
+            calls.append(spec.name)
+            if spec is LOAN_STATE_SPEC and calls.count(spec.name) == 2:
+                raise RuntimeError('connection lost')
+            return insert_chunk(spec, frame)
+
+        with mock.patch.object(loader, 'insert_chunk', failing_insert):
+            with self.assertRaises(RuntimeError):
+                loader.run([LOAN_SPEC, LOAN_STATE_SPEC])
+        self.assertTrue(ImportCheckpoint.objects.get(job='test', table='Loan').completed)
+        self.assertEqual(2, ImportCheckpoint.objects.get(job='test', table='LoanState').rows_read)
+        self.assertEqual(2, LoanState.objects.count())
+
+        loader.run([LOAN_SPEC, LOAN_STATE_SPEC])
+        self.assertEqual(2, Loan.objects.count())
+        self.assertEqual(3, LoanState.objects.count())
+        self.assertFalse(ImportCheckpoint.objects.filter(job='test').exists())
+
+    def test_snapshot_appends_single_period(self):
+        loader = SFLPLoader(self.directory, log=self.messages.append, period='012020', job='test:012020')
+        loader.run([LOAN_SPEC, LOAN_STATE_SPEC])
+        self.assertEqual(['012020'], list(PortfolioSnapshot.objects.values_list('monthly_reporting_period', flat=True)))
+        self.assertEqual(1, LoanState.objects.count())
+
+        loader = SFLPLoader(self.directory, log=self.messages.append, period='022020', job='test:022020')
+        loader.run([LOAN_SPEC, LOAN_STATE_SPEC])
+        self.assertEqual(2, PortfolioSnapshot.objects.count())
+        self.assertEqual(2, Loan.objects.count())
+        self.assertEqual(3, LoanState.objects.count())
+
+    def test_snapshot_upserts_changed_static_rows(self):
+        SFLPLoader(self.directory, log=self.messages.append, period='012020').run([LOAN_SPEC, LOAN_STATE_SPEC])
+        unchanged = Loan.objects.get(loan_identifier='100002').last_change_date
+        with open(os.path.join(self.directory, 'loan.csv'), 'a') as f:
+            f.write('100003|SELLER A|1|5.0|100000|180|2019-12-01|2020-02-01|60|2|1|N|N|0|0|60\n')
+        with open(os.path.join(self.directory, 'loan.csv')) as f:
+            content = f.read().replace('100001|SELLER A|1|3.5', '100001|SELLER A|1|3.25')
+        with open(os.path.join(self.directory, 'loan.csv'), 'w') as f:
+            f.write(content)
+
+        for _ in range(2):
+            SFLPLoader(self.directory, log=self.messages.append, period='022020').run([LOAN_SPEC, LOAN_STATE_SPEC])
+        self.assertEqual(3, Loan.objects.count())
+        self.assertEqual(3.25, Loan.objects.get(loan_identifier='100001').original_interest_rate)
+        self.assertEqual(unchanged, Loan.objects.get(loan_identifier='100002').last_change_date)
+        # loading the period again replaces its state rows
+        self.assertEqual(3, LoanState.objects.count())
+        self.assertEqual(1, self.messages.count('Loan: 1 changed rows updated'))
+
+    def test_benchmark_indexes(self):
+        out = StringIO()
+        call_command('benchmark_indexes', rows=60, periods=3, repeat=1, stdout=out)
+        self.assertIn('sflp_loan_identifier_idx', out.getvalue())
+        self.assertFalse(Loan.objects.exists())
+        self.assertFalse(LoanState.objects.exists())
+
+    def test_partitioning_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('partition_sflp_tables', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'requires --drop'):
+            call_command('detach_sflp_snapshot', '2020-01', '--delete-snapshot', stdout=StringIO())
+        self.assertFalse(is_partitioned(LoanState))
+        # with partitioning enabled, new snapshots are created without partitions on other databases
+        with self.settings(SFLP_PARTITION_BY_SNAPSHOT=True):
+            snapshot = PortfolioSnapshot.objects.create(monthly_reporting_period='2020-04')
+        self.assertNotIn(partition_name(LoanState, snapshot.pk), connection.introspection.table_names())
@@ -0,0 +1,113 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from common.ingestion import bulk_insert
+
+from sflp_portfolio.losses import loss_summary, snapshot_losses
+from sflp_portfolio.models.counterparty import Counterparty
+from sflp_portfolio.models.enforcement import Enforcement
+from sflp_portfolio.models.liquidation_losses import LiquidationLosses
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import Portfolio, PortfolioSnapshot
+
+
+class LossTests(TestCase):
+
+    def setUp(self):
+        portfolio = Portfolio.objects.create(name='P1')
+        self.snapshot = PortfolioSnapshot.objects.create(monthly_reporting_period='062020')
+        # score, balance at removal, net sales proceeds, credit enhancement, costs, last paid installment
+        liquidations = [
+            (700, 100.0, 60.0, 10.0, 10.0, datetime.date(2019, 6, 1)),
+            (790, 200.0, 180.0, None, 20.0, datetime.date(2019, 12, 1)),
+            (600, None, 50.0, None, None, None),
+        ]
+        for i, (score, upb, sales, enhancement, costs, last_paid) in enumerate(liquidations):
+            loan = Loan.objects.create(loan_identifier='L%d' % i, portfolio=portfolio,
+                                       origination_date=datetime.date(2015, 1, 1))
+            Counterparty.objects.create(loan_identifier=loan, borrower_credit_score_at_origination=score)
+            LoanState.objects.create(loan_identifier=loan, portfolio_snapshot_id=self.snapshot,
+                                     upb_at_the_time_of_removal=upb, last_paid_installment_date=last_paid)
+            Enforcement.objects.create(loan_identifier=loan, portfolio_snapshot_id=self.snapshot,
+                                       net_sales_proceeds=sales, credit_enhancement_proceeds=enhancement,
+                                       foreclosure_costs=costs, foreclosure_date=datetime.date(2020, 1, 1),
+                                       disposition_date=datetime.date(2020, 6, 1))
+        # not liquidated
+        Enforcement.objects.create(loan_identifier=Loan.objects.create(loan_identifier='L3'),
+                                   portfolio_snapshot_id=self.snapshot, foreclosure_date=datetime.date(2020, 5, 1))
+
+    def test_losses(self):
+        # loan states of other snapshots are ignored
+        later = PortfolioSnapshot.objects.create(monthly_reporting_period='072020')
+        LoanState.objects.create(loan_identifier=Loan.objects.get(loan_identifier='L0'), portfolio_snapshot_id=later,
+                                 upb_at_the_time_of_removal=1000)
+        arrays = snapshot_losses(self.snapshot.pk)
+        self.assertEqual(3, len(arrays['loan']))
+        np.testing.assert_allclose([40.0, 40.0], arrays['loss'][:2])
+        np.testing.assert_allclose([0.4, 0.2], arrays['severity'][:2])
+        self.assertTrue(np.isnan(arrays['severity'][2]))
+        np.testing.assert_allclose([12, 6, np.nan], arrays['months_to_disposition'])
+
+        summary = loss_summary(arrays, 'fico')
+        self.assertAlmostEqual(80 / 300, summary['severity'])
+        self.assertAlmostEqual(0.3, summary['mean_severity'])
+        self.assertEqual([0, 0, 1, 0, 1, 0, 0, 0, 0, 0], summary['severity_distribution']['counts'].tolist())
+        segments = {segment['fico']: segment for segment in summary['segments']}
+        self.assertAlmostEqual(0.2, segments['780+']['severity'])
+        self.assertIsNone(segments['<620']['severity'])
+
+    def test_storage(self):
+        # nothing is stored for unknown snapshots
+        self.assertEqual(0, len(snapshot_losses(self.snapshot.pk + 1)['loan']))
+        self.assertFalse(LiquidationLosses.objects.exists())
+        snapshot_losses(self.snapshot.pk)
+        with self.assertNumQueries(1):
+            snapshot_losses(self.snapshot.pk)
+        Enforcement.objects.first().save()
+        self.assertFalse(LiquidationLosses.objects.exists())
+
+        # bulk writes remove the losses of the snapshots of the written rows only
+        snapshot_losses(self.snapshot.pk)
+        other = PortfolioSnapshot.objects.create(monthly_reporting_period='072020')
+        bulk_insert(LoanState, pd.DataFrame({'loan_identifier_id': [Loan.objects.first().pk],
+                                             'portfolio_snapshot_id_id': [other.pk]}))
+        bulk_insert(Loan, pd.DataFrame({'loan_identifier': ['L4']}))
+        self.assertTrue(LiquidationLosses.objects.exists())
+        bulk_insert(Enforcement, pd.DataFrame({'loan_identifier_id': [Loan.objects.first().pk],
+                                               'portfolio_snapshot_id_id': [self.snapshot.pk]}))
+        self.assertFalse(LiquidationLosses.objects.exists())
+
+    def test_losses_api(self):
+        url = '/api/sflp_data/enforcement/losses/?snapshot=%d' % self.snapshot.pk
+        result = self.client.get(url + '&group_by=fico').json()
+        self.assertEqual(3, result['loans'])
+        self.assertEqual(3, len(result['segments']))
+        loans = self.client.get(url + '&detail=loans').json()
+        self.assertEqual([0.4, 0.2, None], [None if v is None else round(v, 6) for v in loans['severity']])
+        self.assertEqual(400, self.client.get(url + '&group_by=servicer').status_code)
+        self.assertEqual(400, self.client.get('/api/sflp_data/enforcement/losses/').status_code)
+        self.assertEqual(400, self.client.get('/api/sflp_data/enforcement/losses/?snapshot=%d'
+                                              % (self.snapshot.pk + 1)).status_code)
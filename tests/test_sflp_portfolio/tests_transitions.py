@@ -0,0 +1,112 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import Portfolio, PortfolioSnapshot
+from sflp_portfolio.transitions import STATES, period_date, roll_rates, snapshot_sequence
+from tests.test_sflp_portfolio.sflp_files import load_files, loan_row, state_row
+
+
+class TransitionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.portfolio = Portfolio.objects.create(name='P1')
+        periods = ['022020', '012020', '032020']
+        self.snapshots = {p: PortfolioSnapshot.objects.create(monthly_reporting_period=p) for p in periods}
+        # loan -> (last history code, zero balance code) per period, in chronological order
+        paths = [
+            [('00', None), ('01', None), ('02', None)],
+            [('01', None), ('00', None), (None, 0)],
+            [('03', None), ('04', None), (None, 8)],
+            [('00', None), ('00', None), None],
+        ]
+        for i, path in enumerate(paths):
+            loan = Loan.objects.create(loan_identifier='L%d' % i, portfolio=self.portfolio if i < 3 else None)
+            for period, state in zip(['012020', '022020', '032020'], path):
+                if state is None:
+                    continue
+                code, zero_balance = state
+                LoanState.objects.create(portfolio_snapshot_id=self.snapshots[period], loan_identifier=loan,
+                                         repayment_history=None if code is None else '00' * 23 + code,
+                                         zero_balance_code=zero_balance)
+
+    def test_snapshot_sequence(self):
+        self.assertEqual(['2020-01', '2020-02', '2020-03'], [label for _, label in snapshot_sequence()])
+        self.assertEqual(['2020-02'], [label for _, label in snapshot_sequence('2020-02', '022020')])
+        self.assertIsNone(period_date('Q1'))
+
+    def test_roll_rates(self):
+        result = roll_rates()
+        self.assertEqual([['2020-01', '2020-02'], ['2020-02', '2020-03']], result['periods'])
+        first = result['counts'][0]
+        index = STATES.index
+        self.assertEqual(1, first[index('current'), index('30')])
+        self.assertEqual(1, first[index('30'), index('current')])
+        self.assertEqual(1, first[index('90+'), index('90+')])
+        self.assertEqual(1, first[index('current'), index('current')])
+        second = result['counts'][1]
+        self.assertEqual(1, second[index('current'), index('prepaid')])
+        self.assertEqual(1, second[index('90+'), index('default')])
+        self.assertEqual(1, result['exits'][1][index('current')])
+        self.assertAlmostEqual(1 / 3, result['rates'][index('current'), index('current')])
+
+        portfolio = roll_rates('2020-02', '2020-03', self.portfolio.pk)
+        self.assertEqual(3, portfolio['total'].sum())
+        self.assertEqual(0, portfolio['exits'].sum())
+
+    def test_roll_rates_api(self):
+        response = self.client.get('/api/sflp_data/loans/roll_rates/?start=2020-01&end=2020-02')
+        self.assertEqual(200, response.status_code)
+        result = response.json()
+        self.assertEqual(STATES, result['states'])
+        self.assertEqual(4, sum(map(sum, result['total'])))
+        self.assertIsNone(result['rates'][STATES.index('default')][0])
+        # the second request is served from the cache
+        with self.assertNumQueries(2):
+            self.client.get('/api/sflp_data/loans/roll_rates/?start=2020-01&end=2020-02')
+        self.assertEqual(400, self.client.get('/api/sflp_data/loans/roll_rates/?start=Q1').status_code)
+
+
+
+class LoadedTransitionTests(TestCase):
+    """Roll rates of loan states loaded from SFLP files, whose zero balance codes are raw file codes"""
+
+    def setUp(self):
+        cache.clear()
+        loans = ['100001', '100002', '100003', '100004', '100005']
+        states = [state_row(loan, '012020', history='00' * 24) for loan in loans]
+        # prepaid, REO disposition (credit event), non-credit removal and reperforming loan sale
+        states += [state_row('100001', '022020', history='00' * 24), state_row('100002', '022020', '01'),
+                   state_row('100003', '022020', '09'), state_row('100004', '022020', '96'),
+                   state_row('100005', '022020', '16')]
+        load_files(['012020', '022020'], [loan_row(loan) for loan in loans], states)
+
+    def test_roll_rates_of_loaded_states(self):
+        counts = roll_rates('2020-01', '2020-02')['counts'][0]
+        index = STATES.index
+        self.assertEqual(1, counts[index('current'), index('current')])
+        self.assertEqual(1, counts[index('current'), index('prepaid')])
+        self.assertEqual(1, counts[index('current'), index('default')])
+        self.assertEqual(2, counts[index('current'), index('removed')])
@@ -0,0 +1,119 @@
+# Copyright (c) 2020 - 2026 Open Risk (https://www.openriskmanagement.com)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import datetime
+
+import numpy as np
+from django.test import TestCase
+
+from sflp_portfolio.models.counterparty import Counterparty
+from sflp_portfolio.models.enforcement import Enforcement
+from sflp_portfolio.models.loan import Loan
+from sflp_portfolio.models.loan_state import LoanState
+from sflp_portfolio.models.models import Portfolio, PortfolioSnapshot
+from sflp_portfolio.models.property_collateral import PropertyCollateral
+from sflp_portfolio.models.vintage_curves import VintageCurves
+from sflp_portfolio.vintages import curves, fico_bands, portfolio_curves
+from tests.test_sflp_portfolio.sflp_files import load_files, loan_row, state_row
+
+
+class VintageTests(TestCase):
+
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='P1')
+        self.snapshot = PortfolioSnapshot.objects.create(monthly_reporting_period='062020')
+        # origination date, channel, state, score, loan ages of the states, zero balance code of the last state
+        loans = [
+            (datetime.date(2019, 1, 15), 0, 'CA', 700, [1, 2, 3], 0),
+            (datetime.date(2019, 2, 1), 0, 'NY', 790, [1, 2, 3, 4, 5], 8),
+            (datetime.date(2019, 3, 1), 1, 'CA', 600, [1, 2, 3, 4, 5, 6], None),
+            (datetime.date(2019, 4, 1), 1, 'CA', None, [1, 2], None),
+        ]
+        for i, (origination, channel, state, score, ages, zero_balance) in enumerate(loans):
+            loan = Loan.objects.create(loan_identifier='L%d' % i, portfolio=self.portfolio,
+                                       origination_date=origination, channel=channel, original_upb=100.0 * (i + 1))
+            PropertyCollateral.objects.create(loan_identifier=loan, property_state=state)
+            Counterparty.objects.create(loan_identifier=loan, borrower_credit_score_at_origination=score)
+            for age in ages:
+                LoanState.objects.create(portfolio_snapshot_id=self.snapshot, loan_identifier=loan, loan_age=age,
+                                         zero_balance_code=zero_balance if age == ages[-1] else None)
+            if i == 2:
+                Enforcement.objects.create(loan_identifier=loan, portfolio_snapshot_id=self.snapshot,
+                                           foreclosure_date=datetime.date(2019, 7, 10))
+
+    def test_fico_bands(self):
+        self.assertEqual(['<620', '620-679', '740-779', '780+', 'unknown'],
+                         fico_bands([500, 620, 779, 850, None]).tolist())
+
+    def test_curves(self):
+        result = curves(portfolio_curves(self.portfolio.pk))
+        self.assertEqual(['2019Q1', '2019Q2'], result['vintages'])
+        self.assertEqual([3, 1], result['loans'].tolist())
+        first = result['default'][0]
+        # the second loan defaults at age 5, the third is foreclosed 4 months after origination
+        self.assertAlmostEqual(0, first[3])
+        self.assertAlmostEqual(1 / 3, first[4])
+        self.assertAlmostEqual(2 / 3, first[5])
+        self.assertAlmostEqual(1 / 3, result['prepaid'][0][3])
+        # ages beyond the oldest loan of a vintage are missing
+        self.assertTrue(np.isnan(result['default'][1][3]))
+
+        sliced = curves(portfolio_curves(self.portfolio.pk), {'channel': ['0'], 'property_state': ['NY']}, 'upb')
+        self.assertEqual(['2019Q1'], sliced['vintages'])
+        self.assertAlmostEqual(1, sliced['default'][0][5])
+
+    def test_reuse(self):
+        portfolio_curves(self.portfolio.pk)
+        with self.assertNumQueries(2):
+            portfolio_curves(self.portfolio.pk)
+        # a new snapshot rebuilds the curves, edited loan data remove them
+        PortfolioSnapshot.objects.create(monthly_reporting_period='072020')
+        portfolio_curves(self.portfolio.pk)
+        self.assertEqual(VintageCurves.objects.get().portfolio_snapshot_id_id, PortfolioSnapshot.objects.latest('pk').pk)
+        LoanState.objects.first().save()
+        self.assertFalse(VintageCurves.objects.exists())
+
+    def test_vintages_api(self):
+        url = '/api/sflp_data/loans/vintages/?portfolio=%d' % self.portfolio.pk
+        response = self.client.get(url + '&fico=780%2B,<620&weight=upb')
+        self.assertEqual(200, response.status_code)
+        result = response.json()
+        self.assertEqual(['2019Q1'], result['vintages'])
+        self.assertEqual(2, result['loans'][0])
+        self.assertAlmostEqual(1.0, result['default'][0][-1])
+        self.assertEqual(400, self.client.get(url + '&fico=900').status_code)
+        self.assertEqual(400, self.client.get('/api/sflp_data/loans/vintages/').status_code)
+
+
+class LoadedVintageTests(TestCase):
+    """Vintage curves of loan states loaded from SFLP files, whose zero balance codes are raw file codes"""
+
+    def setUp(self):
+        loans = ['100001', '100002', '100003', '100004']
+        states = [state_row(loan, '012020', history='00' * 24, age=1) for loan in loans]
+        # prepaid, REO disposition (credit event) and non-credit removal at age 2
+        states += [state_row('100001', '022020', '01', age=2), state_row('100002', '022020', '09', age=2),
+                   state_row('100003', '022020', '96', age=2), state_row('100004', '022020', age=2)]
+        load_files(['012020', '022020'], [loan_row(loan, '2019-12-01') for loan in loans], states)
+
+    def test_curves_of_loaded_states(self):
+        result = curves(portfolio_curves(Portfolio.objects.get(name='SELLER A').pk))
+        self.assertEqual(['2019Q4'], result['vintages'])
+        self.assertEqual([0.25], result['prepaid'][:, 2].tolist())
+        self.assertEqual([0.25], result['default'][:, 2].tolist())